@@ -0,0 +1,36 @@
+"""index metric snapshots for history queries
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """
+    Add composite index for /metrics/history.
+
+    The endpoint filters by tenant_id and walks snapshots newest first with
+    keyset pagination on (snapshot_time, id). Without this index every page
+    is a full scan plus sort of metric_snapshots.
+
+    Index:
+    - (tenant_id, snapshot_time DESC, id DESC)
+    """
+    op.create_index(
+        'ix_metric_snapshots_tenant_time',
+        'metric_snapshots',
+        ['tenant_id', sa.text('snapshot_time DESC'), sa.text('id DESC')],
+        unique=False
+    )
+
+def downgrade():
+    """Remove history index"""
+    op.drop_index('ix_metric_snapshots_tenant_time', table_name='metric_snapshots')
@@ -0,0 +1,36 @@
+"""index current metrics by tenant
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """
+    Add tenant index for /metrics/current.
+
+    The endpoint selects a tenant's rows with WHERE tenant_id = ?. PostgreSQL
+    does not index foreign key columns on its own, so without this index
+    every request scans all of current_metrics.
+
+    Index:
+    - (tenant_id)
+    """
+    op.create_index(
+        'ix_current_metrics_tenant_id',
+        'current_metrics',
+        ['tenant_id'],
+        unique=False
+    )
+
+def downgrade():
+    """Remove current metrics tenant index"""
+    op.drop_index('ix_current_metrics_tenant_id', table_name='current_metrics')
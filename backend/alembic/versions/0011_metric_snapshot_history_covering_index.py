@@ -0,0 +1,63 @@
+"""cover provider in the metric snapshot history index
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    """
+    Rebuild the /metrics/history index with provider as an INCLUDE column.
+
+    History pages that leave out data (?fields=provider,snapshot_time) are then
+    answered by an index-only backward scan that stops after the page's rows.
+    data is deliberately not included: snapshot payloads easily exceed the
+    btree tuple size limit and would make inserts fail.
+
+    The new index is built CONCURRENTLY next to the old one, so the table
+    stays writable and history keeps its index throughout, then takes over
+    the old name.
+
+    Index:
+    - (tenant_id, snapshot_time DESC, id DESC) INCLUDE (provider)
+    """
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_metric_snapshots_tenant_time_new',
+            'metric_snapshots',
+            ['tenant_id', sa.text('snapshot_time DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_include=['provider'],
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_metric_snapshots_tenant_time',
+            table_name='metric_snapshots',
+            postgresql_concurrently=True
+        )
+    op.execute('ALTER INDEX ix_metric_snapshots_tenant_time_new RENAME TO ix_metric_snapshots_tenant_time')
+
+def downgrade():
+    """Restore the history index without the INCLUDE column"""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_metric_snapshots_tenant_time_old',
+            'metric_snapshots',
+            ['tenant_id', sa.text('snapshot_time DESC'), sa.text('id DESC')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_metric_snapshots_tenant_time',
+            table_name='metric_snapshots',
+            postgresql_concurrently=True
+        )
+    op.execute('ALTER INDEX ix_metric_snapshots_tenant_time_old RENAME TO ix_metric_snapshots_tenant_time')
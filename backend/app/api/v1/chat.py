@@ -7,7 +7,17 @@ from app.db.database import AsyncSessionLocal
 from app.models.models import ChatMessage, Tenant
 from sqlalchemy import select, desc
 from datetime import datetime
+import logging
 import os
+from app.config import settings
+
+# The openai package is optional; AI replies and embeddings are skipped without it
+try:
+    from app.services.openai_client import get_async_openai_client, get_model_name
+except ImportError:
+    get_async_openai_client = get_model_name = None
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -48,7 +58,7 @@ manager = ConnectionManager()
 
 async def get_chat_history(tenant_id: int, limit: int = 20, offset: int = 0) -> List[dict]:
     """Load chat messages from database with pagination"""
-    print(f"[DEBUG] get_chat_history called with tenant_id={tenant_id}, limit={limit}, offset={offset}")
+    logger.debug("get_chat_history called with tenant_id=%s, limit=%s, offset=%s", tenant_id, limit, offset)
     async with AsyncSessionLocal() as session:
         result = await session.execute(
             select(ChatMessage)
@@ -58,7 +68,7 @@ async def get_chat_history(tenant_id: int, limit: int = 20, offset: int = 0) ->
             .offset(offset)
         )
         messages = result.scalars().all()
-        print(f"[DEBUG] Query returned {len(messages)} messages")
+        logger.debug("Query returned %d messages", len(messages))
         msg_list = [
             {
                 "sender": msg.sender,
@@ -68,31 +78,28 @@ async def get_chat_history(tenant_id: int, limit: int = 20, offset: int = 0) ->
             }
             for msg in reversed(messages)
         ]
-        print(f"[DEBUG] Returning {len(msg_list)} messages after reversal")
+        logger.debug("Returning %d messages after reversal", len(msg_list))
         return msg_list
 
 async def save_chat_message(tenant_id: int, sender: str, message: str, metadata: dict = None):
     """Save a chat message to database with optional embedding"""
-    async with AsyncSessionLocal() as session:
-        # Generate embedding if OpenAI is available
-        embedding_str = None
-        try:
-            from app.config import settings
-            from app.services.openai_client import get_async_openai_client, get_model_name
+    # Generate embedding if OpenAI is available (before taking a pooled connection)
+    embedding_str = None
+    try:
+        if get_async_openai_client and (settings.OPENAI_API_KEY or settings.AZURE_CLIENT_ID):
+            client = await get_async_openai_client()
+            model = get_model_name("embedding")
             
-            if settings.OPENAI_API_KEY or settings.AZURE_CLIENT_ID:
-                client = await get_async_openai_client()
-                model = get_model_name("embedding")
-                
-                response = await client.embeddings.create(
-                    model=model,
-                    input=message
-                )
-                embedding = response.data[0].embedding
-                embedding_str = json.dumps(embedding)  # Store as JSON string
-        except Exception as e:
-            print(f"Embedding generation failed: {e}")
-        
+            response = await client.embeddings.create(
+                model=model,
+                input=message
+            )
+            embedding = response.data[0].embedding
+            embedding_str = json.dumps(embedding)  # Store as JSON string
+    except Exception as e:
+        logger.warning("Embedding generation failed: %s", e)
+    
+    async with AsyncSessionLocal() as session:
         chat_msg = ChatMessage(
             tenant_id=tenant_id,
             sender=sender,
@@ -105,40 +112,36 @@ async def save_chat_message(tenant_id: int, sender: str, message: str, metadata:
 
 async def get_cloud_resources_summary(tenant_id: int) -> dict:
     """Fetch real-time cloud resource details for AI context"""
-    from app.api.v1.metrics import fetch_aws_resources, fetch_azure_resources, fetch_gcp_resources
+    from app.api.v1.metrics import PROVIDER_FETCHERS, fetch_provider_resources
     
+    # Release the connection before the (slow) cloud fetch
     async with AsyncSessionLocal() as session:
         result = await session.execute(select(Tenant).where(Tenant.id == tenant_id))
         tenant = result.scalar_one_or_none()
         if not tenant:
             return {"error": "Tenant not found"}
-        
+        tenant_name = tenant.name
         meta = tenant.metadata_json or {}
-        provider = (meta.get("provider") or "aws").lower()
-        
-        # Fetch full resource details based on provider
-        if provider == "aws":
-            resources = await fetch_aws_resources(tenant_id, meta)
-        elif provider == "azure":
-            resources = await fetch_azure_resources(tenant_id, meta)
-        elif provider == "gcp":
-            resources = await fetch_gcp_resources(tenant_id, meta)
-        else:
-            return {"error": "Unknown provider"}
-        
-        # Return full resource details for AI to analyze
-        return {
-            "provider": provider,
-            "tenant_name": tenant.name,
-            "resources": resources
-        }
+    
+    provider = (meta.get("provider") or "aws").lower()
+    
+    # Fetch full resource details based on provider
+    if provider not in PROVIDER_FETCHERS:
+        return {"error": "Unknown provider"}
+    resources = await fetch_provider_resources(provider, tenant_id, meta)
+    
+    # Return full resource details for AI to analyze
+    return {
+        "provider": provider,
+        "tenant_name": tenant_name,
+        "resources": resources
+    }
 
 async def generate_ai_response(tenant_id: int, user_message: str, history: List[dict]) -> str:
     """Generate AI response using OpenAI with function calling for cloud resources"""
+    if get_async_openai_client is None:
+        return "OpenAI package not installed. Please install: pip install openai"
     try:
-        from app.config import settings
-        from app.services.openai_client import get_async_openai_client, get_model_name
-        
         # Check if API key is configured
         if settings.OPENAI_PROVIDER == "azure":
             if not settings.AZURE_CLIENT_ID or not settings.AZURE_CLIENT_SECRET:
@@ -221,11 +224,9 @@ Be concise and helpful. Format numbers and lists clearly."""
         
         return response_message.content
         
-    except ImportError:
-        return "OpenAI package not installed. Please install: pip install openai"
     except Exception as e:
         error_str = str(e)
-        print(f"AI generation error: {e}")
+        logger.warning("AI generation error: %s", e)
         # Provide helpful error messages
         if "invalid_api_key" in error_str.lower() or "401" in error_str:
             return "Invalid or missing OpenAI API key. Please set OPENAI_API_KEY environment variable with your valid API key from https://platform.openai.com/account/api-keys"
@@ -271,17 +272,15 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     # Send initial chat history on connection (most recent 20 messages)
     try:
         history = await get_chat_history(int(client_id), limit=20, offset=0)
-        print(f"[WebSocket] Loading {len(history)} messages for client {client_id}")
+        logger.debug("Loading %d messages for client %s", len(history), client_id)
         await websocket.send_json({
             "type": "history",
             "messages": history,
             "hasMore": len(history) == 20  # If we got full page, there might be more
         })
-        print(f"[WebSocket] Sent {len(history)} messages to client {client_id}, hasMore={len(history) == 20}")
+        logger.debug("Sent %d messages to client %s, hasMore=%s", len(history), client_id, len(history) == 20)
     except Exception as e:
-        print(f"Error loading chat history: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error loading chat history: %s", e)
     
     try:
         while True:
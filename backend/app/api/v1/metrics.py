@@ -15,17 +15,40 @@ Author: Cloud Optimizer Team
 Version: 1.0
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from app.db.database import get_db
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse, Response
+from app.db.database import get_db, AsyncSessionLocal
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
-from app.models.models import CurrentMetric, MetricSnapshot, Tenant, CloudMetricsCache
-from sqlalchemy import select, desc
+from typing import Hashable, List, Literal, Optional
+from app.models.models import CurrentMetric, MetricSnapshot, Tenant, CloudMetricsCache, UserClientPermission
+from sqlalchemy import Integer, bindparam, select, desc, tuple_
+from sqlalchemy.orm import load_only
+from pydantic import BaseModel
 from app.auth.jwt import get_current_user
-from datetime import datetime, timedelta
+from app.config import settings
+from app.services.cache import (
+    RequestCoalescer, cache_get, cache_set, cached_fetch, credentials_fingerprint, response_cache_key,
+    tenant_scope_get, tenant_scope_set
+)
+from datetime import datetime, timedelta, timezone
+import aiohttp
 import asyncio
+import hashlib
+import importlib
+import logging
 import os
+import re
+import threading
+import time
 import json
+import orjson
+import msgpack
+from collections import OrderedDict
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from itertools import chain
+from operator import attrgetter, itemgetter
 from botocore.config import Config
 from botocore.exceptions import ClientError
 from azure.identity import ClientSecretCredential
@@ -35,6 +58,23 @@ from azure.mgmt.sql import SqlManagementClient
 from azure.mgmt.resource import ResourceManagementClient
 from azure.core.exceptions import HttpResponseError
 
+# GCP SDKs are optional; without them the GCP fetchers report an error instead
+try:
+    from google.auth.transport.requests import Request as GoogleAuthRequest
+    from google.cloud import compute_v1, storage
+    from google.oauth2 import service_account
+    _GCP_AVAILABLE = True
+except ImportError:
+    _GCP_AVAILABLE = False
+
+# The openai package is optional; recommendations skip LLM insights without it
+try:
+    from app.services.openai_client import get_async_openai_client
+except ImportError:
+    get_async_openai_client = None
+
+logger = logging.getLogger(__name__)
+
 # API Router configuration
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 
@@ -45,6 +85,354 @@ LLM_CACHE_TTL = 86400  # 24 hours in seconds
 # Database cache TTL for cloud metrics to reduce cloud provider API calls
 METRICS_CACHE_TTL_MINUTES = 30
 
+# Seconds each worker keeps the newest inventory cache row in memory, so
+# dashboards polling /resources skip the Postgres read between refreshes
+INVENTORY_ROW_MEMO_TTL = 30
+
+# Redis TTL for serialized /current and /history responses; also sent as the
+# browser Cache-Control max-age
+METRICS_RESPONSE_CACHE_TTL = 30
+
+# Columns each metrics route can return, in response order. Selecting columns
+# instead of entities skips ORM hydration, and ?fields= can leave out the large
+# data JSON entirely.
+CURRENT_METRIC_FIELDS = {
+    "provider": CurrentMetric.provider,
+    "resource_type": CurrentMetric.resource_type,
+    "resource_id": CurrentMetric.resource_id,
+    "data": CurrentMetric.data,
+    "updated_at": CurrentMetric.updated_at,
+}
+# Timestamp columns hold naive UTC values; orjson formats them in its C encoder
+# and marks them as UTC ("...Z") so clients do not read them as local time
+METRICS_JSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+# Snapshots returned per /history page by default, and the largest page a
+# caller may ask for; next_cursor continues from the last one
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 1000
+
+METRIC_SNAPSHOT_FIELDS = {
+    "tenant_id": MetricSnapshot.tenant_id,
+    "provider": MetricSnapshot.provider,
+    "snapshot_time": MetricSnapshot.snapshot_time,
+    "data": MetricSnapshot.data,
+}
+
+# Affected resources listed per recommendation in /recommendations; longer
+# lists are cut and the entry reports the full affected_count instead
+MAX_AFFECTED_RESOURCES = 100
+
+# Tenant lookups in these routes read only the name and credentials metadata
+TENANT_LOAD_OPTIONS = [load_only(Tenant.name, Tenant.metadata_json)]
+
+# Placeholder per-provider cost estimates served by /costs until billing APIs
+# are integrated. Shared across requests - treat as read-only.
+PLACEHOLDER_COSTS = {
+    "aws": {
+        "compute": 245.50,
+        "storage": 89.20,
+        "network": 34.10,
+        "database": 125.00,
+        "total": 493.80
+    },
+    "azure": {
+        "compute": 189.00,
+        "storage": 67.50,
+        "network": 28.30,
+        "database": 0,
+        "total": 284.80
+    },
+}
+EMPTY_COSTS = {"total": 0}
+
+# Inventory shape per provider (category -> resource keys), in result order.
+# Success, missing credential and failure paths all start from a fresh copy of
+# the same shape, and build_resource_summary counts the same keys.
+_AWS_INVENTORY = {
+    "compute": ("ec2", "asg", "lambda", "ecs", "eks"),
+    "database": ("rds", "dynamodb", "elasticache"),
+    "storage": ("s3", "ebs"),
+    "networking": ("vpc", "sg", "elb", "cloudfront", "route53"),
+    "security": ("iam", "kms"),
+    "messaging": ("sns", "sqs"),
+    "api": ("api_gateway",),
+}
+_AZURE_INVENTORY = {
+    "compute": ("vm", "app_service", "aks"),
+    "database": ("sql", "cosmos", "mysql"),
+    "storage": ("storage_account", "blob", "disks"),
+    "networking": ("vnet", "nsg", "lb"),
+    "security": ("key_vault", "managed_identity"),
+}
+_GCP_INVENTORY = {
+    "compute": ("instances", "images"),
+    "database": ("cloud_sql", "firestore", "bigtable"),
+    "storage": ("buckets", "disks"),
+    "networking": ("networks", "firewalls"),
+    "analytics": ("bigquery",),
+    "messaging": ("pubsub",),
+}
+_INVENTORY_SHAPES = {"aws": _AWS_INVENTORY, "azure": _AZURE_INVENTORY, "gcp": _GCP_INVENTORY}
+
+# Resource keys a fetcher only reports when the account has any, so an empty
+# inventory leaves them out
+_OPTIONAL_RESOURCES = frozenset({("storage", "disks")})
+
+# Unknown providers report every category with no resource types
+_UNKNOWN_INVENTORY = dict.fromkeys(
+    ("compute", "database", "storage", "networking", "security", "analytics", "messaging"), ()
+)
+
+
+def _empty_inventory(shape: dict, error: Optional[str] = None) -> dict:
+    """Fresh inventory with an empty list per resource, plus "error" when given."""
+    result = {
+        category: {key: [] for key in keys if (category, key) not in _OPTIONAL_RESOURCES}
+        for category, keys in shape.items()
+    }
+    if error is not None:
+        result["error"] = error
+    return result
+
+# Binary encoding offered to clients that send this Accept header
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+
+def select_fields(available: dict, fields: Optional[str]) -> list:
+    """
+    Resolve a comma-separated ?fields= value to the columns to select.
+
+    Args:
+        available (dict): Field name to column mapping for the route
+        fields (str, optional): Requested field names; None selects all
+
+    Returns:
+        list: Column expressions in the route's response order
+
+    Raises:
+        HTTPException: 400 if an unknown field is requested
+    """
+    if not fields:
+        return list(available.values())
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - available.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(available)}"
+        )
+    return [col for name, col in available.items() if name in requested]
+
+
+def _tenant_scope(column, scope: Optional[str]):
+    """
+    WHERE clause restricting a tenant_id column to the caller's scope.
+
+    "client" binds a single :client_id, "clients" an expanding :client_ids
+    list; None means unrestricted (superadmin without a client_id filter).
+    """
+    if scope == "client":
+        return column == bindparam("client_id")
+    if scope == "clients":
+        return column.in_(bindparam("client_ids", expanding=True))
+    return None
+
+
+def _scope_params(client_id: Optional[int], allowed: Optional[frozenset]) -> tuple:
+    """Pick the tenant scope and its bind values for a metrics query."""
+    if client_id:
+        return "client", {"client_id": client_id}
+    if allowed is not None:
+        return "clients", {"client_ids": list(allowed)}
+    return None, {}
+
+
+@lru_cache(maxsize=64)
+def current_metrics_statement(fields: Optional[str], scope: Optional[str]):
+    """
+    /current SELECT for a ?fields= value and tenant scope, built once.
+
+    Every value is a bound parameter, so the same statement object serves all
+    requests of that shape and SQLAlchemy reuses its memoized cache key and
+    compiled SQL instead of rebuilding the expression tree per request.
+    Unknown fields raise from select_fields and are not cached.
+    """
+    query = select(*select_fields(CURRENT_METRIC_FIELDS, fields))
+    where = _tenant_scope(CurrentMetric.tenant_id, scope)
+    return query if where is None else query.where(where)
+
+
+@lru_cache(maxsize=64)
+def metric_history_statement(fields: Optional[str], scope: Optional[str], paged: bool):
+    """
+    /history SELECT for a ?fields= value, tenant scope and cursor use, built once.
+
+    Binds :since and :limit, plus :after_time/:after_id when paged and the
+    scope parameters from _scope_params.
+    """
+    # Cursor columns ride along under private labels and are dropped from the output
+    query = select(
+        *select_fields(METRIC_SNAPSHOT_FIELDS, fields),
+        MetricSnapshot.snapshot_time.label("_cursor_time"),
+        MetricSnapshot.id.label("_cursor_id")
+    ).where(MetricSnapshot.snapshot_time >= bindparam("since"))
+    where = _tenant_scope(MetricSnapshot.tenant_id, scope)
+    if where is not None:
+        query = query.where(where)
+    if paged:
+        query = query.where(
+            tuple_(MetricSnapshot.snapshot_time, MetricSnapshot.id)
+            < tuple_(bindparam("after_time"), bindparam("after_id"))
+        )
+    return query.order_by(
+        desc(MetricSnapshot.snapshot_time), desc(MetricSnapshot.id)
+    ).limit(bindparam("limit", type_=Integer)).execution_options(yield_per=200)
+
+
+async def accessible_client_ids(db: AsyncSession, current_user: dict) -> Optional[frozenset]:
+    """
+    Client IDs the caller may read metrics for.
+
+    Superadmins see every tenant (None, no filter). Everyone else is limited to
+    the clients assigned to them in UserClientPermission, the same rule
+    /clients applies, so the metrics queries can filter in SQL rather than
+    returning every tenant's rows.
+
+    Args:
+        db (AsyncSession): Session used on a memo miss
+        current_user (dict): Authenticated user from the JWT
+
+    Returns:
+        frozenset | None: Accessible client IDs, or None for unrestricted access
+
+    The result is memoized per process (tenant_scope_get). Changing a user's
+    permissions drops their entry in that process; other workers keep the old
+    scope for up to TENANT_SCOPE_TTL seconds.
+    """
+    if current_user.get("role") == "superadmin":
+        return None
+    user_id = current_user.get("user_id")
+    ids = tenant_scope_get(user_id)
+    if ids is not None:
+        return ids
+    result = await db.execute(
+        select(UserClientPermission.client_id).where(UserClientPermission.user_id == user_id)
+    )
+    ids = frozenset(result.scalars().all())
+    tenant_scope_set(user_id, ids)
+    return ids
+
+
+def check_client_access(client_id: Optional[int], allowed: Optional[frozenset]) -> None:
+    """Raise 403 when a specific client_id is outside the caller's scope."""
+    if client_id and allowed is not None and client_id not in allowed:
+        raise HTTPException(status_code=403, detail="Not authorized for this client")
+
+
+def scope_cache_param(client_id: Optional[int], allowed: Optional[frozenset]) -> Optional[str]:
+    """
+    Cache-key component for the tenants an unfiltered response covers.
+
+    A response without client_id lists every tenant the caller can access, so
+    its key carries a digest of that set: once a permission is granted or
+    revoked the old body is simply never read again. Responses for one
+    client_id pass check_client_access first and need no scope.
+    """
+    if client_id or allowed is None:
+        return None
+    ids = ",".join(map(str, sorted(allowed))).encode()
+    return hashlib.blake2b(ids, digest_size=8).hexdigest()
+
+
+def _msgpack_default(value):
+    """Encode values msgpack has no type for the same way the JSON responses do."""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def wants_msgpack(request: Request) -> bool:
+    """True when the client asked for a MessagePack body."""
+    return MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def negotiate_response(request: Request, payload: dict, headers: dict = None) -> Response:
+    """
+    Serialize a response body as MessagePack or JSON based on the Accept header.
+
+    Large inventories (thousands of instances, volumes and security groups)
+    are noticeably smaller and cheaper to encode as MessagePack, so clients
+    that ask for it get the binary form; everyone else keeps receiving JSON.
+
+    Args:
+        request (Request): Incoming request, inspected for its Accept header
+        payload (dict): Response body
+        headers (dict, optional): Extra response headers (e.g. ETag)
+
+    Returns:
+        Response: MessagePack response, or an ORJSONResponse (returned directly
+        so FastAPI skips its jsonable_encoder pass)
+    """
+    headers = {"Vary": "Accept", **(headers or {})}
+    if wants_msgpack(request):
+        body = msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+        return Response(body, media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+    return ORJSONResponse(payload, headers=headers)
+
+
+def inventory_etag(
+    request: Request, client_id: int, provider: str, fetched_at: datetime, summary_only: bool = False
+) -> str:
+    """
+    Weak ETag for an inventory response.
+
+    An inventory only changes when a new cache row is written, so the row's
+    fetched_at identifies its content without hashing the (large) body. The
+    negotiated format and summary-only flag are included because those
+    bodies differ.
+    """
+    fmt = "msgpack" if wants_msgpack(request) else "json"
+    seed = f"{client_id}:{provider}:{fetched_at.isoformat()}:{fmt}:{int(summary_only)}".encode()
+    return f'W/"{hashlib.blake2b(seed, digest_size=8).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check If-None-Match (which may list several tags, or "*") against etag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def format_history_cursor(snapshot_time: datetime, snapshot_id: int) -> str:
+    """Encode the last row of a /history page as its next_cursor (see parse_history_cursor)."""
+    return f"{snapshot_time.isoformat()}_{snapshot_id}"
+
+
+def parse_history_cursor(cursor: str) -> tuple:
+    """
+    Decode a /history next_cursor value.
+
+    Cursors are "<snapshot_time ISO>_<id>"; the id breaks ties between
+    snapshots written in the same transaction (identical server timestamps).
+
+    Args:
+        cursor (str): Value of next_cursor from a previous page
+
+    Returns:
+        tuple: (snapshot_time datetime, snapshot id)
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    try:
+        time_part, id_part = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(time_part), int(id_part)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 def safe_iter(obj, attr=None):
     """
@@ -105,9 +493,139 @@ def safe_iter(obj, attr=None):
     return []
 
 
-@router.get("/current")
+async def run_sync(fn, *args, **kwargs):
+    """
+    Run a blocking SDK call in a worker thread.
+
+    The Azure and GCP SDKs are synchronous; calling them directly inside the
+    async fetchers would stall the event loop, so concurrent fetches (e.g. the
+    snapshot scheduler gathering every tenant) would still run one at a time.
+
+    Args:
+        fn: Blocking callable
+        *args, **kwargs: Passed through to fn
+
+    Returns:
+        Whatever fn returns
+    """
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+# Call limits for the running event loop: (loop, {key: Semaphore}), keyed by
+# provider or (provider, tenant). A Semaphore is bound to the first loop that
+# waits on it, so the set is rebuilt when a new loop (a script's second
+# asyncio.run(), a test) starts using it.
+_call_limits = None
+
+# Tenant whose inventory is being fetched; set by the fetch_*_resources entry
+# points and inherited by every task they start
+_fetch_tenant: ContextVar = ContextVar("fetch_tenant", default=None)
+
+
+def _call_limit(key: Hashable, limit: int) -> asyncio.Semaphore:
+    """Get the semaphore bounding concurrent calls for key in this loop."""
+    global _call_limits
+    loop = asyncio.get_running_loop()
+    if _call_limits is None or _call_limits[0] is not loop:
+        _call_limits = (loop, {})
+    semaphores = _call_limits[1]
+    if key not in semaphores:
+        semaphores[key] = asyncio.Semaphore(limit)
+    return semaphores[key]
+
+
+@asynccontextmanager
+async def _provider_slot(provider: str, limit: int):
+    """
+    Hold a call slot for the current tenant, then one for the provider.
+
+    The tenant limit keeps one large account from taking every provider slot.
+    It is taken first so a tenant queued on its own limit holds nothing shared.
+    """
+    async with _call_limit((provider, _fetch_tenant.get()), settings.CLOUD_TENANT_CONCURRENCY):
+        async with _call_limit(provider, limit):
+            yield
+
+
+def _tenant_scoped(fetch):
+    """Decorate a provider fetcher so its API calls count against the tenant's limit."""
+    @wraps(fetch)
+    async def wrapper(client_id: int, *args, **kwargs):
+        token = _fetch_tenant.set(client_id)
+        try:
+            return await fetch(client_id, *args, **kwargs)
+        finally:
+            _fetch_tenant.reset(token)
+    return wrapper
+
+
+# Bound concurrent Azure ARM calls to stay under subscription read throttling limits
+_AZURE_CONCURRENCY = settings.AZURE_MAX_CONCURRENCY
+
+# Keyword options for every Azure management client. The SDK default policy
+# retries a throttled (429) call up to 10 times with backoff capped at 2 minutes,
+# holding an _AZURE_CONCURRENCY slot throughout; a shorter exponential budget
+# (still honouring Retry-After) frees the slot sooner. ARM reads are slower
+# than AWS describes, so the read timeout stays generous.
+_AZURE_CLIENT_OPTIONS = {
+    "retry_total": 4,
+    "retry_backoff_factor": 0.8,
+    "retry_backoff_max": 30,
+    "connection_timeout": 10,
+    "read_timeout": 60,
+}
+
+
+async def _azure_call(fn, *args, **kwargs):
+    """
+    Run a blocking Azure SDK list call in a worker thread.
+    
+    Azure SDK pagers fetch pages lazily while being iterated, so the result is
+    materialized with safe_iter() inside the thread to keep every HTTPS round-trip
+    off the event loop. Concurrency is bounded per tenant and by _AZURE_CONCURRENCY.
+    
+    Args:
+        fn: Azure SDK method to call (e.g. network_client.virtual_networks.list)
+        *args, **kwargs: Arguments forwarded to fn
+    
+    Returns:
+        list: Materialized items returned by the SDK call
+    """
+    return await _azure_run(lambda: safe_iter(fn(*args, **kwargs)))
+
+
+async def _azure_run(fn, *args, **kwargs):
+    """
+    Run any other blocking Azure SDK work (gets, multi-call helpers) in a worker
+    thread under the same tenant and _AZURE_CONCURRENCY limits as _azure_call.
+
+    Returns:
+        Whatever fn returns
+    """
+    async with _provider_slot("azure", _AZURE_CONCURRENCY):
+        return await run_sync(fn, *args, **kwargs)
+
+
+@lru_cache(maxsize=64)
+def _azure_credential(tenant_id: str, client_id: str, client_secret: str) -> ClientSecretCredential:
+    """
+    Get a Service Principal credential, reusing one per (tenant, client, secret).
+
+    ClientSecretCredential keeps its access token in memory, so sharing the
+    instance across requests skips the OAuth round-trip until the token
+    expires. A rotated secret is a new key and gets a fresh credential.
+    """
+    return ClientSecretCredential(
+        tenant_id=tenant_id,
+        client_id=client_id,
+        client_secret=client_secret
+    )
+
+
+@router.get("/current", response_class=ORJSONResponse)
 async def get_current_metrics(
     client_id: Optional[int] = Query(None, description="Filter by client ID"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)"),
     db: AsyncSession = Depends(get_db), 
     current_user: dict = Depends(get_current_user)
 ):
@@ -115,11 +633,17 @@ async def get_current_metrics(
     Retrieve current metrics from database.
     
     This endpoint fetches stored metrics from the CurrentMetric table. Metrics are
-    typically stored by background workers or previous fetch operations.
+    typically stored by background workers or previous fetch operations. The
+    serialized response is cached in Redis per caller and client_id for
+    METRICS_RESPONSE_CACHE_TTL seconds.
     
     Args:
         client_id (int, optional): Filter results by specific client/tenant ID.
-                                   If None, returns metrics for all clients.
+                                   If None, returns metrics for every client
+                                   the caller can access.
+        fields (str, optional): Comma-separated subset of provider, resource_type,
+                                resource_id, data, updated_at. Omitting "data"
+                                keeps the metric payload out of the query.
         db (AsyncSession): Database session injected by FastAPI dependency.
         current_user (dict): Authenticated user information from JWT token.
     
@@ -131,10 +655,11 @@ async def get_current_metrics(
                 - resource_type (str): Type of resource (ec2/vm/instance)
                 - resource_id (str): Unique identifier for the resource
                 - data (dict): Metric data payload
-                - updated_at (str): ISO timestamp of last update
+                - updated_at (str): ISO timestamp of last update (UTC, "Z" suffix)
     
     Raises:
-        HTTPException: If authentication fails (handled by dependency)
+        HTTPException: If authentication fails (handled by dependency), or 403
+                       if client_id is not assigned to the caller
     
     Example Response:
         {
@@ -145,70 +670,666 @@ async def get_current_metrics(
                     "resource_type": "ec2",
                     "resource_id": "i-1234567890abcdef0",
                     "data": {"cpu": 45.2, "memory": 60.5},
-                    "updated_at": "2026-01-25T10:30:00"
+                    "updated_at": "2026-01-25T10:30:00Z"
                 }
             ]
         }
     """
-    # Build query to fetch metrics from database
-    query = select(CurrentMetric)
-    
-    # Apply client filter if specified
-    if client_id:
-        query = query.where(CurrentMetric.tenant_id == client_id)
-    
-    # Execute query asynchronously
-    q = await db.execute(query)
-    items = q.scalars().all()
-    
-    # Format response with count and items
-    return {
+    # Reject unknown ?fields= and check access up front (the scope is memoized
+    # per user, so this is usually free), then serve identical repeat requests
+    # straight from Redis
+    select_fields(CURRENT_METRIC_FIELDS, fields)
+    allowed = await accessible_client_ids(db, current_user)
+    check_client_access(client_id, allowed)
+    cache_key = response_cache_key(
+        "current", current_user, client_id=client_id, fields=fields, scope=scope_cache_param(client_id, allowed)
+    )
+    cache_headers = {"Cache-Control": f"private, max-age={METRICS_RESPONSE_CACHE_TTL}"}
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return Response(cached, media_type="application/json", headers=cache_headers)
+
+    # Fetch only the requested columns as plain rows, filtered to client_id if
+    # given, otherwise to the caller's tenants; the statement is prebuilt per shape
+    scope, params = _scope_params(client_id, allowed)
+    q = await db.execute(current_metrics_statement(fields, scope), params)
+    keys = list(q.keys())
+    items = [dict(zip(keys, row)) for row in q]
+    
+    # Format response with count and items. Encoding here skips
+    # jsonable_encoder, so orjson does the whole serialization pass
+    # (datetimes are emitted as ISO 8601 UTC natively, no per-row isoformat()).
+    body = orjson.dumps({
         "count": len(items), 
-        "items": [
-            {
-                "provider": i.provider, 
-                "resource_type": i.resource_type,
-                "resource_id": i.resource_id, 
-                "data": i.data,
-                "updated_at": i.updated_at.isoformat() if i.updated_at else None
-            } 
-            for i in items
-        ]
-    }
+        "items": items
+    }, option=METRICS_JSON_OPTIONS)
+    await cache_set(cache_key, body, METRICS_RESPONSE_CACHE_TTL)
+    return Response(body, media_type="application/json", headers=cache_headers)
 
-@router.get("/history")
+@router.get("/history", response_class=ORJSONResponse)
 async def get_metric_history(
     client_id: Optional[int] = Query(None),
     hours: int = Query(24, description="Hours of history to fetch"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=HISTORY_MAX_PAGE_SIZE, description="Snapshots per page"),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get historical metric snapshots"""
-    since = datetime.utcnow() - timedelta(hours=hours)
-    query = select(MetricSnapshot).where(MetricSnapshot.snapshot_time >= since)
-    if client_id:
-        query = query.where(MetricSnapshot.tenant_id == client_id)
-    query = query.order_by(desc(MetricSnapshot.snapshot_time)).limit(100)
-    result = await db.execute(query)
-    snapshots = result.scalars().all()
+    """
+    Get historical metric snapshots, newest first.
+
+    Rows are streamed from the database and encoded one at a time, so the full
+    result set is never held in memory as rows, dicts and a JSON buffer at once.
+    ?fields= limits the selected columns (tenant_id, provider, snapshot_time,
+    data). Since the row count is only known after the last row, "count" and
+    "next_cursor" are written after the "snapshots" array.
+
+    Pagination is keyset-based: pass next_cursor back as ?cursor= to continue
+    strictly after the last returned snapshot, which the
+    ix_metric_snapshots_tenant_time index serves without OFFSET scans.
+    next_cursor is null on the last page. ?limit= sets the page size (up to
+    HISTORY_MAX_PAGE_SIZE); larger pages cost no extra memory since rows are
+    still fetched in batches of 200 and encoded as they arrive.
+
+    Non-superadmins only see snapshots for clients assigned to them; asking
+    for any other client_id is a 403.
+    """
+    select_fields(METRIC_SNAPSHOT_FIELDS, fields)  # 400 on unknown fields
+    after = parse_history_cursor(cursor) if cursor else None
+    # Access is checked before the cache so a revoked client is refused at once
+    allowed = await accessible_client_ids(db, current_user)
+    check_client_access(client_id, allowed)
+    cache_key = response_cache_key(
+        "history", current_user, client_id=client_id, hours=hours, fields=fields, cursor=cursor, limit=limit,
+        scope=scope_cache_param(client_id, allowed)
+    )
+    cache_headers = {"Cache-Control": f"private, max-age={METRICS_RESPONSE_CACHE_TTL}"}
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return Response(cached, media_type="application/json", headers=cache_headers)
+
+    scope, params = _scope_params(client_id, allowed)
+    query = metric_history_statement(fields, scope, bool(after))
+    params["since"] = datetime.utcnow() - timedelta(hours=hours)
+    params["limit"] = limit
+    if after:
+        params["after_time"], params["after_id"] = after
+
+    async def encode_snapshots():
+        # Own session: yield-dependencies are torn down before a streaming body runs
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(query, params)
+            count = 0
+            last = None
+            yield b'{"snapshots":['
+            async for row in result:
+                item = dict(row._mapping)
+                last = (item.pop("_cursor_time"), item.pop("_cursor_id"))
+                chunk = orjson.dumps(item, option=METRICS_JSON_OPTIONS)
+                yield chunk if count == 0 else b"," + chunk
+                count += 1
+            next_cursor = format_history_cursor(*last) if count == limit else None
+            yield b'],"count":%d,"next_cursor":%s}' % (count, orjson.dumps(next_cursor))
+
+    async def stream_and_cache():
+        # Keep a copy of what was sent; only a fully streamed body is cached
+        sent = []
+        async for chunk in encode_snapshots():
+            sent.append(chunk)
+            yield chunk
+        await cache_set(cache_key, b"".join(sent), METRICS_RESPONSE_CACHE_TTL)
+
+    return StreamingResponse(stream_and_cache(), media_type="application/json", headers=cache_headers)
+
+# Server-side filters applied by fetch_aws_resources(mode="cost"). Cost views only
+# need instances that can still bill (stopped ones keep their EBS charges) and
+# unattached volumes, so everything else is dropped by the API, not in Python.
+_AWS_COST_FILTERS = {
+    "ec2": [{"Name": "instance-state-name", "Values": ["pending", "running", "stopping", "stopped"]}],
+    "ebs": [{"Name": "status", "Values": ["available"]}],
+}
+
+# Shared by every inventory client: short timeouts so a dead endpoint cannot
+# stall a tenant, adaptive retries that back off when AWS starts throttling,
+# and keep-alive so pooled connections survive between calls
+_AWS_CLIENT_CONFIG = Config(
+    connect_timeout=3,
+    read_timeout=5,
+    retries={'max_attempts': 3, 'mode': 'adaptive'},
+    tcp_keepalive=True,
+    max_pool_connections=64
+)
+
+# Bound concurrent AWS calls per process so a burst of tenant refreshes cannot
+# open hundreds of connections at once or trip API rate limits
+_AWS_CONCURRENCY = settings.AWS_MAX_CONCURRENCY
+
+# Wall-clock budget for one service's listing (every page and retry). The
+# client timeouts bound a single request; this bounds the whole service, so
+# one slow API leaves its list empty instead of holding up the inventory.
+_AWS_SERVICE_TIMEOUT = 20
+
+# Separate budget for the per-bucket S3 encryption/versioning reads done after
+# the listing in cost mode (two calls per bucket); running out only leaves the
+# remaining buckets unchecked, the bucket list itself is already in hand
+_AWS_S3_SETTINGS_TIMEOUT = 30
+
+
+@lru_cache(maxsize=256)
+def _aws_session(access_key: str, secret_key: str, region: str):
+    """
+    Get an aioboto3 Session for one set of credentials, reused across requests.
+
+    Each botocore session loads and parses the service model JSON the first
+    time it creates a client for a service; keeping the session around means
+    that cost is paid once per credential set instead of on every fetch.
+    """
+    import aioboto3
+    return aioboto3.Session(
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region
+    )
+
+
+# Open service clients are kept per credential set and reused across fetches,
+# so their connection pools (and TLS sessions) outlive a single request. Sets
+# are evicted least recently used first and rebuilt after a day.
+_AWS_CLIENT_SETS_MAX = 64
+_AWS_CLIENT_SET_MAX_AGE = 24 * 3600
+
+
+class _AwsClients:
+    """Open aioboto3 clients for one credential set, shared by concurrent fetches."""
+
+    def __init__(self, session):
+        self.session = session
+        self.created = time.monotonic()
+        self.users = 0
+        self.retired = False
+        self._stack = AsyncExitStack()
+        self._clients = {}
+        self._lock = asyncio.Lock()
+
+    async def client(self, service: str):
+        """Get the open client for service, creating it on first use."""
+        if service not in self._clients:
+            async with self._lock:
+                if service not in self._clients:
+                    self._clients[service] = await self._stack.enter_async_context(
+                        self.session.client(service, config=_AWS_CLIENT_CONFIG)
+                    )
+        return self._clients[service]
+
+    async def retire(self) -> None:
+        """Stop handing out this set; its clients close once the last user is done."""
+        self.retired = True
+        if self.users == 0:
+            await self._stack.aclose()
+
+
+# Client sets for the running event loop: (loop, OrderedDict[key, _AwsClients]).
+# aiobotocore clients are bound to the loop that opened them.
+_aws_client_sets = None
+
+
+@asynccontextmanager
+async def _aws_clients(access_key: str, secret_key: str, region: str):
+    """
+    Borrow the shared client set for one set of AWS credentials.
+
+    Keyed by a hash of the credentials and the region, so rotated keys get a
+    fresh set and secrets are not kept as dictionary keys.
+
+    Yields:
+        _AwsClients: Call await clients.client("ec2") for an open client
+    """
+    global _aws_client_sets
+    loop = asyncio.get_running_loop()
+    if _aws_client_sets is None or _aws_client_sets[0] is not loop:
+        _aws_client_sets = (loop, OrderedDict())
+    client_sets = _aws_client_sets[1]
+
+    key = (hashlib.sha256(f"{access_key}:{secret_key}".encode()).hexdigest(), region)
+    clients = client_sets.get(key)
+    if clients is not None and time.monotonic() - clients.created > _AWS_CLIENT_SET_MAX_AGE:
+        del client_sets[key]
+        await clients.retire()
+        clients = None
+    if clients is None:
+        clients = _AwsClients(_aws_session(access_key, secret_key, region))
+        client_sets[key] = clients
+    client_sets.move_to_end(key)
+    while len(client_sets) > _AWS_CLIENT_SETS_MAX:
+        _, evicted = client_sets.popitem(last=False)
+        await evicted.retire()
+
+    clients.users += 1
+    try:
+        yield clients
+    finally:
+        clients.users -= 1
+        if clients.retired and clients.users == 0:
+            await clients.retire()
+
+
+async def close_aws_clients() -> None:
+    """Close the shared AWS clients on application shutdown."""
+    global _aws_client_sets
+    if _aws_client_sets is not None:
+        client_sets = _aws_client_sets[1]
+        _aws_client_sets = None
+        for clients in client_sets.values():
+            await clients.retire()
+
+
+# Upper bound on items collected per listing, so one huge account cannot make
+# an inventory fetch (and its cached JSON) arbitrarily slow and large
+_AWS_MAX_ITEMS = 5000
+
+# Operations whose listing hit _AWS_MAX_ITEMS during the current AWS fetch.
+# fetch_aws_resources sets a fresh list; the tasks it starts share it and
+# _aws_paginate appends to it, so truncation ends up in the result's "errors"
+_aws_truncated: ContextVar = ContextVar("aws_truncated", default=None)
+
+
+async def _aws_paginate(client, operation: str, key: str, page_size: int = None, **params) -> list:
+    """
+    Collect the items of a list/describe call across response pages.
+
+    Single-page calls silently drop results once an account grows past the
+    API's default page size, so all inventory listings go through here.
+    Collection stops after _AWS_MAX_ITEMS items. A listing the API reports as
+    having more (a resume token after the cap) is logged and recorded in
+    _aws_truncated.
+
+    Args:
+        client: aioboto3 service client
+        operation (str): Paginated operation name, e.g. "describe_instances"
+        key (str): Response key holding the items; dotted for nested keys
+            (e.g. "DistributionList.Items")
+        page_size (int, optional): Items per page when the API's default is small
+        **params: Extra operation parameters, e.g. Filters
+
+    Returns:
+        list: Items from all pages, in API order, at most _AWS_MAX_ITEMS
+    """
+    def page_items(page):
+        for part in key.split("."):
+            page = (page or {}).get(part)
+        return page or []
+
+    if not client.can_paginate(operation):
+        # Some listings have no paginator in older botocore (e.g. S3 ListBuckets)
+        items = page_items(await getattr(client, operation)(**params))
+        truncated = len(items) > _AWS_MAX_ITEMS
+    else:
+        config = {"MaxItems": _AWS_MAX_ITEMS}
+        if page_size:
+            config["PageSize"] = page_size
+        items = []
+        pages = client.get_paginator(operation).paginate(PaginationConfig=config, **params)
+        async for page in pages:
+            items.extend(page_items(page))
+        # The paginator only sets a resume token when it stopped at MaxItems
+        # with results left, so exactly _AWS_MAX_ITEMS items is not truncation
+        truncated = bool(pages.resume_token)
+
+    if truncated:
+        logger.warning("AWS %s reached the %d item cap; inventory is truncated", operation, _AWS_MAX_ITEMS)
+        truncations = _aws_truncated.get()
+        if truncations is not None:
+            truncations.append(operation)
+    return items[:_AWS_MAX_ITEMS]
+
+
+async def _aws_ec2_instances(ec2, region: str, filters: list = None) -> list:
+    """List EC2 instances with OS and IP details, optionally filtered server-side."""
+    instances = []
+    reservations = await _aws_paginate(
+        ec2, "describe_instances", "Reservations", page_size=1000, **({"Filters": filters} if filters else {})
+    )
+    for res in reservations:
+        for inst in res.get("Instances", []):
+            # Extract OS platform information
+            platform = inst.get("Platform", "Linux/Unix")  # Default to Linux if not specified
+            platform_details = inst.get("PlatformDetails", "")
+            
+            # Get image info for more OS details
+            image_id = inst.get("ImageId")
+            os_info = platform_details if platform_details else platform
+            
+            # Get IP addresses
+            private_ip = inst.get("PrivateIpAddress")
+            public_ip = inst.get("PublicIpAddress")
+            
+            instances.append({
+                "id": inst.get("InstanceId"),
+                "type": inst.get("InstanceType"),
+                "state": inst.get("State", {}).get("Name"),
+                "os_type": os_info,
+                "platform": platform,
+                "image_id": image_id,
+                "private_ip": private_ip,
+                "public_ip": public_ip,
+                "region": region,
+                "launch_time": inst.get("LaunchTime").isoformat() if inst.get("LaunchTime") else None
+            })
+    return instances
+
+
+async def _aws_auto_scaling_groups(autoscaling) -> list:
+    """List Auto Scaling Groups with capacity settings."""
+    asgs = await _aws_paginate(autoscaling, "describe_auto_scaling_groups", "AutoScalingGroups")
+    return [
+        {
+            "name": asg.get("AutoScalingGroupName"),
+            "desired_capacity": asg.get("DesiredCapacity"),
+            "current_size": len(asg.get("Instances", [])),
+            "min_size": asg.get("MinSize"),
+            "max_size": asg.get("MaxSize")
+        }
+        for asg in asgs
+    ]
+
+
+async def _aws_lambda_functions(lambda_client) -> list:
+    """List Lambda functions with runtime configuration."""
+    functions = await _aws_paginate(lambda_client, "list_functions", "Functions", page_size=50)
+    return [
+        {
+            "name": func.get("FunctionName"),
+            "runtime": func.get("Runtime"),
+            "memory_mb": func.get("MemorySize"),
+            "timeout_s": func.get("Timeout"),
+            "last_modified": func.get("LastModified")
+        }
+        for func in functions
+    ]
+
+
+async def _aws_ecs_clusters(ecs) -> list:
+    """List ECS clusters with their service counts."""
+    arns = await _aws_paginate(ecs, "list_clusters", "clusterArns")
+    clusters = []
+    # describe_clusters accepts up to 100 ARNs and reports activeServicesCount,
+    # so one call per 100 clusters replaces a list_services call per cluster
+    for chunk in [arns[i:i + 100] for i in range(0, len(arns), 100)]:
+        described = (await ecs.describe_clusters(clusters=chunk, include=["STATISTICS"])).get("clusters", [])
+        for cluster in described:
+            clusters.append({
+                "cluster": cluster.get("clusterName"),
+                "services": cluster.get("activeServicesCount", 0)
+            })
+    return clusters
+
+
+async def _aws_eks_clusters(eks) -> list:
+    """List EKS cluster names."""
+    return [{"cluster": cluster} for cluster in await _aws_paginate(eks, "list_clusters", "clusters")]
+
+
+async def _aws_rds_instances(rds, region: str) -> list:
+    """List RDS database instances."""
+    dbs = await _aws_paginate(rds, "describe_db_instances", "DBInstances")
+    return [
+        {
+            "id": db.get("DBInstanceIdentifier"),
+            "engine": db.get("Engine"),
+            "size": db.get("DBInstanceClass"),
+            "storage_gb": db.get("AllocatedStorage"),
+            "region": region,
+            "status": db.get("DBInstanceStatus")
+        }
+        for db in dbs
+    ]
+
+
+# Per-item follow-up calls (describe_table, get_topic_attributes, ...) in flight
+# per listing; control-plane APIs throttle bursts of these well before the
+# data plane does
+_AWS_FOLLOW_UP_CONCURRENCY = 8
+
+
+async def _aws_for_each(items: list, call) -> list:
+    """
+    Await call(item) for every item concurrently, a few at a time.
+
+    Replaces one-by-one follow-up calls after a listing, so the latency is
+    roughly len(items) / _AWS_FOLLOW_UP_CONCURRENCY round trips instead of
+    len(items).
+
+    Returns:
+        list: Results in the order of items
+    """
+    semaphore = asyncio.Semaphore(_AWS_FOLLOW_UP_CONCURRENCY)
+
+    async def bounded(item):
+        async with semaphore:
+            return await call(item)
+
+    return await asyncio.gather(*[bounded(item) for item in items])
+
+
+async def _aws_dynamodb_tables(dynamodb) -> list:
+    """List DynamoDB tables with status and size, describing tables concurrently."""
+    async def describe(table):
+        return (await dynamodb.describe_table(TableName=table)).get("Table", {})
+
+    names = await _aws_paginate(dynamodb, "list_tables", "TableNames")
+    described = await _aws_for_each(names, describe)
+    return [
+        {
+            "name": table,
+            "status": details.get("TableStatus"),
+            "item_count": details.get("ItemCount"),
+            "size_bytes": details.get("TableSizeBytes")
+        }
+        for table, details in zip(names, described)
+    ]
+
+
+async def _aws_elasticache_clusters(elasticache) -> list:
+    """List ElastiCache clusters."""
+    clusters = await _aws_paginate(elasticache, "describe_cache_clusters", "CacheClusters")
+    return [
+        {
+            "id": cluster.get("CacheClusterId"),
+            "engine": cluster.get("Engine"),
+            "node_type": cluster.get("CacheNodeType"),
+            "status": cluster.get("CacheClusterStatus")
+        }
+        for cluster in clusters
+    ]
+
+
+async def _aws_s3_bucket_settings(s3, bucket: dict) -> None:
+    """Record on one bucket entry whether default encryption and versioning are enabled."""
+    name = bucket["bucket"]
+
+    async def encryption():
+        try:
+            config = await s3.get_bucket_encryption(Bucket=name)
+        except ClientError:
+            # ServerSideEncryptionConfigurationNotFoundError, or no access to check
+            return False
+        return bool(config.get("ServerSideEncryptionConfiguration", {}).get("Rules"))
+
+    async def versioning():
+        try:
+            status = await s3.get_bucket_versioning(Bucket=name)
+        except ClientError:
+            return False
+        return status.get("Status") == "Enabled"
+
+    bucket["encryption"], bucket["versioning"] = await asyncio.gather(encryption(), versioning())
+
+
+async def _aws_s3_settings(s3, buckets: list) -> None:
+    """
+    Add encryption and versioning flags (the fields analyze_aws_resources
+    checks) to listed S3 bucket entries in place, a few buckets at a time.
+
+    Each entry is updated as soon as its own calls finish, so when the caller
+    gives up early the buckets already checked keep their flags and the rest
+    simply lack them.
+    """
+    await _aws_for_each(buckets, lambda bucket: _aws_s3_bucket_settings(s3, bucket))
+
+
+async def _aws_s3_buckets(s3, region: str) -> list:
+    """List S3 buckets."""
+    return [{"bucket": b.get("Name"), "region": region} for b in await _aws_paginate(s3, "list_buckets", "Buckets")]
+
+
+async def _aws_ebs_volumes(ec2, region: str, filters: list = None) -> list:
+    """List EBS volumes, flagging unattached ones as unused."""
+    volumes = await _aws_paginate(
+        ec2, "describe_volumes", "Volumes", page_size=500, **({"Filters": filters} if filters else {})
+    )
+    return [
+        {
+            "id": vol.get("VolumeId"),
+            "size_gb": vol.get("Size"),
+            "type": vol.get("VolumeType"),
+            "state": vol.get("State"),
+            "region": region,
+            "unused": len(vol.get("Attachments", [])) == 0
+        }
+        for vol in volumes
+    ]
+
+
+async def _aws_vpcs(ec2) -> list:
+    """List VPCs."""
+    vpcs = await _aws_paginate(ec2, "describe_vpcs", "Vpcs", page_size=1000)
+    return [{"id": v.get("VpcId"), "cidr": v.get("CidrBlock")} for v in vpcs]
+
+
+async def _aws_security_groups(ec2) -> list:
+    """List security groups with their ingress rules flattened to one entry per CIDR."""
+    sgs = await _aws_paginate(ec2, "describe_security_groups", "SecurityGroups", page_size=1000)
+    return [
+        {
+            "id": sg.get("GroupId"),
+            "name": sg.get("GroupName"),
+            "vpc_id": sg.get("VpcId"),
+            "rules": [
+                {
+                    "cidr": cidr,
+                    "protocol": perm.get("IpProtocol"),
+                    "from_port": perm.get("FromPort"),
+                    "to_port": perm.get("ToPort"),
+                }
+                for perm in sg.get("IpPermissions", ())
+                for cidr in [r.get("CidrIp") for r in perm.get("IpRanges", ())]
+                + [r.get("CidrIpv6") for r in perm.get("Ipv6Ranges", ())]
+            ],
+        }
+        for sg in sgs
+    ]
+
+
+async def _aws_load_balancers(elb) -> list:
+    """List classic load balancers."""
+    lbs = await _aws_paginate(elb, "describe_load_balancers", "LoadBalancerDescriptions")
+    return [{"name": lb.get("LoadBalancerName"), "dns": lb.get("DNSName")} for lb in lbs]
+
+
+async def _aws_cloudfront_distributions(cloudfront) -> list:
+    """List CloudFront distributions."""
+    dist = await _aws_paginate(cloudfront, "list_distributions", "DistributionList.Items")
+    return [
+        {"id": d.get("Id"), "domain": d.get("DomainName"), "status": d.get("Status")} 
+        for d in dist
+    ]
+
+
+async def _aws_route53_zones(route53) -> list:
+    """List Route53 hosted zones."""
+    zones = await _aws_paginate(route53, "list_hosted_zones", "HostedZones")
+    return [
+        {
+            "id": zone.get("Id"),
+            "name": zone.get("Name"),
+            "record_count": zone.get("ResourceRecordSetCount"),
+            "private": zone.get("Config", {}).get("PrivateZone", False)
+        }
+        for zone in zones
+    ]
+
+
+async def _aws_rest_apis(apigateway) -> list:
+    """List API Gateway REST APIs."""
+    apis = []
+    for api in await _aws_paginate(apigateway, "get_rest_apis", "items"):
+        endpoint_types = (api.get("endpointConfiguration") or {}).get("types")
+        apis.append({
+            "id": api.get("id"),
+            "name": api.get("name"),
+            "endpoint": endpoint_types[0] if endpoint_types else "N/A",
+            "created": api.get("createdDate")
+        })
+    return apis
+
+
+async def _aws_sns_topics(sns) -> list:
+    """List SNS topics with confirmed subscription counts, fetching attributes concurrently."""
+    async def attributes(arn):
+        return (await sns.get_topic_attributes(TopicArn=arn)).get("Attributes", {})
+
+    arns = [topic.get("TopicArn") for topic in await _aws_paginate(sns, "list_topics", "Topics")]
+    return [
+        {
+            "name": arn.split(":")[-1],
+            "arn": arn,
+            "subscriptions": attrs.get("SubscriptionsConfirmed", "0")
+        }
+        for arn, attrs in zip(arns, await _aws_for_each(arns, attributes))
+    ]
+
+
+async def _aws_sqs_queues(sqs) -> list:
+    """List SQS queues with approximate message counts, fetching attributes concurrently."""
+    async def attributes(queue_url):
+        response = await sqs.get_queue_attributes(
+            QueueUrl=queue_url, AttributeNames=["ApproximateNumberOfMessages"]
+        )
+        return response.get("Attributes", {})
+
+    urls = await _aws_paginate(sqs, "list_queues", "QueueUrls")
+    return [
+        {
+            "name": queue_url.split("/")[-1],
+            "url": queue_url,
+            "messages": attrs.get("ApproximateNumberOfMessages", "0")
+        }
+        for queue_url, attrs in zip(urls, await _aws_for_each(urls, attributes))
+    ]
+
+
+async def _aws_iam_principals(iam) -> dict:
+    """List IAM users and roles."""
+    users = await _aws_paginate(iam, "list_users", "Users")
+    roles = await _aws_paginate(iam, "list_roles", "Roles")
     return {
-        "count": len(snapshots),
-        "snapshots": [
-            {
-                "tenant_id": s.tenant_id,
-                "provider": s.provider,
-                "snapshot_time": s.snapshot_time.isoformat(),
-                "data": s.data
-            }
-            for s in snapshots
-        ]
+        "users": [{"name": u.get("UserName")} for u in users],
+        "roles": [{"name": r.get("RoleName")} for r in roles]
     }
 
-async def fetch_aws_resources(client_id: int, credentials: dict):
+
+async def _aws_kms_keys(kms) -> list:
+    """List KMS key IDs."""
+    return [{"key_id": k.get("KeyId")} for k in await _aws_paginate(kms, "list_keys", "Keys")]
+
+
+@_tenant_scoped
+async def fetch_aws_resources(client_id: int, credentials: dict, mode: Literal["all", "cost"] = "all"):
     """
     Fetch comprehensive AWS resource inventory across all major services.
     
-    This function connects to AWS using boto3 and retrieves resources from compute,
+    This function connects to AWS using aioboto3 and retrieves resources from compute,
     database, storage, networking, security, messaging, and API services. It uses
     aggressive timeout settings (3s connect, 5s read) to prevent hanging on failed
     API calls, making it suitable for multi-tenant environments where credentials
@@ -224,6 +1345,11 @@ async def fetch_aws_resources(client_id: int, credentials: dict):
             - clientId or access_key (str): AWS Access Key ID (required)
             - clientSecret or secret_key (str): AWS Secret Access Key (required)
             - region (str, optional): AWS region to query. Defaults to "us-east-1"
+        mode (str): "all" (default) for the full inventory. "cost" filters at the
+            API: EC2 skips terminated/shutting-down instances and EBS returns only
+            unattached ("available") volumes. S3 buckets also carry the
+            encryption/versioning flags the recommendations analyzer checks,
+            read after the listing; buckets not reached in time lack them.
     
     Returns:
         dict: Nested resource inventory with structure:
@@ -246,7 +1372,8 @@ async def fetch_aws_resources(client_id: int, credentials: dict):
                 },
                 "networking": {
                     "vpc": [{"id", "cidr", "is_default"}],
-                    "sg": [{"id", "name", "vpc_id"}],
+                    "sg": [{"id", "name", "vpc_id",
+                            "rules": [{"cidr", "protocol", "from_port", "to_port"}]}],
                     "elb": [{"name", "type", "scheme"}],
                     "cloudfront": [{"id", "domain_name", "status"}],
                     "route53": [{"id", "name", "type"}]
@@ -262,19 +1389,23 @@ async def fetch_aws_resources(client_id: int, credentials: dict):
                 "api": {
                     "api_gateway": [{"id", "name", "protocol"}]
                 },
+                "errors": [{"service": "describe_instances", "error": "truncated at 5000 items"}],
                 "error": "Error message if credentials are missing"
             }
+        "errors" is present only when a listing hit _AWS_MAX_ITEMS.
     
     Raises:
-        Does not raise exceptions. All boto3 errors are caught, logged to stdout,
+        Does not raise exceptions. All boto3 errors are caught, logged,
         and result in empty arrays for affected services. This allows partial
         data collection even when some AWS services are inaccessible.
     
     Timeout Configuration:
         - Connection timeout: 3 seconds
         - Read timeout: 5 seconds
-        - Max retries: 1
+        - Retries: up to 3 attempts in adaptive mode (client-side rate limiting
+          when AWS throttles)
         This aggressive timeout prevents hanging on slow/failed API calls.
+        Sessions are cached per credential set (see _aws_session).
     
     Permissions Required:
         Minimum IAM permissions for full inventory:
@@ -283,7 +1414,7 @@ async def fetch_aws_resources(client_id: int, credentials: dict):
         - S3: ListBuckets
         - AutoScaling: DescribeAutoScalingGroups
         - Lambda: ListFunctions
-        - ECS: ListClusters, ListServices
+        - ECS: ListClusters, DescribeClusters
         - EKS: ListClusters
         - DynamoDB: ListTables, DescribeTable
         - ElastiCache: DescribeCacheClusters
@@ -326,7 +1457,6 @@ async def fetch_aws_resources(client_id: int, credentials: dict):
             }
         }
     """
-    import boto3
     try:
         # Extract AWS credentials from metadata (supports multiple key names for flexibility)
         access_key = credentials.get("clientId") or credentials.get("access_key")
@@ -335,318 +1465,307 @@ async def fetch_aws_resources(client_id: int, credentials: dict):
         
         # Validate required credentials are present
         if not (access_key and secret_key):
-            return {
-                "compute": {"ec2": [], "asg": [], "lambda": [], "ecs": [], "eks": []},
-                "database": {"rds": [], "dynamodb": [], "elasticache": []},
-                "storage": {"s3": [], "ebs": []},
-                "networking": {"vpc": [], "sg": [], "elb": [], "cloudfront": [], "route53": []},
-                "security": {"iam": [], "kms": []},
-                "messaging": {"sns": [], "sqs": []},
-                "api": {"api_gateway": []},
-                "error": "Missing AWS credentials"
-            }
+            return _empty_inventory(_AWS_INVENTORY, "Missing AWS credentials")
 
-        # Configure boto3 with aggressive timeouts to prevent hanging
-        config = Config(
-            connect_timeout=3,
-            read_timeout=5,
-            retries={'max_attempts': 1, 'mode': 'standard'}
-        )
+        result = _empty_inventory(_AWS_INVENTORY)
+        truncated = []
+        _aws_truncated.set(truncated)
 
-        session = boto3.Session(
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
-        ec2 = session.client("ec2", config=config)
-        rds = session.client("rds", config=config)
-        s3 = session.client("s3", config=config)
-        autoscaling = session.client("autoscaling", config=config)
-        ecs = session.client("ecs", config=config)
-        eks = session.client("eks", config=config)
-        lambda_client = session.client("lambda", config=config)
-        dynamodb = session.client("dynamodb", config=config)
-        elasticache = session.client("elasticache", config=config)
-        iam = session.client("iam", config=config)
-        kms = session.client("kms", config=config)
-        cloudfront = session.client("cloudfront", config=config)
-        route53 = session.client("route53", config=config)
-        apigateway = session.client("apigateway", config=config)
-        sns = session.client("sns", config=config)
-        sqs = session.client("sqs", config=config)
-
-        result = {
-            "compute": {"ec2": [], "asg": [], "lambda": [], "ecs": [], "eks": []},
-            "database": {"rds": [], "dynamodb": [], "elasticache": []},
-            "storage": {"s3": [], "ebs": []},
-            "networking": {"vpc": [], "sg": [], "elb": [], "cloudfront": [], "route53": []},
-            "security": {"iam": [], "kms": []},
-            "messaging": {"sns": [], "sqs": []},
-            "api": {"api_gateway": []},
-        }
+        async def run(clients, fn, service, *args):
+            async with _provider_slot("aws", _AWS_CONCURRENCY):
+                return await asyncio.wait_for(fn(await clients.client(service), *args), _AWS_SERVICE_TIMEOUT)
 
-        # EC2 Instances
-        try:
-            reservations = ec2.describe_instances().get("Reservations", [])
-            for res in reservations:
-                for inst in res.get("Instances", []):
-                    # Extract OS platform information
-                    platform = inst.get("Platform", "Linux/Unix")  # Default to Linux if not specified
-                    platform_details = inst.get("PlatformDetails", "")
-                    
-                    # Get image info for more OS details
-                    image_id = inst.get("ImageId")
-                    os_info = platform_details if platform_details else platform
-                    
-                    # Get IP addresses
-                    private_ip = inst.get("PrivateIpAddress")
-                    public_ip = inst.get("PublicIpAddress")
-                    
-                    result["compute"]["ec2"].append({
-                        "id": inst.get("InstanceId"),
-                        "type": inst.get("InstanceType"),
-                        "state": inst.get("State", {}).get("Name"),
-                        "os_type": os_info,
-                        "platform": platform,
-                        "image_id": image_id,
-                        "private_ip": private_ip,
-                        "public_ip": public_ip,
-                        "region": region,
-                        "launch_time": inst.get("LaunchTime").isoformat() if inst.get("LaunchTime") else None
-                    })
-        except Exception as e:
-            print(f"Error fetching AWS EC2: {e}")
+        cost_filters = _AWS_COST_FILTERS if mode == "cost" else {}
 
-        # Auto Scaling Groups
-        try:
-            asgs = autoscaling.describe_auto_scaling_groups().get("AutoScalingGroups", [])
-            for asg in asgs:
-                result["compute"]["asg"].append({
-                    "name": asg.get("AutoScalingGroupName"),
-                    "desired_capacity": asg.get("DesiredCapacity"),
-                    "current_size": len(asg.get("Instances", [])),
-                    "min_size": asg.get("MinSize"),
-                    "max_size": asg.get("MaxSize")
-                })
-        except Exception as e:
-            print(f"Error fetching AWS ASG: {e}")
+        # Every service is independent, so all describe/list calls run concurrently
+        # on the event loop: total latency becomes the slowest call, not the sum.
+        # (category, resource key, label for error logs, fetch helper, boto service, extra args)
+        jobs = [
+            ("compute", "ec2", "EC2", _aws_ec2_instances, "ec2", (region, cost_filters.get("ec2"))),
+            ("compute", "asg", "ASG", _aws_auto_scaling_groups, "autoscaling", ()),
+            ("compute", "lambda", "Lambda", _aws_lambda_functions, "lambda", ()),
+            ("compute", "ecs", "ECS", _aws_ecs_clusters, "ecs", ()),
+            ("compute", "eks", "EKS", _aws_eks_clusters, "eks", ()),
+            ("database", "rds", "RDS", _aws_rds_instances, "rds", (region,)),
+            ("database", "dynamodb", "DynamoDB", _aws_dynamodb_tables, "dynamodb", ()),
+            ("database", "elasticache", "ElastiCache", _aws_elasticache_clusters, "elasticache", ()),
+            ("storage", "s3", "S3", _aws_s3_buckets, "s3", (region,)),
+            ("storage", "ebs", "EBS", _aws_ebs_volumes, "ec2", (region, cost_filters.get("ebs"))),
+            ("networking", "vpc", "VPC", _aws_vpcs, "ec2", ()),
+            ("networking", "sg", "SGs", _aws_security_groups, "ec2", ()),
+            ("networking", "elb", "ELB", _aws_load_balancers, "elb", ()),
+            ("networking", "cloudfront", "CloudFront", _aws_cloudfront_distributions, "cloudfront", ()),
+            ("networking", "route53", "Route53", _aws_route53_zones, "route53", ()),
+            ("api", "api_gateway", "API Gateway", _aws_rest_apis, "apigateway", ()),
+            ("messaging", "sns", "SNS", _aws_sns_topics, "sns", ()),
+            ("messaging", "sqs", "SQS", _aws_sqs_queues, "sqs", ()),
+            ("security", "iam", "IAM", _aws_iam_principals, "iam", ()),
+            ("security", "kms", "KMS", _aws_kms_keys, "kms", ()),
+        ]
+        # One open client per service, shared between jobs (EC2 serves four of
+        # them) and kept for later fetches with the same credentials
+        async with _aws_clients(access_key, secret_key, region) as clients:
+            outcomes = await asyncio.gather(
+                *[run(clients, fn, service, *args) for _, _, _, fn, service, args in jobs],
+                return_exceptions=True
+            )
 
-        # Lambda Functions
-        try:
-            functions = lambda_client.list_functions().get("Functions", [])
-            for func in functions:
-                result["compute"]["lambda"].append({
-                    "name": func.get("FunctionName"),
-                    "runtime": func.get("Runtime"),
-                    "memory_mb": func.get("MemorySize"),
-                    "timeout_s": func.get("Timeout"),
-                    "last_modified": func.get("LastModified")
-                })
-        except Exception as e:
-            print(f"Error fetching AWS Lambda: {e}")
+            # Result shaping is pure Python and stays serial
+            for (category, key, label, _, _, _), outcome in zip(jobs, outcomes):
+                if isinstance(outcome, asyncio.TimeoutError):
+                    logger.warning("AWS %s timed out after %ss", label, _AWS_SERVICE_TIMEOUT)
+                    continue
+                if isinstance(outcome, Exception):
+                    logger.warning("Error fetching AWS %s: %s", label, outcome)
+                    continue
+                result[category][key] = outcome
 
-        # ECS Clusters
-        try:
-            clusters = ecs.list_clusters().get("clusterArns", [])
-            for cluster_arn in clusters:
-                cluster_name = cluster_arn.split("/")[-1]
-                services = ecs.list_services(cluster=cluster_name).get("serviceArns", [])
-                result["compute"]["ecs"].append({
-                    "cluster": cluster_name,
-                    "services": len(services)
-                })
-        except Exception as e:
-            print(f"Error fetching AWS ECS: {e}")
+            # The analyzer's S3 checks need per-bucket settings; read them after
+            # the listing under their own budget so a slow account keeps its
+            # bucket list and whatever settings arrived in time
+            buckets = result["storage"]["s3"]
+            if mode == "cost" and buckets:
+                try:
+                    async with _provider_slot("aws", _AWS_CONCURRENCY):
+                        await asyncio.wait_for(
+                            _aws_s3_settings(await clients.client("s3"), buckets), _AWS_S3_SETTINGS_TIMEOUT
+                        )
+                except asyncio.TimeoutError:
+                    logger.warning("AWS S3 settings timed out after %ss; some buckets unchecked", _AWS_S3_SETTINGS_TIMEOUT)
+                except Exception as e:
+                    logger.warning("Error fetching AWS S3 settings: %s", e)
 
-        # EKS Clusters
-        try:
-            clusters = eks.list_clusters().get("clusters", [])
-            for cluster in clusters:
-                result["compute"]["eks"].append({"cluster": cluster})
-        except Exception as e:
-            print(f"Error fetching AWS EKS: {e}")
+        if truncated:
+            result["errors"] = [
+                {"service": operation, "error": f"truncated at {_AWS_MAX_ITEMS} items"} for operation in truncated
+            ]
 
-        # RDS Instances
-        try:
-            dbs = rds.describe_db_instances().get("DBInstances", [])
-            for db in dbs:
-                result["database"]["rds"].append({
-                    "id": db.get("DBInstanceIdentifier"),
-                    "engine": db.get("Engine"),
-                    "size": db.get("DBInstanceClass"),
-                    "storage_gb": db.get("AllocatedStorage"),
-                    "region": region,
-                    "status": db.get("DBInstanceStatus")
-                })
-        except Exception as e:
-            print(f"Error fetching AWS RDS: {e}")
+        return result
+    except Exception as e:
+        logger.exception("Error in fetch_aws_resources for client %s: %s", client_id, e)
+        return _empty_inventory(_AWS_INVENTORY, str(e))
 
-        # DynamoDB Tables
-        try:
-            tables = dynamodb.list_tables().get("TableNames", [])
-            for table in tables:
-                details = dynamodb.describe_table(TableName=table).get("Table", {})
-                result["database"]["dynamodb"].append({
-                    "name": table,
-                    "status": details.get("TableStatus"),
-                    "item_count": details.get("ItemCount"),
-                    "size_bytes": details.get("TableSizeBytes")
-                })
-        except Exception as e:
-            print(f"Error fetching AWS DynamoDB: {e}")
+# Azure Resource Graph query covering every per-resource-group service in the
+# inventory, so one paginated call replaces a list call per (service, RG) pair
+_AZURE_GRAPH_QUERY = """
+Resources
+| where type in~ ('microsoft.network/virtualnetworks', 'microsoft.network/networksecuritygroups',
+                  'microsoft.network/loadbalancers', 'microsoft.keyvault/vaults',
+                  'microsoft.containerservice/managedclusters', 'microsoft.web/sites')
+| project name, type, location, resourceGroup, properties
+"""
 
-        # ElastiCache Clusters
-        try:
-            clusters = elasticache.describe_cache_clusters().get("CacheClusters", [])
-            for cluster in clusters:
-                result["database"]["elasticache"].append({
-                    "id": cluster.get("CacheClusterId"),
-                    "engine": cluster.get("Engine"),
-                    "node_type": cluster.get("CacheNodeType"),
-                    "status": cluster.get("CacheClusterStatus")
-                })
-        except Exception as e:
-            print(f"Error fetching AWS ElastiCache: {e}")
+# Resource Graph type -> (category, resource key, row shaper); shapes match the
+# per-resource-group SDK listing used as fallback
+_AZURE_GRAPH_SHAPES = {
+    "microsoft.network/virtualnetworks": ("networking", "vnet", lambda row: {
+        "id": row["name"],
+        "address_space": ((row.get("properties") or {}).get("addressSpace") or {}).get("addressPrefixes", []),
+        "location": row["location"],
+        "resource_group": row["resourceGroup"]
+    }),
+    "microsoft.network/networksecuritygroups": ("networking", "nsg", lambda row: {
+        "id": row["name"], "location": row["location"], "resource_group": row["resourceGroup"]
+    }),
+    "microsoft.network/loadbalancers": ("networking", "lb", lambda row: {
+        "id": row["name"], "location": row["location"], "resource_group": row["resourceGroup"]
+    }),
+    "microsoft.keyvault/vaults": ("security", "key_vault", lambda row: {
+        "id": row["name"], "location": row["location"], "resource_group": row["resourceGroup"]
+    }),
+    "microsoft.containerservice/managedclusters": ("compute", "aks", lambda row: {
+        "id": row["name"],
+        "location": row["location"],
+        "resource_group": row["resourceGroup"],
+        "kubernetes_version": (row.get("properties") or {}).get("kubernetesVersion")
+    }),
+    "microsoft.web/sites": ("compute", "app_service", lambda row: {
+        "id": row["name"],
+        "location": row["location"],
+        "resource_group": row["resourceGroup"],
+        "state": (row.get("properties") or {}).get("state")
+    }),
+}
 
-        # S3 Buckets
-        try:
-            buckets = s3.list_buckets().get("Buckets", [])
-            for b in buckets:
-                result["storage"]["s3"].append({"bucket": b.get("Name"), "region": region})
-        except Exception as e:
-            print(f"Error fetching AWS S3: {e}")
 
-        # EBS Volumes
-        try:
-            volumes = ec2.describe_volumes().get("Volumes", [])
-            for vol in volumes:
-                attachments = vol.get("Attachments", [])
-                result["storage"]["ebs"].append({
-                    "id": vol.get("VolumeId"),
-                    "size_gb": vol.get("Size"),
-                    "type": vol.get("VolumeType"),
-                    "state": vol.get("State"),
-                    "region": region,
-                    "unused": len(attachments) == 0
-                })
-        except Exception as e:
-            print(f"Error fetching AWS EBS: {e}")
+# Per-resource-group listings used when Resource Graph is unavailable:
+# (SDK module, client class, list method taking an RG name, category, resource key, item shaper)
+_AZURE_RG_SERVICES = [
+    ("azure.mgmt.network", "NetworkManagementClient", "virtual_networks.list", "networking", "vnet",
+     lambda vnet, rg: {
+         "id": vnet.name,
+         "address_space": (vnet.address_space.address_prefixes or []) if vnet.address_space else [],
+         "location": vnet.location,
+         "resource_group": rg
+     }),
+    ("azure.mgmt.network", "NetworkManagementClient", "network_security_groups.list", "networking", "nsg",
+     lambda nsg, rg: {"id": nsg.name, "location": nsg.location, "resource_group": rg}),
+    ("azure.mgmt.network", "NetworkManagementClient", "load_balancers.list", "networking", "lb",
+     lambda lb, rg: {"id": lb.name, "location": lb.location, "resource_group": rg}),
+    ("azure.mgmt.keyvault", "KeyVaultManagementClient", "vaults.list_by_resource_group", "security", "key_vault",
+     lambda vault, rg: {"id": vault.name, "location": vault.location, "resource_group": rg}),
+    ("azure.mgmt.containerservice", "ContainerServiceClient", "managed_clusters.list_by_resource_group", "compute", "aks",
+     lambda cluster, rg: {
+         "id": cluster.name,
+         "location": cluster.location,
+         "resource_group": rg,
+         "kubernetes_version": cluster.kubernetes_version
+     }),
+    ("azure.mgmt.web", "WebSiteManagementClient", "web_apps.list_by_resource_group", "compute", "app_service",
+     lambda app, rg: {
+         "id": app.name,
+         "location": app.location,
+         "resource_group": rg,
+         "state": app.state
+     }),
+]
 
-        # VPCs
-        try:
-            vpcs = ec2.describe_vpcs().get("Vpcs", [])
-            result["networking"]["vpc"] = [{"id": v.get("VpcId"), "cidr": v.get("CidrBlock")} for v in vpcs]
-        except Exception as e:
-            print(f"Error fetching AWS VPC: {e}")
 
-        # Security Groups
-        try:
-            sgs = ec2.describe_security_groups().get("SecurityGroups", [])
-            result["networking"]["sg"] = [{"id": sg.get("GroupId"), "name": sg.get("GroupName")} for sg in sgs]
-        except Exception as e:
-            print(f"Error fetching AWS SGs: {e}")
+def _azure_resource_graph(graph_client, subscription_id: str) -> list:
+    """
+    Run the inventory Resource Graph query, following skip tokens.
 
-        # Load Balancers
-        try:
-            elb = session.client("elb")
-            lbs = elb.describe_load_balancers().get("LoadBalancerDescriptions", [])
-            result["networking"]["elb"] = [{"name": lb.get("LoadBalancerName"), "dns": lb.get("DNSName")} for lb in lbs]
-        except Exception as e:
-            print(f"Error fetching AWS ELB: {e}")
+    Args:
+        graph_client: azure.mgmt.resourcegraph.ResourceGraphClient
+        subscription_id (str): Subscription to query
 
-        # CloudFront Distributions
-        try:
-            dist = cloudfront.list_distributions().get("DistributionList", {})
-            result["networking"]["cloudfront"] = [
-                {"id": d.get("Id"), "domain": d.get("DomainName"), "status": d.get("Status")} 
-                for d in dist.get("Items", [])
-            ]
-        except Exception as e:
-            print(f"Error fetching AWS CloudFront: {e}")
+    Returns:
+        list: Resource rows (dicts with name, type, location, resourceGroup, properties)
+    """
+    from azure.mgmt.resourcegraph.models import QueryRequest, QueryRequestOptions
 
-        # Route53 Hosted Zones
-        try:
-            zones = route53.list_hosted_zones().get("HostedZones", [])
-            for zone in zones:
-                result["networking"]["route53"].append({
-                    "id": zone.get("Id"),
-                    "name": zone.get("Name"),
-                    "record_count": zone.get("ResourceRecordSetCount"),
-                    "private": zone.get("Config", {}).get("PrivateZone", False)
-                })
-        except Exception as e:
-            print(f"Error fetching AWS Route53: {e}")
+    rows = []
+    skip_token = None
+    while True:
+        response = graph_client.resources(QueryRequest(
+            subscriptions=[subscription_id],
+            query=_AZURE_GRAPH_QUERY,
+            options=QueryRequestOptions(skip_token=skip_token, result_format="objectArray")
+        ))
+        rows.extend(response.data or [])
+        skip_token = response.skip_token
+        if not skip_token:
+            return rows
+
+
+def _azure_vm_ips(network_client, vm) -> tuple:
+    """
+    Resolve a VM's private and public IP from its network interfaces.
+
+    Blocking (one NIC get, plus a public IP get when attached); run via run_sync.
+
+    Returns:
+        tuple: (private_ip, public_ip), either may be None
+    """
+    private_ip = None
+    public_ip = None
+    for nic_ref in vm.network_profile.network_interfaces:
+        nic_id = nic_ref.id
+        nic_resource_group = nic_id.split('/')[4]
+        nic_name = nic_id.split('/')[-1]
+        nic = network_client.network_interfaces.get(nic_resource_group, nic_name)
+        if nic.ip_configurations:
+            for ip_config in nic.ip_configurations:
+                if ip_config.private_ip_address:
+                    private_ip = ip_config.private_ip_address
+                if ip_config.public_ip_address:
+                    public_ip_id = ip_config.public_ip_address.id
+                    public_ip_resource_group = public_ip_id.split('/')[4]
+                    public_ip_name = public_ip_id.split('/')[-1]
+                    public_ip_resource = network_client.public_ip_addresses.get(public_ip_resource_group, public_ip_name)
+                    public_ip = public_ip_resource.ip_address
+                if private_ip:  # Use first interface with IP
+                    break
+        if private_ip:
+            break
+    return private_ip, public_ip
+
+
+def _swallow(label: str):
+    """
+    Decorate an inventory listing coroutine so a failure is logged, not raised.
+
+    The wrapped coroutine returns None when the listing fails, letting the
+    caller keep the default (empty) entry for that service.
+
+    Args:
+        label (str): Service name used in the warning, e.g. "Azure disks"
+    """
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                logger.warning("Error fetching %s: %s", label, e)
+                return None
+        return wrapper
+    return decorator
+
+
+@_swallow("Azure storage accounts")
+async def _azure_storage_accounts(storage_client) -> list:
+    """List storage accounts in the subscription."""
+    return [
+        {
+            "id": account.id,
+            "account": account.name,
+            "location": account.location,
+            "sku": account.sku.name if account.sku else None,
+            "resource_group": account.id.split('/')[4]
+        }
+        for account in await _azure_call(storage_client.storage_accounts.list)
+    ]
 
-        # API Gateway REST APIs
-        try:
-            apis = apigateway.get_rest_apis().get("items", [])
-            for api in apis:
-                result["api"]["api_gateway"].append({
-                    "id": api.get("id"),
-                    "name": api.get("name"),
-                    "endpoint": api.get("endpointConfiguration", {}).get("types", [])[0] if api.get("endpointConfiguration", {}).get("types") else "N/A",
-                    "created": api.get("createdDate")
-                })
-        except Exception as e:
-            print(f"Error fetching AWS API Gateway: {e}")
 
-        # SNS Topics
-        try:
-            topics = sns.list_topics().get("Topics", [])
-            for topic in topics:
-                arn = topic.get("TopicArn")
-                attrs = sns.get_topic_attributes(TopicArn=arn).get("Attributes", {})
-                result["messaging"]["sns"].append({
-                    "name": arn.split(":")[-1],
-                    "arn": arn,
-                    "subscriptions": attrs.get("SubscriptionsConfirmed", "0")
-                })
-        except Exception as e:
-            print(f"Error fetching AWS SNS: {e}")
+@_swallow("Azure disks")
+async def _azure_disks(compute_client) -> list:
+    """List managed disks, flagging unattached ones."""
+    return [
+        {
+            "id": disk.name,
+            "size_gb": disk.disk_size_gb,
+            "location": disk.location,
+            "managed_by": disk.managed_by,
+            "unused": not bool(disk.managed_by)
+        }
+        for disk in await _azure_call(compute_client.disks.list)
+    ]
 
-        # SQS Queues
-        try:
-            queues = sqs.list_queues().get("QueueUrls", [])
-            for queue_url in queues:
-                attrs = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=["All"]).get("Attributes", {})
-                result["messaging"]["sqs"].append({
-                    "name": queue_url.split("/")[-1],
-                    "url": queue_url,
-                    "messages": attrs.get("ApproximateNumberOfMessages", "0")
-                })
-        except Exception as e:
-            print(f"Error fetching AWS SQS: {e}")
 
-        # IAM Users & Roles
-        try:
-            users = iam.list_users().get("Users", [])
-            roles = iam.list_roles().get("Roles", [])
-            result["security"]["iam"] = {
-                "users": [{"name": u.get("UserName")} for u in users],
-                "roles": [{"name": r.get("RoleName")} for r in roles]
+@_swallow("Azure SQL servers")
+async def _azure_sql_databases(sql_client) -> list:
+    """List the user databases of every SQL server concurrently; a failing server is skipped."""
+    servers = await _azure_call(sql_client.servers.list)
+    db_lists = await asyncio.gather(
+        *[
+            _azure_call(sql_client.databases.list_by_server, server.id.split('/')[4], server.name)
+            for server in servers
+        ],
+        return_exceptions=True
+    )
+    databases = []
+    for server, db_list in zip(servers, db_lists):
+        resource_group = server.id.split('/')[4]
+        if isinstance(db_list, Exception):
+            logger.warning("Error fetching databases for server %s: %s", server.name, db_list)
+            continue
+        databases.extend(
+            {
+                "id": f"{server.name}/{db.name}",
+                "engine": "mssql",
+                "storage_gb": (db.max_size_bytes or 0) / (1024**3),
+                "sku": db.sku.name if db.sku else "unknown",
+                "location": db.location,
+                "resource_group": resource_group
             }
-        except Exception as e:
-            print(f"Error fetching AWS IAM: {e}")
-
-        # KMS Keys
-        try:
-            keys = kms.list_keys().get("Keys", [])
-            result["security"]["kms"] = [{"key_id": k.get("KeyId")} for k in keys]
-        except Exception as e:
-            print(f"Error fetching AWS KMS: {e}")
+            for db in db_list
+            if db.name != "master"
+        )
+    return databases
 
-        return result
-    except Exception as e:
-        print(f"Error in fetch_aws_resources: {e}")
-        return {
-            "compute": {"ec2": [], "asg": [], "lambda": [], "ecs": [], "eks": []},
-            "database": {"rds": [], "dynamodb": [], "elasticache": []},
-            "storage": {"s3": [], "ebs": []},
-            "networking": {"vpc": [], "sg": [], "elb": [], "cloudfront": []},
-            "security": {"iam": [], "kms": []},
-            "error": str(e)
-        }
 
+@_tenant_scoped
 async def fetch_azure_resources(client_id: int, credentials: dict):
     """
     Fetch comprehensive Azure resource inventory using Azure Management SDK.
@@ -752,312 +1871,585 @@ async def fetch_azure_resources(client_id: int, credentials: dict):
         
         # Validate all required credentials are present
         if not all([tenant_id, client_id_azure, client_secret, subscription_id]):
-            return {
-                "compute": {"vm": [], "app_service": [], "aks": []},
-                "database": {"sql": [], "cosmos": [], "mysql": []},
-                "storage": {"storage_account": [], "blob": []},
-                "networking": {"vnet": [], "nsg": [], "lb": []},
-                "security": {"key_vault": [], "managed_identity": []},
-                "error": "Incomplete Azure credentials"
-            }
+            return _empty_inventory(_AZURE_INVENTORY, "Incomplete Azure credentials")
         
-        credential = ClientSecretCredential(
-            tenant_id=tenant_id,
-            client_id=client_id_azure,
-            client_secret=client_secret
-        )
-        
-        # Initialize Azure management clients
-        compute_client = ComputeManagementClient(credential, subscription_id)
-        storage_client = StorageManagementClient(credential, subscription_id)
-        sql_client = SqlManagementClient(credential, subscription_id)
-        resource_client = ResourceManagementClient(credential, subscription_id)
+        credential = _azure_credential(tenant_id, client_id_azure, client_secret)
 
-        # Import additional clients (optional) and handle missing SDK packages gracefully
-        network_client = keyvault_client = aks_client = appservice_client = None
+        # Clients used by every run
+        compute_client = ComputeManagementClient(credential, subscription_id, **_AZURE_CLIENT_OPTIONS)
+        storage_client = StorageManagementClient(credential, subscription_id, **_AZURE_CLIENT_OPTIONS)
+        sql_client = SqlManagementClient(credential, subscription_id, **_AZURE_CLIENT_OPTIONS)
+
+        # Optional clients are imported and built on first use, so services that
+        # are skipped (e.g. the per-RG fallback when Resource Graph answers) never
+        # allocate an HTTP pipeline; a missing SDK package yields None.
         missing_sdk = []
-        try:
-            from azure.mgmt.network import NetworkManagementClient
-            network_client = NetworkManagementClient(credential, subscription_id)
-        except Exception as e:
-            missing_sdk.append('azure.mgmt.network')
-        try:
-            from azure.mgmt.keyvault import KeyVaultManagementClient
-            keyvault_client = KeyVaultManagementClient(credential, subscription_id)
-        except Exception as e:
-            missing_sdk.append('azure.mgmt.keyvault')
-        try:
-            from azure.mgmt.containerservice import ContainerServiceClient
-            aks_client = ContainerServiceClient(credential, subscription_id)
-        except Exception as e:
-            missing_sdk.append('azure.mgmt.containerservice')
-        try:
-            from azure.mgmt.web import WebSiteManagementClient
-            appservice_client = WebSiteManagementClient(credential, subscription_id)
-        except Exception as e:
-            missing_sdk.append('azure.mgmt.web')
-
-        result = {
-            "compute": {"vm": [], "app_service": [], "aks": []},
-            "database": {"sql": [], "cosmos": [], "mysql": []},
-            "storage": {"storage_account": [], "blob": []},
-            "networking": {"vnet": [], "nsg": [], "lb": []},
-            "security": {"key_vault": [], "managed_identity": []},
-        }
+
+        @lru_cache(maxsize=None)
+        def optional_client(module_name: str, class_name: str, per_subscription: bool = True):
+            try:
+                client_cls = getattr(importlib.import_module(module_name), class_name)
+                if per_subscription:
+                    return client_cls(credential, subscription_id, **_AZURE_CLIENT_OPTIONS)
+                return client_cls(credential, **_AZURE_CLIENT_OPTIONS)
+            except Exception:
+                missing_sdk.append(module_name)
+                return None
+
+        def network_client():
+            return optional_client("azure.mgmt.network", "NetworkManagementClient")
+
+        result = _empty_inventory(_AZURE_INVENTORY)
         errors = []
 
-        # VMs
-        try:
-            vm_iter = safe_iter(compute_client.virtual_machines.list_all())
-            for vm in vm_iter:
-                resource_group = vm.id.split('/')[4]
-                power_state = "unknown"
-                try:
-                    instance_view = compute_client.virtual_machines.instance_view(resource_group, vm.name)
-                    if instance_view and getattr(instance_view, "statuses", None):
-                        for status in instance_view.statuses:
-                            if getattr(status, "code", "").startswith('PowerState/'):
-                                power_state = status.code.split('/')[-1]
-                except Exception as iv_err:
-                    print(f"Azure VM instance_view failed for {vm.name}: {iv_err}")
-
-                # Extract OS information
-                os_type = None
-                os_version = None
-                computer_name = None
-                if vm.storage_profile:
-                    if vm.storage_profile.os_disk:
-                        os_type = getattr(vm.storage_profile.os_disk, 'os_type', None)
-                    if vm.storage_profile.image_reference:
-                        img_ref = vm.storage_profile.image_reference
-                        publisher = getattr(img_ref, 'publisher', '')
-                        offer = getattr(img_ref, 'offer', '')
-                        sku = getattr(img_ref, 'sku', '')
-                        if publisher or offer or sku:
-                            os_version = f"{publisher} {offer} {sku}".strip()
-                if vm.os_profile:
-                    computer_name = getattr(vm.os_profile, 'computer_name', None)
-
-                # Get IP addresses from network interfaces
-                private_ip = None
-                public_ip = None
-                if network_client and vm.network_profile:
+        async def list_vms():
+            # VMs. Power state comes from a single statusOnly listing joined on VM id,
+            # instead of one instance_view round-trip per VM.
+            try:
+                vm_iter, vm_status_iter = await asyncio.gather(
+                    _azure_call(compute_client.virtual_machines.list_all),
+                    _azure_call(compute_client.virtual_machines.list_all, status_only="true"),
+                    return_exceptions=True
+                )
+                if isinstance(vm_iter, Exception):
+                    raise vm_iter
+                power_states = {}
+                if isinstance(vm_status_iter, Exception):
+                    logger.warning("Azure VM status listing failed: %s", vm_status_iter)
+                else:
+                    for vm in vm_status_iter:
+                        statuses = (vm.instance_view.statuses if vm.instance_view else None) or []
+                        power_states[vm.id.lower()] = next(
+                            (s.code.split('/')[-1] for s in statuses if s.code and s.code.startswith('PowerState/')),
+                            "unknown"
+                        )
+
+                # NIC/public IP lookups are per VM; run them concurrently under
+                # the Azure limits instead of one VM after another
+                async def vm_ips(vm):
+                    if not (vm.network_profile and network_client()):
+                        return None, None
                     try:
-                        for nic_ref in vm.network_profile.network_interfaces:
-                            nic_id = nic_ref.id
-                            nic_resource_group = nic_id.split('/')[4]
-                            nic_name = nic_id.split('/')[-1]
-                            nic = network_client.network_interfaces.get(nic_resource_group, nic_name)
-                            if nic.ip_configurations:
-                                for ip_config in nic.ip_configurations:
-                                    if ip_config.private_ip_address:
-                                        private_ip = ip_config.private_ip_address
-                                    if ip_config.public_ip_address:
-                                        public_ip_id = ip_config.public_ip_address.id
-                                        public_ip_resource_group = public_ip_id.split('/')[4]
-                                        public_ip_name = public_ip_id.split('/')[-1]
-                                        public_ip_resource = network_client.public_ip_addresses.get(public_ip_resource_group, public_ip_name)
-                                        public_ip = public_ip_resource.ip_address
-                                    if private_ip:  # Use first interface with IP
-                                        break
-                            if private_ip:
-                                break
+                        return await _azure_run(_azure_vm_ips, network_client(), vm)
                     except Exception as ip_err:
-                        print(f"Error fetching Azure VM IPs for {vm.name}: {ip_err}")
+                        logger.warning("Error fetching Azure VM IPs for %s: %s", vm.name, ip_err)
+                        return None, None
 
-                result["compute"]["vm"].append({
-                    "id": vm.name,
-                    "size": getattr(vm.hardware_profile, "vm_size", None),
-                    "state": power_state,
-                    "os_type": os_type,
-                    "os_version": os_version,
-                    "computer_name": computer_name,
-                    "private_ip": private_ip,
-                    "public_ip": public_ip,
-                    "location": vm.location,
-                    "resource_group": resource_group
-                })
-        except HttpResponseError as e:
-            errors.append({"service": "vm", "code": getattr(e, "status_code", "HttpResponseError")})
-        except Exception as e:
-            print(f"Error fetching Azure VMs: {e}")
+                vm_addresses = await asyncio.gather(*[vm_ips(vm) for vm in vm_iter])
+                for vm, (private_ip, public_ip) in zip(vm_iter, vm_addresses):
+                    resource_group = vm.id.split('/')[4]
+                    power_state = power_states.get(vm.id.lower(), "unknown")
 
-        # Storage Accounts
-        try:
-            storage_iter = safe_iter(storage_client.storage_accounts.list())
-            for account in storage_iter:
-                result["storage"]["storage_account"].append({
-                    "id": account.id,
-                    "account": account.name,
-                    "location": account.location,
-                    "sku": getattr(account.sku, 'name', None),
-                    "resource_group": account.id.split('/')[4]
-                })
-        except Exception as e:
-            print(f"Error fetching Azure storage accounts: {e}")
+                    # Extract OS information
+                    os_type = None
+                    os_version = None
+                    computer_name = None
+                    # SDK models always define their attributes (None when
+                    # absent), so plain reads replace getattr defaults
+                    storage_profile = vm.storage_profile
+                    if storage_profile:
+                        if storage_profile.os_disk:
+                            os_type = storage_profile.os_disk.os_type
+                        img_ref = storage_profile.image_reference
+                        if img_ref:
+                            publisher = img_ref.publisher or ''
+                            offer = img_ref.offer or ''
+                            sku = img_ref.sku or ''
+                            if publisher or offer or sku:
+                                os_version = f"{publisher} {offer} {sku}".strip()
+                    if vm.os_profile:
+                        computer_name = vm.os_profile.computer_name
 
-        # Managed Disks (include unattached disks)
-        try:
-            for disk in safe_iter(compute_client.disks.list()):
-                result["storage"].setdefault("disks", [])
-                managed_by = getattr(disk, "managed_by", None)
-                result["storage"]["disks"].append({
-                    "id": disk.name,
-                    "size_gb": getattr(disk, "disk_size_gb", None) or getattr(disk, "disk_size_gb", None),
-                    "location": getattr(disk, "location", None),
-                    "managed_by": managed_by,
-                    "unused": not bool(managed_by)
-                })
-        except Exception as e:
-            print(f"Error fetching Azure disks: {e}")
+                    result["compute"]["vm"].append({
+                        "id": vm.name,
+                        "size": vm.hardware_profile.vm_size if vm.hardware_profile else None,
+                        "state": power_state,
+                        "os_type": os_type,
+                        "os_version": os_version,
+                        "computer_name": computer_name,
+                        "private_ip": private_ip,
+                        "public_ip": public_ip,
+                        "location": vm.location,
+                        "resource_group": resource_group
+                    })
+            except HttpResponseError as e:
+                errors.append({"service": "vm", "code": getattr(e, "status_code", "HttpResponseError")})
+            except Exception as e:
+                logger.warning("Error fetching Azure VMs: %s", e)
 
-        # SQL Servers and Databases
-        try:
-            sql_servers_iter = safe_iter(sql_client.servers.list())
-            for server in sql_servers_iter:
-                resource_group = server.id.split('/')[4]
+        async def list_resource_group_services():
+            # Per-resource-group services (VNets, NSGs, LBs, Key Vaults, AKS, App Services).
+            # One Resource Graph query returns all of them across the subscription.
+            graph_rows = None
+            graph_client = optional_client("azure.mgmt.resourcegraph", "ResourceGraphClient", per_subscription=False)
+            if graph_client:
                 try:
-                    db_list = safe_iter(sql_client.databases.list_by_server(resource_group, server.name))
-                    for db in db_list:
-                        if db.name != "master":
-                            result["database"]["sql"].append({
-                                "id": f"{server.name}/{db.name}",
-                                "engine": "mssql",
-                                "storage_gb": (db.max_size_bytes or 0) / (1024**3),
-                                "sku": db.sku.name if db.sku else "unknown",
-                                "location": db.location,
-                                "resource_group": resource_group
-                            })
+                    graph_rows = await _azure_call(_azure_resource_graph, graph_client, subscription_id)
                 except Exception as e:
-                    print(f"Error fetching databases for server {server.name}: {e}")
-        except Exception as e:
-            print(f"Error fetching Azure SQL servers: {e}")
-
-        # Virtual Networks
-        try:
-            for rg in resource_client.resource_groups.list():
-                try:
-                    if network_client:
-                        vnets = network_client.virtual_networks.list(rg.name)
-                        for vnet in vnets:
-                            result["networking"]["vnet"].append({
-                                "id": vnet.name,
-                                "address_space": getattr(vnet.address_space, "address_prefixes", []),
-                                "location": vnet.location,
-                                "resource_group": rg.name
-                            })
-                    else:
-                        # network SDK missing; skip but record error
-                        errors.append({"service": "vnet", "error": "missing azure.mgmt.network"})
-                except Exception:
-                    pass
-        except Exception as e:
-            print(f"Error fetching Azure VNets: {e}")
+                    logger.warning("Azure Resource Graph query failed, listing per resource group: %s", e)
 
-        # Network Security Groups
-        try:
-            for rg in resource_client.resource_groups.list():
+            if graph_rows is not None:
+                for row in graph_rows:
+                    shape = _AZURE_GRAPH_SHAPES.get((row.get("type") or "").lower())
+                    if shape:
+                        category, key, shaper = shape
+                        result[category][key].append(shaper(row))
+            else:
+                # Fallback without Resource Graph: enumerate resource groups once, then fan
+                # out every (service, RG) list call concurrently.
+                resource_client = ResourceManagementClient(credential, subscription_id, **_AZURE_CLIENT_OPTIONS)
                 try:
-                    if network_client:
-                        nsgs = network_client.network_security_groups.list(rg.name)
-                        for nsg in nsgs:
-                            result["networking"]["nsg"].append({
-                                "id": nsg.name,
-                                "location": nsg.location,
-                                "resource_group": rg.name
-                            })
-                    else:
-                        errors.append({"service": "nsg", "error": "missing azure.mgmt.network"})
+                    rg_names = [rg.name for rg in await _azure_call(resource_client.resource_groups.list)]
                 except Exception as e:
-                    pass
-        except Exception as e:
-            print(f"Error fetching Azure NSGs: {e}")
+                    rg_names = []
+                    errors.append({"service": "resource_groups", "error": str(e)})
+                    logger.warning("Error fetching Azure resource groups: %s", e)
 
-        # Load Balancers
-        try:
-            for rg in resource_client.resource_groups.list():
-                try:
-                    if network_client:
-                        lbs = network_client.load_balancers.list(rg.name)
-                        for lb in lbs:
-                            result["networking"]["lb"].append({
-                                "id": lb.name,
-                                "location": lb.location,
-                                "resource_group": rg.name
-                            })
-                    else:
-                        errors.append({"service": "lb", "error": "missing azure.mgmt.network"})
-                except Exception as e:
-                    pass
-        except Exception as e:
-            print(f"Error fetching Azure Load Balancers: {e}")
+                # (category, resource key, list function taking an RG name, item shaper)
+                rg_services = []
+                for module_name, class_name, method, category, key, shape in _AZURE_RG_SERVICES:
+                    service_client = optional_client(module_name, class_name)
+                    if service_client is None:
+                        # SDK package missing; skip the service but record it
+                        errors.append({"service": key, "error": f"missing {module_name}"})
+                        continue
+                    rg_services.append((category, key, attrgetter(method)(service_client), shape))
 
-        # Key Vaults
-        try:
-            for rg in resource_client.resource_groups.list():
-                try:
-                    if keyvault_client:
-                        vaults = keyvault_client.vaults.list_by_resource_group(rg.name)
-                        for vault in vaults:
-                            result["security"]["key_vault"].append({
-                                "id": vault.name,
-                                "location": vault.location,
-                                "resource_group": rg.name
-                            })
-                    else:
-                        errors.append({"service": "key_vault", "error": "missing azure.mgmt.keyvault"})
-                except Exception as e:
-                    pass
-        except Exception as e:
-            print(f"Error fetching Azure Key Vaults: {e}")
+                tasks = [_azure_call(list_fn, rg) for _, _, list_fn, _ in rg_services for rg in rg_names]
+                rg_results = await asyncio.gather(*tasks, return_exceptions=True)
 
-        # AKS Clusters
-        try:
-            for rg in resource_client.resource_groups.list():
-                try:
-                    clusters = aks_client.managed_clusters.list_by_resource_group(rg.name)
-                    for cluster in clusters:
-                        result["compute"]["aks"].append({
-                            "id": cluster.name,
-                            "location": cluster.location,
-                            "resource_group": rg.name,
-                            "kubernetes_version": getattr(cluster, "kubernetes_version", None)
-                        })
-                except Exception as e:
-                    pass
-        except Exception as e:
-            print(f"Error fetching Azure AKS: {e}")
+                # Slice the flat result list back into per-service buckets by offset
+                for idx, (category, key, _, shape) in enumerate(rg_services):
+                    offset = idx * len(rg_names)
+                    failed = 0
+                    for rg, items in zip(rg_names, rg_results[offset:offset + len(rg_names)]):
+                        if isinstance(items, Exception):
+                            # Per-RG failures (permissions, throttling) are skipped as before
+                            failed += 1
+                            continue
+                        for item in items:
+                            result[category][key].append(shape(item, rg))
+                    if failed:
+                        errors.append({"service": key, "failed_resource_groups": failed, "resource_groups": len(rg_names)})
+                        logger.warning("Azure %s: listing failed in %d of %d resource groups", key, failed, len(rg_names))
 
-        # App Service Plans & Web Apps
-        try:
-            for rg in resource_client.resource_groups.list():
-                try:
-                    webapps = appservice_client.web_apps.list_by_resource_group(rg.name)
-                    for app in webapps:
-                        result["compute"]["app_service"].append({
-                            "id": app.name,
-                            "location": app.location,
-                            "resource_group": rg.name,
-                            "state": getattr(app, "state", None)
-                        })
-                except Exception as e:
-                    pass
-        except Exception as e:
-            print(f"Error fetching Azure App Services: {e}")
+        # Every top-level listing is independent, so they all run at once (each
+        # in a worker thread via _azure_call): latency is the slowest listing,
+        # not the sum. VMs and the per-RG services fill result themselves.
+        accounts, disks, databases, _, _ = await asyncio.gather(
+            _azure_storage_accounts(storage_client),
+            _azure_disks(compute_client),
+            _azure_sql_databases(sql_client),
+            list_vms(),
+            list_resource_group_services()
+        )
+
+        # Storage Accounts
+        if accounts is not None:
+            result["storage"]["storage_account"] = accounts
+
+        # Managed Disks (include unattached disks); "disks" is only reported
+        # when the subscription has any
+        if disks:
+            result["storage"]["disks"] = disks
+
+        # SQL Servers and Databases
+        if databases is not None:
+            result["database"]["sql"] = databases
 
         return result
     
     except Exception as e:
-        print(f"Error in fetch_azure_resources: {e}")
-        return {
-            "compute": {"vm": [], "app_service": [], "aks": []},
-            "database": {"sql": [], "cosmos": [], "mysql": []},
-            "storage": {"storage_account": [], "blob": []},
-            "networking": {"vnet": [], "nsg": [], "lb": []},
-            "security": {"key_vault": [], "managed_identity": []},
-            "error": str(e)
+        logger.exception("Error in fetch_azure_resources for client %s: %s", client_id, e)
+        return _empty_inventory(_AZURE_INVENTORY, str(e))
+
+# Partial-response masks for GCP Compute list calls, sent as the REST fields=
+# parameter so only the fields the inventory reads are serialized and parsed.
+# nextPageToken must stay in every mask or paging stops after the first page.
+_GCP_FIELD_MASKS = {
+    "instances": (
+        "nextPageToken,items/*/instances(name,machineType,status,cpuPlatform,"
+        "disks(boot,initializeParams/sourceImage),networkInterfaces(networkIP,accessConfigs/natIP))"
+    ),
+    "images": "nextPageToken,items(name,sourceDisk,status)",
+    "disks": "nextPageToken,items/*/disks(name,sizeGb,users)",
+    "networks": "nextPageToken,items(name,autoCreateSubnetworks,IPv4Range)",
+    "firewalls": "nextPageToken,items(name,network,direction,priority,disabled,sourceRanges,allowed)",
+}
+
+
+# Concurrent GCP fetches for the same (service, project, service account) -
+# e.g. several tenants sharing a project refreshed by one dashboard - share a
+# single set of API calls
+_gcp_coalescer = RequestCoalescer(ttl=2.0)
+
+# Bound concurrent GCP listings per process; each one holds a worker thread or
+# a pooled connection, and bursts across tenants would otherwise hit API quotas
+_GCP_CONCURRENCY = settings.GCP_MAX_CONCURRENCY
+
+
+def _gcp_service_account_credentials(sa_json, sa_path: Optional[str]):
+    """
+    Get cloud-platform scoped service account credentials, reused across requests.
+
+    Loading a key parses its RSA private key (and reads the file for
+    serviceAccountPath), so callers run this through run_sync. The result is
+    shared per key (and per key file version), so its access token is too:
+    callers only refresh it once it is no longer valid.
+
+    Args:
+        sa_json (str | dict | None): Service account key JSON
+        sa_path (str | None): Path to a service account key file
+
+    Returns:
+        Credentials | None: Scoped credentials, or None when neither is usable
+    """
+    if sa_json:
+        if not isinstance(sa_json, str):
+            sa_json = orjson.dumps(sa_json, option=orjson.OPT_SORT_KEYS).decode()
+        return _gcp_cached_credentials(sa_json, None, None)
+    if sa_path and os.path.exists(sa_path):
+        # A key file rewritten in place gets a new mtime and so new credentials
+        return _gcp_cached_credentials(None, sa_path, os.path.getmtime(sa_path))
+    return None
+
+
+@lru_cache(maxsize=64)
+def _gcp_cached_credentials(sa_json: Optional[str], sa_path: Optional[str], mtime: Optional[float]):
+    """Build scoped credentials for one key; see _gcp_service_account_credentials."""
+    if sa_json:
+        creds = service_account.Credentials.from_service_account_info(orjson.loads(sa_json))
+    else:
+        creds = service_account.Credentials.from_service_account_file(sa_path)
+    # Ensure credentials include cloud-platform scope for REST/API access
+    try:
+        return creds.with_scopes(["https://www.googleapis.com/auth/cloud-platform"])
+    except Exception:
+        # Some credential types may not support with_scopes; use them as-is
+        return creds
+
+
+@lru_cache(maxsize=64)
+def _gcp_storage_client(project: str, creds) -> "storage.Client":
+    """
+    Cloud Storage client per (project, credentials), reused across requests.
+
+    Credentials are memoized per key by _gcp_service_account_credentials, so
+    the same key keeps hitting this entry and its pooled HTTP session.
+    """
+    return storage.Client(project=project, credentials=creds)
+
+
+@lru_cache(maxsize=64)
+def _gcp_instances_client(creds) -> "compute_v1.InstancesClient":
+    """Compute Engine instances client per credentials, reused like _gcp_storage_client."""
+    return compute_v1.InstancesClient(credentials=creds)
+
+
+async def _gcp_call(fn, creds, project: str):
+    """Run one GCP listing helper under the tenant and GCP call limits."""
+    async with _provider_slot("gcp", _GCP_CONCURRENCY):
+        return await fn(creds, project)
+
+# Shared aiohttp session for the GCP REST listings, bound to the event loop
+# that created it: (loop, session)
+_gcp_http = None
+
+# Transient GCP REST statuses retried per page, and the retry budget with its
+# base backoff in seconds (doubled on each attempt)
+_GCP_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_GCP_REST_RETRIES = 2
+_GCP_RETRY_BACKOFF = 0.2
+
+
+def _gcp_http_session() -> aiohttp.ClientSession:
+    """Get the shared GCP REST session, creating it on first use in this loop."""
+    global _gcp_http
+    loop = asyncio.get_running_loop()
+    if _gcp_http is None or _gcp_http[0] is not loop or _gcp_http[1].closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, limit_per_host=20),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+        _gcp_http = (loop, session)
+    return _gcp_http[1]
+
+
+async def close_gcp_http_session() -> None:
+    """Close the shared GCP REST session on application shutdown."""
+    global _gcp_http
+    if _gcp_http is not None:
+        await _gcp_http[1].close()
+        _gcp_http = None
+
+
+async def _gcp_rest_pages(creds, url: str, key: str, params: dict = None):
+    """
+    Yield the items of a GCP REST list call one page at a time.
+
+    Callers shape each page as it arrives, so only one page of raw JSON is
+    held at once; every page reuses the shared session's pooled connection.
+    Throttled (429) and 5xx responses are retried with exponential backoff
+    instead of failing the whole listing.
+
+    Args:
+        creds: Service account credentials with a current access token
+        url (str): List endpoint URL
+        key (str): Response field holding the page's items
+        params (dict, optional): Extra query parameters (page size, fields)
+
+    Yields:
+        list: Raw JSON items of one page
+    """
+    # Large aggregated pages compress well; aiohttp decompresses transparently
+    headers = {"Authorization": f"Bearer {creds.token}", "Accept-Encoding": "gzip"}
+    params = dict(params or {})
+    while True:
+        for attempt in range(_GCP_REST_RETRIES + 1):
+            async with _gcp_http_session().get(url, headers=headers, params=params) as resp:
+                if resp.status not in _GCP_RETRY_STATUSES or attempt == _GCP_REST_RETRIES:
+                    if resp.status >= 400:
+                        # The status alone rarely says why (disabled API, missing
+                        # role); log the start of GCP's error body with it
+                        logger.warning("GCP REST %s returned %d: %s", url, resp.status, (await resp.text())[:500])
+                    resp.raise_for_status()
+                    page = await resp.json(loads=orjson.loads)
+                    break
+            # Back off with the connection already returned to the pool
+            await asyncio.sleep(_GCP_RETRY_BACKOFF * 2 ** attempt)
+        yield page.get(key) or []
+        page_token = page.get("nextPageToken")
+        if not page_token:
+            return
+        params["pageToken"] = page_token
+
+
+# OS families recognised in GCP image names, matched in one case-insensitive scan
+_GCP_OS_TYPES = {
+    "ubuntu": "Linux (Ubuntu)",
+    "centos": "Linux (CentOS)",
+    "debian": "Linux (Debian)",
+    "rhel": "Linux (RHEL)",
+    "windows": "Windows",
+}
+_GCP_OS_PATTERN = re.compile("(" + "|".join(_GCP_OS_TYPES) + ")", re.IGNORECASE)
+
+
+def _gcp_os_from_disks(disks) -> tuple:
+    """Derive (os_type, os_version) from the boot disk's source image name."""
+    for disk in disks or []:
+        if not disk.get("boot"):
+            continue
+        source_image = (disk.get("initializeParams") or {}).get("sourceImage")
+        if not source_image:
+            return None, None
+        return _gcp_classify_image(source_image)
+    return None, None
+
+
+@lru_cache(maxsize=1024)
+def _gcp_classify_image(source_image: str) -> tuple:
+    """
+    (os_type, os_version) for a boot image URL.
+
+    Instances in a project mostly share a handful of images, so each distinct
+    URL is parsed once.
+    """
+    # Parse image name for OS info (e.g., "ubuntu-2004-lts", "centos-7")
+    image_name = source_image.rsplit('/', 1)[-1]
+    match = _GCP_OS_PATTERN.search(image_name)
+    return (_GCP_OS_TYPES[match.group(1).lower()] if match else None), image_name
+
+
+def _gcp_instance_ips(network_interfaces) -> tuple:
+    """Return (private_ip, public_ip) from the first interface that has an internal IP."""
+    private_ip = None
+    public_ip = None
+    for interface in network_interfaces or []:
+        if interface.get("networkIP"):
+            private_ip = interface["networkIP"]
+        for access_config in interface.get("accessConfigs") or []:
+            if access_config.get("natIP"):
+                public_ip = access_config["natIP"]
+                break
+        if private_ip:  # Use first interface with IP
+            break
+    return private_ip, public_ip
+
+
+async def _gcp_instances(creds, project: str) -> list:
+    """List Compute Engine instances across all zones over REST (aggregatedList)."""
+    instances = []
+    async for page in _gcp_rest_pages(
+        creds, f"https://compute.googleapis.com/compute/v1/projects/{project}/aggregated/instances", "items",
+        params={"maxResults": 500, "fields": _GCP_FIELD_MASKS["instances"]}
+    ):
+        # Aggregated pages map "zones/<zone>" to that zone's instances
+        for zone, scoped_list in (page or {}).items():
+            for inst in scoped_list.get("instances") or []:
+                os_type, os_version = _gcp_os_from_disks(inst.get("disks"))
+                private_ip, public_ip = _gcp_instance_ips(inst.get("networkInterfaces"))
+                machine_type = inst.get("machineType")
+                instances.append({
+                    "id": inst.get("name"),
+                    "type": machine_type.split('/')[-1] if machine_type else None,
+                    "state": inst.get("status"),
+                    "zone": zone,
+                    "os_type": os_type,
+                    "os_version": os_version,
+                    "private_ip": private_ip,
+                    "public_ip": public_ip,
+                    "cpu_platform": inst.get("cpuPlatform")
+                })
+    return instances
+
+
+async def _gcp_images(creds, project: str) -> list:
+    """List custom Compute Engine images over REST."""
+    images = []
+    async for page in _gcp_rest_pages(
+        creds, f"https://compute.googleapis.com/compute/v1/projects/{project}/global/images", "items",
+        params={"maxResults": 500, "fields": _GCP_FIELD_MASKS["images"]}
+    ):
+        images.extend(
+            {
+                "name": img.get("name"),
+                "source_disk": img.get("sourceDisk"),
+                "status": img.get("status")
+            }
+            for img in page
+        )
+    return images
+
+
+async def _gcp_buckets(creds, project: str) -> list:
+    """List Cloud Storage buckets."""
+    storage_client = _gcp_storage_client(project, creds)
+    return [
+        {
+            "bucket": b.name,
+            "location": b.location,
+            "storage_class": b.storage_class
         }
+        for b in await run_sync(lambda: safe_iter(storage_client.list_buckets(project=project)))
+    ]
+
+
+async def _gcp_disks(creds, project: str) -> list:
+    """List persistent disks across all zones over REST, flagging unattached ones."""
+    disks = []
+    async for page in _gcp_rest_pages(
+        creds, f"https://compute.googleapis.com/compute/v1/projects/{project}/aggregated/disks", "items",
+        params={"maxResults": 500, "fields": _GCP_FIELD_MASKS["disks"]}
+    ):
+        disks.extend(
+            {
+                "id": d.get("name"),
+                # int64 fields arrive as JSON strings
+                "size_gb": int(d["sizeGb"]) if d.get("sizeGb") else None,
+                "zone": zone,
+                "unused": not d.get("users")
+            }
+            for zone, scoped in (page or {}).items()
+            for d in scoped.get("disks") or []
+        )
+    return disks
+
+
+async def _gcp_cloud_sql(creds, project: str) -> list:
+    """List Cloud SQL instances over REST (avoids requiring google-cloud-sql)."""
+    instances = []
+    async for page in _gcp_rest_pages(
+        creds, f"https://sqladmin.googleapis.com/sql/v1beta4/projects/{project}/instances", "items",
+        params={"maxResults": 500}
+    ):
+        for inst in page:
+            inst_settings = inst.get("settings") or {}
+            instances.append({
+                "id": inst.get("name"),
+                "engine": inst.get("databaseVersion"),
+                "tier": inst_settings.get("tier"),
+                "region": inst.get("region"),
+                "state": inst.get("state"),
+                "storage_gb": inst_settings.get("dataDiskSizeGb"),
+            })
+    return instances
+
+
+async def _gcp_bigquery(creds, project: str) -> list:
+    """List BigQuery datasets over REST."""
+    datasets = []
+    async for page in _gcp_rest_pages(
+        creds, f"https://bigquery.googleapis.com/bigquery/v2/projects/{project}/datasets", "datasets",
+        params={"maxResults": 1000}
+    ):
+        datasets.extend(
+            {
+                "id": (dataset.get("datasetReference") or {}).get("datasetId"),
+                "location": dataset.get("location"),
+                # The list call does not return creation times
+                "created": None
+            }
+            for dataset in page
+        )
+    return datasets
+
+
+async def _gcp_pubsub(creds, project: str) -> list:
+    """List Pub/Sub topics over REST."""
+    topics = []
+    async for page in _gcp_rest_pages(
+        creds, f"https://pubsub.googleapis.com/v1/projects/{project}/topics", "topics",
+        params={"pageSize": 1000}
+    ):
+        topics.extend({"name": t["name"].split('/')[-1], "path": t["name"]} for t in page if t.get("name"))
+    return topics
+
+
+async def _gcp_networks(creds, project: str) -> list:
+    """List VPC networks over REST."""
+    networks = []
+    async for page in _gcp_rest_pages(
+        creds, f"https://compute.googleapis.com/compute/v1/projects/{project}/global/networks", "items",
+        params={"maxResults": 500, "fields": _GCP_FIELD_MASKS["networks"]}
+    ):
+        networks.extend(
+            {
+                "id": network.get("name"),
+                "auto_create_subnetworks": network.get("autoCreateSubnetworks", False),
+                "ipv4_range": network.get("IPv4Range")
+            }
+            for network in page
+        )
+    return networks
+
+
+async def _gcp_firewalls(creds, project: str) -> list:
+    """List VPC firewall rules over REST."""
+    firewalls = []
+    async for page in _gcp_rest_pages(
+        creds, f"https://compute.googleapis.com/compute/v1/projects/{project}/global/firewalls", "items",
+        params={"maxResults": 500, "fields": _GCP_FIELD_MASKS["firewalls"]}
+    ):
+        firewalls.extend(
+            {
+                "name": fw.get("name"),
+                "network": (fw.get("network") or "").rsplit("/", 1)[-1] or None,
+                "direction": fw.get("direction"),
+                "priority": fw.get("priority"),
+                "disabled": fw.get("disabled", False),
+                "source_ranges": fw.get("sourceRanges", []),
+                "allowed": [
+                    {"protocol": a.get("IPProtocol"), "ports": a.get("ports", [])}
+                    for a in fw.get("allowed", ())
+                ],
+            }
+            for fw in page
+        )
+    return firewalls
+
 
+@_tenant_scoped
 async def fetch_gcp_resources(client_id: int, credentials: dict):
     """
     Fetch comprehensive GCP resource inventory using Google Cloud SDK.
@@ -1095,7 +2487,8 @@ async def fetch_gcp_resources(client_id: int, credentials: dict):
                 },
                 "networking": {
                     "networks": [{"id", "name", "mode"}],
-                    "firewalls": [{"name", "direction", "network"}]
+                    "firewalls": [{"name", "network", "direction", "priority", "disabled",
+                                   "source_ranges", "allowed": [{"protocol", "ports"}]}]
                 },
                 "analytics": {
                     "bigquery": [{"dataset_id", "location", "tables"}]
@@ -1166,11 +2559,9 @@ async def fetch_gcp_resources(client_id: int, credentials: dict):
             }
         }
     """
-    import json
-    import os
-    from google.oauth2 import service_account
-    from google.cloud import compute_v1, storage
-    
+    if not _GCP_AVAILABLE:
+        return _empty_inventory(_GCP_INVENTORY, "GCP SDK packages are not installed")
+
     try:
         # Extract GCP credentials (supports multiple key names)
         sa_json = credentials.get("serviceAccountJson")
@@ -1179,264 +2570,218 @@ async def fetch_gcp_resources(client_id: int, credentials: dict):
         
         # Validate project ID is present (required for all GCP API calls)
         if not project:
-            return {
-                "compute": {"instances": [], "images": []},
-                "database": {"cloud_sql": [], "firestore": [], "bigtable": []},
-                "storage": {"buckets": []},
-                "networking": {"networks": [], "firewalls": []},
-                "analytics": {"bigquery": []},
-                "messaging": {"pubsub": []},
-                "error": "Missing GCP projectId"
-            }
+            return _empty_inventory(_GCP_INVENTORY, "Missing GCP projectId")
 
-        if sa_json:
-            info = json.loads(sa_json) if isinstance(sa_json, str) else sa_json
-            creds = service_account.Credentials.from_service_account_info(info)
-        elif sa_path and os.path.exists(sa_path):
-            creds = service_account.Credentials.from_service_account_file(sa_path)
-        else:
-            creds = None
+        # Key parsing (and the file read for serviceAccountPath) runs off the loop
+        creds = await run_sync(_gcp_service_account_credentials, sa_json, sa_path)
+        if creds is None:
+            return _empty_inventory(_GCP_INVENTORY, "Missing GCP service account credentials")
 
-        # Ensure credentials include cloud-platform scope for REST/API access
-        if creds is not None:
+        result = _empty_inventory(_GCP_INVENTORY)
+
+        # Mint the access token for the REST listings (everything but Cloud
+        # Storage), which share one aiohttp session; a token still valid from
+        # an earlier fetch with the same key is reused
+        if not creds.valid:
             try:
-                creds = creds.with_scopes(["https://www.googleapis.com/auth/cloud-platform"])
-            except Exception:
-                # Some credential types may not support with_scopes; ignore
-                pass
-        else:
-            return {
-                "compute": {"instances": [], "images": []},
-                "database": {"cloud_sql": [], "firestore": [], "bigtable": []},
-                "storage": {"buckets": []},
-                "networking": {"networks": [], "firewalls": []},
-                "analytics": {"bigquery": []},
-                "messaging": {"pubsub": []},
-                "error": "Missing GCP service account credentials"
-            }
+                await run_sync(creds.refresh, GoogleAuthRequest())
+            except Exception as e:
+                logger.warning("Error refreshing GCP access token: %s", e)
 
-        result = {
-            "compute": {"instances": [], "images": []},
-            "database": {"cloud_sql": [], "firestore": [], "bigtable": []},
-            "storage": {"buckets": []},
-            "networking": {"networks": [], "firewalls": []},
-            "analytics": {"bigquery": []},
-            "messaging": {"pubsub": []},
-        }
+        # Every listing is independent, so they all run concurrently (the
+        # Cloud Storage SDK call is blocking and runs in a worker thread via run_sync).
+        # (category, resource key, label for error logs, fetch helper)
+        jobs = [
+            ("compute", "instances", "Compute instances", _gcp_instances),
+            ("compute", "images", "Images", _gcp_images),
+            ("storage", "buckets", "Storage buckets", _gcp_buckets),
+            ("storage", "disks", "disks", _gcp_disks),
+            ("database", "cloud_sql", "Cloud SQL (REST)", _gcp_cloud_sql),
+            ("analytics", "bigquery", "BigQuery", _gcp_bigquery),
+            ("messaging", "pubsub", "Pub/Sub", _gcp_pubsub),
+            ("networking", "networks", "Networks", _gcp_networks),
+            ("networking", "firewalls", "Firewalls", _gcp_firewalls),
+        ]
+        identity = getattr(creds, "service_account_email", None)
+        outcomes = await asyncio.gather(
+            *[
+                _gcp_coalescer.fetch((key, project, identity), lambda fn=fn: _gcp_call(fn, creds, project))
+                for _, key, _, fn in jobs
+            ],
+            return_exceptions=True
+        )
 
-        # Compute Engine Instances
-        try:
-            compute_client = compute_v1.InstancesClient(credentials=creds)
-            agg_list = compute_client.aggregated_list(project=project)
-            for zone, scoped_list in agg_list:
-                for inst in scoped_list.instances or []:
-                    # Extract OS information from disks
-                    os_type = None
-                    os_version = None
-                    if hasattr(inst, 'disks') and inst.disks:
-                        for disk in inst.disks:
-                            if disk.boot:
-                                # Try to extract OS from source image
-                                if hasattr(disk, 'initialize_params') and disk.initialize_params:
-                                    source_image = getattr(disk.initialize_params, 'source_image', '')
-                                    if source_image:
-                                        # Parse image name for OS info (e.g., "ubuntu-2004-lts", "centos-7")
-                                        image_parts = source_image.split('/')
-                                        if image_parts:
-                                            image_name = image_parts[-1]
-                                            os_version = image_name
-                                            if 'ubuntu' in image_name.lower():
-                                                os_type = 'Linux (Ubuntu)'
-                                            elif 'centos' in image_name.lower():
-                                                os_type = 'Linux (CentOS)'
-                                            elif 'debian' in image_name.lower():
-                                                os_type = 'Linux (Debian)'
-                                            elif 'rhel' in image_name.lower():
-                                                os_type = 'Linux (RHEL)'
-                                            elif 'windows' in image_name.lower():
-                                                os_type = 'Windows'
-                                break
-                    
-                    # Get IP addresses from network interfaces
-                    private_ip = None
-                    public_ip = None
-                    if hasattr(inst, 'network_interfaces') and inst.network_interfaces:
-                        for interface in inst.network_interfaces:
-                            if interface.network_i_p:
-                                private_ip = interface.network_i_p
-                            if hasattr(interface, 'access_configs') and interface.access_configs:
-                                for access_config in interface.access_configs:
-                                    if access_config.nat_i_p:
-                                        public_ip = access_config.nat_i_p
-                                        break
-                            if private_ip:  # Use first interface with IP
-                                break
-                    
-                    result["compute"]["instances"].append({
-                        "id": inst.name,
-                        "type": inst.machine_type.split('/')[-1] if inst.machine_type else None,
-                        "state": inst.status,
-                        "zone": zone,
-                        "os_type": os_type,
-                        "os_version": os_version,
-                        "private_ip": private_ip,
-                        "public_ip": public_ip,
-                        "cpu_platform": getattr(inst, "cpu_platform", None)
-                    })
-        except Exception as e:
-            print(f"Error fetching GCP Compute instances: {e}")
+        for (category, key, label, _), outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning("Error fetching GCP %s: %s", label, outcome)
+                continue
+            if key == "disks" and not outcome:
+                # "disks" is only reported when the project has any
+                continue
+            result[category][key] = outcome
+
+        return result
+    
+    except Exception as e:
+        logger.exception("Error in fetch_gcp_resources for client %s: %s", client_id, e)
+        return _empty_inventory(_GCP_INVENTORY, str(e))
+
+# Inventory fetcher per provider name
+PROVIDER_FETCHERS = {
+    "aws": fetch_aws_resources,
+    "azure": fetch_azure_resources,
+    "gcp": fetch_gcp_resources,
+}
+
+
+def provider_credentials(meta: dict, provider: str) -> dict:
+    """
+    Credentials for one provider of a tenant.
+
+    Multi-provider tenants keep each provider's keys in a nested dict under the
+    provider name (e.g. meta["azure"] = {"clientId": ...}); those override the
+    top-level keys. Single-provider tenants just use the top-level metadata.
+    """
+    nested = meta.get(provider)
+    return {**meta, **nested} if isinstance(nested, dict) else meta
+
+
+# Uncached fetches (recommendations, chat context, snapshots) for the same
+# tenant share whichever call is already in flight; results are not kept
+_fetch_flights = RequestCoalescer(ttl=0)
+
+
+async def fetch_provider_resources(provider: str, client_id: int, credentials: dict, **options) -> dict:
+    """
+    Fetch a live provider inventory, joining an identical fetch already running.
+
+    Args:
+        provider (str): Key of PROVIDER_FETCHERS ("aws", "azure", "gcp")
+        client_id (int): Client/tenant ID
+        credentials (dict): Client metadata passed through to the fetcher
+        **options: Extra fetcher arguments, e.g. mode="cost" for AWS
+
+    Returns:
+        dict: Resource inventory; shared between concurrent callers, so it
+        must not be mutated
+    """
+    key = (provider, client_id, credentials_fingerprint(credentials), tuple(sorted(options.items())))
+    return await _fetch_flights.fetch(
+        key, lambda: PROVIDER_FETCHERS[provider](client_id, credentials, **options)
+    )
+
+
+# (category, resource type, summary key) per provider, built once from the
+# inventory shapes instead of on every request
+_SUMMARY_KEYS = {
+    provider: tuple(
+        (category, resource_type, f"{category}_{resource_type}")
+        for category, resource_types in shape.items()
+        for resource_type in resource_types
+    )
+    for provider, shape in _INVENTORY_SHAPES.items()
+}
+
+
+def build_resource_summary(resources: dict, prefix: str = "", provider: str = None) -> dict:
+    """
+    Count resources per "<category>_<resource_type>" (optionally prefixed).
+
+    With a known provider the flat, precomputed key list is used; anything
+    else walks the nested dicts. Only list-valued types are counted (AWS
+    "iam" is a dict of users/roles and is left out, as before).
+    """
+    keys = _SUMMARY_KEYS.get(provider)
+    if keys is None:
+        return {
+            f"{prefix}{category}_{resource_type}": len(resources_list)
+            for category, items in resources.items() if isinstance(items, dict)
+            for resource_type, resources_list in items.items() if isinstance(resources_list, list)
+        }
+    return {
+        prefix + name: len(resources_list)
+        for category, resource_type, name in keys
+        if isinstance(resources_list := resources.get(category, {}).get(resource_type), list)
+    }
 
-        # Compute Engine Images
-        try:
-            images_client = compute_v1.ImagesClient(credentials=creds)
-            for img in safe_iter(images_client.list(project=project)):
-                result["compute"]["images"].append({
-                    "name": img.name,
-                    "source_disk": getattr(img, "source_disk", None),
-                    "status": getattr(img, "status", None)
-                })
-        except Exception as e:
-            print(f"Error fetching GCP Images: {e}")
 
-        # Storage Buckets
-        try:
-            storage_client = storage.Client(project=project, credentials=creds)
-            for b in safe_iter(storage_client.list_buckets(project=project)):
-                result["storage"]["buckets"].append({
-                    "bucket": b.name,
-                    "location": getattr(b, "location", None),
-                    "storage_class": getattr(b, "storage_class", None)
-                })
-        except Exception as e:
-            print(f"Error fetching GCP Storage buckets: {e}")
+# Newest inventory cache row per (client_id, provider); see INVENTORY_ROW_MEMO_TTL
+_inventory_rows = RequestCoalescer(ttl=INVENTORY_ROW_MEMO_TTL)
 
-        # Persistent disks (include unattached)
-        try:
-            disks_client = compute_v1.DisksClient(credentials=creds)
-            agg_disks = disks_client.aggregated_list(project=project)
-            for zone, scoped in agg_disks:
-                for d in scoped.disks or []:
-                    result["storage"].setdefault("disks", []).append({
-                        "id": d.name,
-                        "size_gb": getattr(d, "size_gb", None) or getattr(d, "disk_size_gb", None),
-                        "zone": zone,
-                        "unused": not getattr(d, "users", None)
-                    })
-        except Exception as e:
-            print(f"Error fetching GCP disks: {e}")
 
-        # Cloud SQL Instances (use REST via AuthorizedSession to avoid requiring google-cloud-sql)
-        try:
-            try:
-                from google.auth.transport.requests import AuthorizedSession
-                import json as _json
-                asess = AuthorizedSession(creds)
-                url = f"https://sqladmin.googleapis.com/sql/v1beta4/projects/{project}/instances"
-                r = asess.get(url)
-                if r.status_code == 200:
-                    data = r.json()
-                    for inst in data.get("items", []) or []:
-                        result["database"]["cloud_sql"].append({
-                            "id": inst.get("name"),
-                            "engine": inst.get("databaseVersion"),
-                            "tier": inst.get("settings", {}).get("tier"),
-                            "region": inst.get("region"),
-                            "state": inst.get("state"),
-                            "storage_gb": inst.get("settings", {}).get("dataDiskSizeGb"),
-                        })
-                else:
-                    print(f"Cloud SQL REST fetch returned {r.status_code}: {r.text}")
-            except ImportError:
-                # google-auth transport not available; skip Cloud SQL fetch
-                pass
-            except Exception as e:
-                print(f"Error fetching GCP Cloud SQL (REST): {e}")
-        except Exception:
-            pass
+async def latest_inventory_row(client_id: int, provider: str):
+    """
+    Read the newest cloud_metrics_cache row for a client and provider.
 
-        # BigQuery Datasets
-        try:
-            try:
-                from google.cloud import bigquery
-                bq_client = bigquery.Client(project=project, credentials=creds)
-                for dataset in safe_iter(bq_client.list_datasets()):
-                    result["analytics"]["bigquery"].append({
-                        "id": getattr(dataset, "dataset_id", None) or (dataset.dataset_id if hasattr(dataset, "dataset_id") else None),
-                        "location": getattr(dataset, "location", None),
-                        "created": str(getattr(dataset, "created", None)) if getattr(dataset, "created", None) else None
-                    })
-            except ImportError:
-                # google-cloud-bigquery not installed, skip BigQuery fetch
-                pass
-            except Exception as e:
-                print(f"Error fetching GCP BigQuery: {e}")
-        except Exception:
-            pass
+    Uses its own session because the result is shared through _inventory_rows
+    with requests other than the one that started the read.
 
-        # Pub/Sub Topics
-        try:
-            try:
-                from google.cloud import pubsub_v1
-                publisher = pubsub_v1.PublisherClient(credentials=creds)
-                # use explicit project path
-                project_path = f"projects/{project}"
-                for topic in safe_iter(publisher.list_topics(request={"project": project_path})):
-                    name = getattr(topic, "name", None) or (topic.get("name") if isinstance(topic, dict) else None)
-                    if name:
-                        result["messaging"]["pubsub"].append({
-                            "name": name.split('/')[-1],
-                            "path": name
-                        })
-            except ImportError:
-                # google-cloud-pubsub not installed, skip Pub/Sub fetch
-                pass
-            except Exception as e:
-                print(f"Error fetching GCP Pub/Sub: {e}")
-        except Exception:
-            pass
+    Returns:
+        Row | None: (fetched_at, metrics_data), or None when nothing is cached
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(CloudMetricsCache.fetched_at, CloudMetricsCache.metrics_data).where(
+                CloudMetricsCache.tenant_id == client_id,
+                CloudMetricsCache.provider == provider
+            ).order_by(desc(CloudMetricsCache.fetched_at)).limit(1)
+        )
+        return result.first()
 
-        # VPC Networks
-        try:
-            networks_client = compute_v1.NetworksClient(credentials=creds)
-            for network in safe_iter(networks_client.list(project=project)):
-                result["networking"]["networks"].append({
-                    "id": network.name,
-                    "auto_create_subnetworks": network.auto_create_subnetworks,
-                    "ipv4_range": getattr(network, "ipv4_range", None)
-                })
-        except Exception as e:
-            print(f"Error fetching GCP Networks: {e}")
 
-        # Firewall Rules
-        try:
-            firewalls_client = compute_v1.FirewallsClient(credentials=creds)
-            for fw in safe_iter(firewalls_client.list(project=project)):
-                result["networking"]["firewalls"].append({
-                    "name": fw.name,
-                    "direction": fw.direction,
-                    "priority": fw.priority
-                })
-        except Exception as e:
-            print(f"Error fetching GCP Firewalls: {e}")
+def inventory_payload(
+    client_id: int,
+    client_name: str,
+    provider: str,
+    resources: dict,
+    summary: dict,
+    cached: bool,
+    fetched_at: datetime,
+    summary_only: bool = False,
+    stale: bool = False
+) -> dict:
+    """Response body for /resources, leaving out "resources" for summary-only requests."""
+    payload = {
+        "client_id": client_id,
+        "client_name": client_name,
+        "provider": provider,
+        "resources": resources,
+        "summary": summary,
+        "cached": cached,
+        "stale": stale,
+        "fetched_at": fetched_at.isoformat()
+    }
+    if summary_only:
+        del payload["resources"]
+    return payload
 
-        return result
-    
+
+async def fetch_inventory(provider: str, client_id: int, meta: dict, refresh: bool) -> tuple:
+    """
+    cached_fetch() for one provider of a tenant, as an HTTP error when it fails.
+
+    cached_fetch only raises when no last good copy can stand in (always the
+    case for an explicit refresh), so the caller learns the cloud API failed
+    instead of silently getting older data.
+
+    Raises:
+        HTTPException: 502 with the fetch error
+    """
+    try:
+        return await cached_fetch(
+            provider, client_id, provider_credentials(meta, provider), PROVIDER_FETCHERS[provider], refresh=refresh
+        )
     except Exception as e:
-        print(f"Error in fetch_gcp_resources: {e}")
-        return {
-            "compute": {"instances": [], "images": []},
-            "database": {"cloud_sql": [], "firestore": [], "bigtable": []},
-            "storage": {"buckets": []},
-            "networking": {"networks": [], "firewalls": []},
-            "analytics": {"bigquery": []},
-            "messaging": {"pubsub": []},
-            "error": str(e)
-        }
+        logger.warning("Inventory fetch for client %s (%s) failed: %s", client_id, provider, e)
+        raise HTTPException(status_code=502, detail=f"{provider} inventory fetch failed: {e}")
+
 
-@router.get("/resources/{client_id}")
+@router.get("/resources/{client_id}", response_class=ORJSONResponse)
 async def get_resource_inventory(
     client_id: int,
+    request: Request,
     force_refresh: bool = Query(False, description="Force refresh from cloud provider"),
+    summary_only: bool = Query(False, alias="summary", description="Return only the summary counts, without resources"),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
@@ -1457,15 +2802,29 @@ async def get_resource_inventory(
         force_refresh (bool, optional): If True, bypasses cache and fetches fresh data
                                        from cloud provider. Defaults to False.
                                        Use when real-time accuracy is required.
+        summary_only (bool, optional): ?summary=true; "resources" is left out of the
+                                  response. Count badges and cards only need
+                                  "summary", so they skip encoding and
+                                  transferring the full inventory.
+        request (Request): Incoming request; "Accept: application/x-msgpack"
+                          selects a MessagePack body instead of JSON.
         db (AsyncSession): Database session injected by FastAPI dependency.
         current_user (dict): Authenticated user info from JWT token.
     
+    Multi-provider tenants:
+        When the tenant metadata has a "providers" list with more than one
+        entry (e.g. ["aws", "gcp"]), every listed provider is fetched
+        concurrently. "provider" is then the sorted names joined by "+",
+        "resources" is keyed by provider name, and summary keys are prefixed
+        with it (e.g. "aws_compute_ec2").
+    
     Returns:
         dict: Resource inventory response containing:
             - client_id (int): The client ID requested
             - client_name (str): Human-readable client name
             - provider (str): Cloud provider (aws/azure/gcp)
-            - resources (dict): Nested structure of resources by category:
+            - resources (dict): Nested structure of resources by category
+                                (omitted when summary=true):
                 - compute: EC2, VMs, instances, Lambda, etc.
                 - database: RDS, SQL, Cloud SQL, etc.
                 - storage: S3, Blob Storage, GCS buckets
@@ -1475,21 +2834,32 @@ async def get_resource_inventory(
                 - messaging: SNS, SQS, Pub/Sub
             - summary (dict): Count of resources by type (e.g., {"compute_ec2": 5})
             - cached (bool): True if served from cache, False if freshly fetched
+            - stale (bool): True if the cloud fetch failed and the last good
+              inventory (up to a day old) was served in its place
             - fetched_at (str): ISO timestamp when data was fetched from cloud
     
     Raises:
         HTTPException(404): If client_id doesn't exist in database
+        HTTPException(502): If the cloud fetch failed and no earlier inventory
+                            could stand in (always the case for force_refresh)
         HTTPException(401): If authentication fails (via dependency)
-        HTTPException(500): If cloud provider API fails (caught and logged)
+    
+    Conditional Requests:
+        Responses carry a weak ETag derived from the cache row's fetched_at.
+        A cached inventory requested with a matching If-None-Match returns
+        304 Not Modified with no body.
     
     Cache Behavior:
         - Cache TTL: 30 minutes (configurable via METRICS_CACHE_TTL_MINUTES)
         - Cache key: client_id + provider
         - Cache storage: PostgreSQL cloud_metrics_cache table
         - Cache invalidation: Automatic on force_refresh=true
+        - Each worker also keeps the newest row in memory for
+          INVENTORY_ROW_MEMO_TTL seconds, shared by concurrent polls; a
+          refresh in another worker shows up here within that window
     
     Performance:
-        - Cached response: ~50ms (database query)
+        - Cached response: ~50ms (database query), less while memoized
         - Fresh fetch AWS: ~5-15 seconds (multiple API calls)
         - Fresh fetch Azure: ~3-10 seconds
         - Fresh fetch GCP: ~4-12 seconds
@@ -1521,31 +2891,33 @@ async def get_resource_inventory(
             "fetched_at": "2026-01-25T10:30:00"
         }
     """
-    # Step 1: Retrieve client credentials from database
-    result = await db.execute(select(Tenant).where(Tenant.id == client_id))
-    client = result.scalar_one_or_none()
+    # Step 1: Retrieve client credentials from database (identity map first)
+    client = await db.get(Tenant, client_id, options=TENANT_LOAD_OPTIONS)
     
     # Validate client exists
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    # Extract cloud provider and credentials from metadata
+    # Extract cloud provider and credentials from metadata. A "providers" list
+    # with more than one entry selects the multi-provider inventory.
     meta = client.metadata_json or {}
-    provider = (meta.get("provider") or "aws").lower()
+    providers = [p.lower() for p in meta.get("providers") or [] if p.lower() in PROVIDER_FETCHERS]
+    multi_provider = len(providers) > 1
+    if multi_provider:
+        providers = sorted(set(providers))
+        provider = "+".join(providers)
+    else:
+        provider = (providers[0] if providers else meta.get("provider") or "aws").lower()
     
     # Step 2: Check if we should use cached data
     cache_valid = False
     cached_data = None
     
     if not force_refresh:
-        # Query for the most recent cache entry for this client and provider
-        cache_query = select(CloudMetricsCache).where(
-            CloudMetricsCache.tenant_id == client_id,
-            CloudMetricsCache.provider == provider
-        ).order_by(desc(CloudMetricsCache.fetched_at)).limit(1)
-        
-        cache_result = await db.execute(cache_query)
-        cache_entry = cache_result.scalar_one_or_none()
+        # Most recent cache entry for this client and provider (memoized briefly)
+        cache_entry = await _inventory_rows.fetch(
+            (client_id, provider), lambda: latest_inventory_row(client_id, provider)
+        )
         
         if cache_entry:
             # Calculate cache age in seconds
@@ -1556,71 +2928,75 @@ async def get_resource_inventory(
                 cache_valid = True
                 cached_data = cache_entry.metrics_data
     
-    # Step 3: Return cached data if valid
+    # Step 3: Return cached data if valid. Pollers that already hold this
+    # cache row get a bodiless 304 instead of the full inventory.
     if cache_valid and cached_data:
-        return {
-            "client_id": client_id,
-            "client_name": client.name,
-            "provider": provider,
-            "resources": cached_data.get("resources", {}),
-            "summary": cached_data.get("summary", {}),
-            "cached": True,
-            "fetched_at": cache_entry.fetched_at.isoformat()
-        }
+        etag = inventory_etag(request, client_id, provider, cache_entry.fetched_at, summary_only)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+        return negotiate_response(request, inventory_payload(
+            client_id, client.name, provider, cached_data.get("resources", {}), cached_data.get("summary", {}),
+            True, cache_entry.fetched_at, summary_only
+        ), headers={"ETag": etag})
     
     # Step 4: Cache miss or stale - fetch fresh data from cloud provider
     # Route to appropriate cloud provider function based on provider type
-    if provider == "aws":
-        resources = await fetch_aws_resources(client_id, meta)
-    elif provider == "azure":
-        resources = await fetch_azure_resources(client_id, meta)
-    elif provider == "gcp":
-        resources = await fetch_gcp_resources(client_id, meta)
+    # (shared across workers via Redis so concurrent misses fetch only once).
+    # The pooled connection goes back before the multi-second fetch; the cache
+    # write below checks out a new one.
+    client_name = client.name
+    await db.close()
+    if multi_provider:
+        # Providers are independent, so their fetches overlap; the slowest one
+        # sets the latency. Resources and summary are keyed by provider.
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tasks = {p: tg.create_task(fetch_inventory(p, client_id, meta, force_refresh)) for p in providers}
+        except* HTTPException as failed:
+            raise failed.exceptions[0]
+        fetched = {p: task.result() for p, task in tasks.items()}
+        resources = {p: inventory for p, (inventory, _, _) in fetched.items()}
+        # The combined inventory is as old as its oldest part
+        fetched_at = min(at for _, at, _ in fetched.values())
+        stale = any(is_stale for _, _, is_stale in fetched.values())
+        failed = any(inventory.get("error") for inventory in resources.values())
+        summary = {}
+        for p, provider_resources in resources.items():
+            summary.update(build_resource_summary(provider_resources, prefix=f"{p}_", provider=p))
     else:
-        # Unknown provider - return empty structure
-        resources = {
-            "compute": {}, "database": {}, "storage": {}, 
-            "networking": {}, "security": {}, "analytics": {}, "messaging": {}
-        }
-    
-    # Step 5: Build summary statistics from resource inventory
-    summary = {}
-    for category, items in resources.items():
-        if isinstance(items, dict):
-            # Each category contains resource types (e.g., compute -> ec2)
-            for resource_type, resources_list in items.items():
-                if isinstance(resources_list, list):
-                    # Create summary key like "compute_ec2" with count
-                    key = f"{category}_{resource_type}"
-                    summary[key] = len(resources_list)
-    
-    # Step 6: Store fresh data in database cache for future requests
-    metrics_data = {
-        "resources": resources,
-        "summary": summary
-    }
-    
-    new_cache = CloudMetricsCache(
-        tenant_id=client_id,
-        provider=provider,
-        metrics_data=metrics_data,
-        fetched_at=datetime.utcnow()
-    )
-    db.add(new_cache)
-    await db.commit()
-    
-    # Step 7: Return fresh data with cache=false indicator
-    return {
-        "client_id": client_id,
-        "client_name": client.name,
-        "provider": provider,
-        "resources": resources,
-        "summary": summary,
-        "cached": False,
-        "fetched_at": new_cache.fetched_at.isoformat()
-    }
+        if provider in PROVIDER_FETCHERS:
+            resources, fetched_at, stale = await fetch_inventory(provider, client_id, meta, force_refresh)
+        else:
+            # Unknown provider - return empty structure
+            resources, fetched_at, stale = _empty_inventory(_UNKNOWN_INVENTORY), datetime.utcnow(), False
+
+        failed = bool(resources.get("error"))
+
+        # Step 5: Build summary statistics from resource inventory
+        summary = build_resource_summary(resources, provider=provider)
+    
+    # Step 6: Store fresh data in database cache for future requests, stamped
+    # with when it was fetched from the cloud. A stale fallback (last good copy
+    # served during an outage) is returned as-is and never stored as new, and
+    # neither is a failed fetch, so it cannot shadow the last good row.
+    if not (stale or failed):
+        db.add(CloudMetricsCache(
+            tenant_id=client_id,
+            provider=provider,
+            metrics_data={"resources": resources, "summary": summary},
+            fetched_at=fetched_at
+        ))
+        await db.commit()
+        _inventory_rows.forget((client_id, provider))
+    
+    # Step 7: Return fresh data with cache=false indicator (stale=true marks a
+    # fallback copy). The full inventory was still fetched and cached above,
+    # so summary-only callers warm it too.
+    return negotiate_response(request, inventory_payload(
+        client_id, client_name, provider, resources, summary, False, fetched_at, summary_only, stale
+    ), headers={"ETag": inventory_etag(request, client_id, provider, fetched_at, summary_only)})
 
-@router.get("/resource-details/{client_id}/{resource_type}/{resource_id}")
+@router.get("/resource-details/{client_id}/{resource_type}/{resource_id:path}", response_class=ORJSONResponse)
 async def get_resource_details(
     client_id: int,
     resource_type: str,
@@ -1628,22 +3004,27 @@ async def get_resource_details(
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
-    """Fetch comprehensive details for a specific resource"""
-    result = await db.execute(select(Tenant).where(Tenant.id == client_id))
-    client = result.scalar_one_or_none()
+    """
+    Fetch comprehensive details for a specific resource.
+
+    resource_id may contain "/" for provider-qualified names, e.g. Azure VMs
+    as "<resource group>/<vm name>", GCP instances as "<zone>/<instance name>"
+    and SQL databases as "<server>/<database>".
+    """
+    check_client_access(client_id, await accessible_client_ids(db, current_user))
+    client = await db.get(Tenant, client_id, options=TENANT_LOAD_OPTIONS)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
     meta = client.metadata_json or {}
     provider = (meta.get("provider") or "aws").lower()
+    # Release the connection; nothing below touches the database
+    await db.close()
     
     # Fetch detailed resource information based on provider
-    if provider == "aws":
-        details = await fetch_aws_resource_details(meta, resource_type, resource_id)
-    elif provider == "azure":
-        details = await fetch_azure_resource_details(meta, resource_type, resource_id)
-    elif provider == "gcp":
-        details = await fetch_gcp_resource_details(meta, resource_type, resource_id)
+    fetch_details = DETAIL_FETCHERS.get(provider)
+    if fetch_details:
+        details = await fetch_details(meta, resource_type, resource_id)
     else:
         details = {"error": "Unknown provider"}
     
@@ -1655,9 +3036,109 @@ async def get_resource_details(
         "details": details
     }
 
+
+class ResourceRef(BaseModel):
+    """One resource in a batch detail request."""
+    resource_type: str
+    resource_id: str
+
+
+# Largest number of resources one batch detail request may ask for
+MAX_DETAIL_BATCH = 50
+
+
+@router.post("/resource-details/{client_id}/batch", response_class=ORJSONResponse)
+async def get_resource_details_batch(
+    client_id: int,
+    resources: List[ResourceRef] = Body(..., description="Resources to describe"),
+    db: AsyncSession = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Fetch details for several resources of one client at once.
+
+    Each entry is looked up exactly as by GET /resource-details. Lookups run
+    concurrently under the client's and the provider's call limits (see
+    _fetch_details_batch), so the response takes a few lookups' time instead
+    of the sum. A failed lookup reports {"error": ...} in its own entry
+    without affecting the others.
+
+    Raises:
+        HTTPException: 400 for more than MAX_DETAIL_BATCH resources, 403 if the
+                       caller may not access the client, 404 if it does not exist
+    """
+    if len(resources) > MAX_DETAIL_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_DETAIL_BATCH} resources per batch")
+    check_client_access(client_id, await accessible_client_ids(db, current_user))
+    client = await db.get(Tenant, client_id, options=TENANT_LOAD_OPTIONS)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    meta = client.metadata_json or {}
+    provider = (meta.get("provider") or "aws").lower()
+    # Release the connection; nothing below touches the database
+    await db.close()
+    
+    if provider in DETAIL_FETCHERS:
+        outcomes = await _fetch_details_batch(client_id, provider, meta, resources)
+    else:
+        outcomes = [{"error": "Unknown provider"}] * len(resources)
+    
+    return {
+        "client_id": client_id,
+        "provider": provider,
+        "items": [
+            {
+                "resource_type": ref.resource_type,
+                "resource_id": ref.resource_id,
+                "details": {"error": str(outcome)} if isinstance(outcome, Exception) else outcome
+            }
+            for ref, outcome in zip(resources, outcomes)
+        ]
+    }
+
+# Detail lookups are a handful of sequential calls on one resource, so they get
+# slightly longer timeouts than the inventory; TCP keep-alive as for inventory
+# clients, so a dropped pooled connection fails fast instead of hanging
+_AWS_DETAILS_CONFIG = Config(
+    connect_timeout=5,
+    read_timeout=10,
+    retries={'max_attempts': 2},
+    tcp_keepalive=True
+)
+
+# Detail clients per (credentials, region, service). boto3 clients are
+# thread-safe and keep their connection pools, but a boto3 Session is not, so
+# clients are created from the shared session under _aws_details_lock.
+_aws_details_lock = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _aws_details_session(access_key: str, secret_key: str, region: str):
+    """Get a blocking boto3 Session for detail lookups, reused like _aws_session."""
+    import boto3
+    return boto3.Session(
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        region_name=region
+    )
+
+
+@lru_cache(maxsize=256)
+def _aws_details_client(access_key: str, secret_key: str, region: str, service: str):
+    """Get a cached boto3 client for detail lookups (see _aws_details_lock)."""
+    with _aws_details_lock:
+        return _aws_details_session(access_key, secret_key, region).client(service, config=_AWS_DETAILS_CONFIG)
+
+
 async def fetch_aws_resource_details(credentials: dict, resource_type: str, resource_id: str):
     """Fetch comprehensive AWS resource details"""
-    import boto3
+    # boto3 is blocking; run the whole lookup in a worker thread
+    return await run_sync(_aws_resource_details, credentials, resource_type, resource_id)
+
+
+def _aws_resource_details(credentials: dict, resource_type: str, resource_id: str) -> dict:
+    """Blocking body of fetch_aws_resource_details."""
     try:
         access_key = credentials.get("clientId") or credentials.get("access_key")
         secret_key = credentials.get("clientSecret") or credentials.get("secret_key")
@@ -1666,18 +3147,14 @@ async def fetch_aws_resource_details(credentials: dict, resource_type: str, reso
         if not (access_key and secret_key):
             return {"error": "Missing AWS credentials"}
         
-        config = Config(connect_timeout=5, read_timeout=10, retries={'max_attempts': 2})
-        session = boto3.Session(
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
+        def client(service):
+            return _aws_details_client(access_key, secret_key, region, service)
         
         details = {}
         
         # EC2 Instance Details
         if "ec2" in resource_type.lower() or "instance" in resource_type.lower():
-            ec2 = session.client("ec2", config=config)
+            ec2 = client("ec2")
             try:
                 response = ec2.describe_instances(InstanceIds=[resource_id])
                 if response.get("Reservations"):
@@ -1714,7 +3191,7 @@ async def fetch_aws_resource_details(credentials: dict, resource_type: str, reso
         
         # RDS Database Details
         elif "rds" in resource_type.lower():
-            rds = session.client("rds", config=config)
+            rds = client("rds")
             try:
                 response = rds.describe_db_instances(DBInstanceIdentifier=resource_id)
                 if response.get("DBInstances"):
@@ -1736,7 +3213,7 @@ async def fetch_aws_resource_details(credentials: dict, resource_type: str, reso
         
         # S3 Bucket Details
         elif "s3" in resource_type.lower():
-            s3 = session.client("s3", config=config)
+            s3 = client("s3")
             try:
                 # Get bucket location
                 location = s3.get_bucket_location(Bucket=resource_id)
@@ -1778,10 +3255,7 @@ async def fetch_aws_resource_details(credentials: dict, resource_type: str, reso
 async def fetch_azure_resource_details(credentials: dict, resource_type: str, resource_id: str):
     """Fetch comprehensive Azure resource details"""
     try:
-        from azure.identity import ClientSecretCredential
-        from azure.mgmt.compute import ComputeManagementClient
         from azure.mgmt.network import NetworkManagementClient
-        from azure.mgmt.sql import SqlManagementClient
         
         tenant_id = credentials.get("tenantId") or credentials.get("tenant_id")
         client_id = credentials.get("clientId") or credentials.get("client_id")
@@ -1791,18 +3265,25 @@ async def fetch_azure_resource_details(credentials: dict, resource_type: str, re
         if not all([tenant_id, client_id, client_secret, subscription_id]):
             return {"error": "Missing Azure credentials"}
         
-        credential = ClientSecretCredential(tenant_id, client_id, client_secret)
-        compute_client = ComputeManagementClient(credential, subscription_id)
-        network_client = NetworkManagementClient(credential, subscription_id)
+        credential = _azure_credential(tenant_id, client_id, client_secret)
+        compute_client = ComputeManagementClient(credential, subscription_id, **_AZURE_CLIENT_OPTIONS)
+        network_client = NetworkManagementClient(credential, subscription_id, **_AZURE_CLIENT_OPTIONS)
         
         details = {}
         
         # VM Details
         if "vm" in resource_type.lower():
             try:
-                # Find the VM across all resource groups
-                for vm in safe_iter(compute_client.virtual_machines.list_all()):
-                    if vm.name == resource_id:
+                if "/" in resource_id:
+                    # "<resource group>/<name>": one direct lookup
+                    vm_rg, vm_name = resource_id.split("/", 1)
+                    vms = [await run_sync(compute_client.virtual_machines.get, vm_rg, vm_name)]
+                else:
+                    # Bare name: find the VM across all resource groups
+                    vms = await run_sync(lambda: safe_iter(compute_client.virtual_machines.list_all()))
+                vm_name = resource_id.rsplit("/", 1)[-1]
+                for vm in vms:
+                    if vm.name == vm_name:
                         resource_group = vm.id.split('/')[4]
                         
                         # Get VM details
@@ -1815,8 +3296,22 @@ async def fetch_azure_resource_details(credentials: dict, resource_type: str, re
                             "tags": vm.tags
                         }
                         
+                        # Instance view, NICs (one ARM round-trip each) and
+                        # extensions are independent; fetch them side by side
+                        nic_refs = (vm.network_profile.network_interfaces if vm.network_profile else None) or []
+                        nic_ids = [nic_ref.id.split('/') for nic_ref in nic_refs]
+                        instance_view, extensions, nics = await asyncio.gather(
+                            run_sync(compute_client.virtual_machines.instance_view, resource_group, vm.name),
+                            run_sync(lambda: safe_iter(
+                                compute_client.virtual_machine_extensions.list(resource_group, vm.name)
+                            )),
+                            asyncio.gather(*[
+                                run_sync(network_client.network_interfaces.get, nic_parts[4], nic_parts[-1])
+                                for nic_parts in nic_ids
+                            ])
+                        )
+                        
                         # Get instance view (power state, diagnostics)
-                        instance_view = compute_client.virtual_machines.instance_view(resource_group, vm.name)
                         details["instance_view"] = {
                             "statuses": [{"code": s.code, "display_status": s.display_status} for s in (instance_view.statuses or [])],
                             "vm_agent": instance_view.vm_agent.statuses if instance_view.vm_agent else None
@@ -1841,25 +3336,19 @@ async def fetch_azure_resource_details(credentials: dict, resource_type: str, re
                             ]
                         
                         # Get network interfaces
-                        nic_refs = vm.network_profile.network_interfaces if vm.network_profile else []
-                        details["network_interfaces"] = []
-                        for nic_ref in nic_refs:
-                            nic_id = nic_ref.id
-                            nic_parts = nic_id.split('/')
-                            nic_rg = nic_parts[4]
-                            nic_name = nic_parts[-1]
-                            nic = network_client.network_interfaces.get(nic_rg, nic_name)
-                            details["network_interfaces"].append({
+                        details["network_interfaces"] = [
+                            {
                                 "name": nic.name,
                                 "private_ip": nic.ip_configurations[0].private_ip_address if nic.ip_configurations else None,
                                 "primary": nic_ref.primary
-                            })
+                            }
+                            for nic_ref, nic in zip(nic_refs, nics)
+                        ]
                         
                         # Get extensions
-                        extensions_result = compute_client.virtual_machine_extensions.list(resource_group, vm.name)
                         details["extensions"] = [
                             {"name": ext.name, "publisher": ext.publisher, "type": ext.type_properties_type}
-                            for ext in safe_iter(extensions_result)
+                            for ext in extensions
                         ]
                         
                         break
@@ -1870,18 +3359,18 @@ async def fetch_azure_resource_details(credentials: dict, resource_type: str, re
         # SQL Database Details
         elif "sql" in resource_type.lower():
             try:
-                sql_client = SqlManagementClient(credential, subscription_id)
+                sql_client = SqlManagementClient(credential, subscription_id, **_AZURE_CLIENT_OPTIONS)
                 # Parse server/database from resource_id (format: "server/database")
                 if "/" in resource_id:
                     server_name, db_name = resource_id.split("/", 1)
                     
                     # Find the server across resource groups
-                    for server in safe_iter(sql_client.servers.list()):
+                    for server in await run_sync(lambda: safe_iter(sql_client.servers.list())):
                         if server.name == server_name:
                             resource_group = server.id.split('/')[4]
                             
                             # Get database details
-                            database = sql_client.databases.get(resource_group, server_name, db_name)
+                            database = await run_sync(sql_client.databases.get, resource_group, server_name, db_name)
                             details["database"] = {
                                 "name": database.name,
                                 "location": database.location,
@@ -1908,14 +3397,37 @@ async def fetch_azure_resource_details(credentials: dict, resource_type: str, re
     except Exception as e:
         return {"error": str(e)}
 
+# Compute Engine resource names (RFC 1035 labels); anything else cannot name an
+# instance and must not reach the aggregatedList filter expression
+_GCP_NAME_PATTERN = re.compile(r"[a-z]([-a-z0-9]{0,61}[a-z0-9])?")
+
+
+def _gcp_instance_ref(resource_id: str) -> tuple:
+    """
+    Split a GCP instance detail id into (zone, name).
+
+    Accepts "<zone>/<name>", the inventory's "zones/<zone>/<name>" and a bare
+    "<name>" (zone None). Raises ValueError for anything that is not a valid
+    instance name.
+    """
+    zone, _, name = resource_id.rpartition("/")
+    zone = zone.removeprefix("zones/") or None
+    if not _GCP_NAME_PATTERN.fullmatch(name) or (zone and not _GCP_NAME_PATTERN.fullmatch(zone)):
+        raise ValueError(f"Invalid GCP instance id: {resource_id}")
+    return zone, name
+
+
 async def fetch_gcp_resource_details(credentials: dict, resource_type: str, resource_id: str):
     """Fetch comprehensive GCP resource details"""
+    # The compute_v1 and storage SDKs are blocking; run the lookup in a worker thread
+    return await run_sync(_gcp_resource_details, credentials, resource_type, resource_id)
+
+
+def _gcp_resource_details(credentials: dict, resource_type: str, resource_id: str) -> dict:
+    """Blocking body of fetch_gcp_resource_details."""
+    if not _GCP_AVAILABLE:
+        return {"error": "GCP SDK packages are not installed"}
     try:
-        from google.cloud import compute_v1, storage
-        from google.oauth2 import service_account
-        import json
-        import os
-        
         # Support multiple credential key names for compatibility
         sa_json = credentials.get("serviceAccountJson") or credentials.get("serviceAccountKey") or credentials.get("credentials")
         sa_path = credentials.get("serviceAccountPath")
@@ -1924,96 +3436,97 @@ async def fetch_gcp_resource_details(credentials: dict, resource_type: str, reso
         if not project:
             return {"error": "Missing GCP projectId"}
         
-        # Load credentials from JSON or file path
-        if sa_json:
-            creds_json = json.loads(sa_json) if isinstance(sa_json, str) else sa_json
-            creds = service_account.Credentials.from_service_account_info(creds_json)
-        elif sa_path and os.path.exists(sa_path):
-            creds = service_account.Credentials.from_service_account_file(sa_path)
-        else:
+        # Load credentials from JSON or file path (shared with the inventory)
+        creds = _gcp_service_account_credentials(sa_json, sa_path)
+        if creds is None:
             return {"error": "Missing GCP service account credentials"}
         
-        creds = creds.with_scopes(['https://www.googleapis.com/auth/cloud-platform'])
-        
         details = {}
         
         # Compute Instance Details
         if "instance" in resource_type.lower():
             try:
-                compute_client = compute_v1.InstancesClient(credentials=creds)
+                compute_client = _gcp_instances_client(creds)
                 
-                # Find instance across all zones
-                agg_list = compute_client.aggregated_list(project=project)
-                for zone_name, scoped_list in agg_list:
-                    for inst in scoped_list.instances or []:
-                        if inst.name == resource_id:
+                # "<zone>/<name>" is one direct lookup; the name is validated, so it
+                # is safe to quote into the filter used for a bare name
+                zone, name = _gcp_instance_ref(resource_id)
+                if zone is None:
+                    # Bare name: let the API filter the aggregated list down to
+                    # the one instance instead of paging through every zone
+                    matches = compute_client.aggregated_list(
+                        project=project, filter=f'name = "{name}"', max_results=1
+                    )
+                    for zone_name, scoped_list in matches:
+                        if scoped_list.instances:
                             zone = zone_name.split('/')[-1]
-                            
-                            # Get full instance details
-                            instance = compute_client.get(project=project, zone=zone, instance=resource_id)
-                            
-                            details["instance"] = {
-                                "name": instance.name,
-                                "status": instance.status,
-                                "machine_type": instance.machine_type.split('/')[-1],
-                                "zone": zone,
-                                "cpu_platform": instance.cpu_platform,
-                                "creation_timestamp": instance.creation_timestamp,
-                                "description": instance.description
-                            }
-                            
-                            # Get disks
-                            details["disks"] = [
-                                {
-                                    "device_name": disk.device_name,
-                                    "boot": disk.boot,
-                                    "auto_delete": disk.auto_delete,
-                                    "source": disk.source.split('/')[-1] if disk.source else None
-                                }
-                                for disk in (instance.disks or [])
-                            ]
-                            
-                            # Get network interfaces
-                            details["network_interfaces"] = [
-                                {
-                                    "network": ni.network.split('/')[-1] if ni.network else None,
-                                    "subnetwork": ni.subnetwork.split('/')[-1] if ni.subnetwork else None,
-                                    "internal_ip": ni.network_i_p,
-                                    "external_ips": [ac.nat_i_p for ac in (ni.access_configs or []) if ac.nat_i_p]
-                                }
-                                for ni in (instance.network_interfaces or [])
-                            ]
-                            
-                            # Get metadata
-                            if instance.metadata and instance.metadata.items:
-                                details["metadata"] = [
-                                    {"key": item.key, "value": item.value}
-                                    for item in instance.metadata.items
-                                ]
-                            
-                            # Get tags
-                            if instance.tags and instance.tags.items:
-                                details["tags"] = list(instance.tags.items)
-                            
-                            # Get labels
-                            if instance.labels:
-                                details["labels"] = dict(instance.labels)
-                            
-                            # Get service accounts
-                            details["service_accounts"] = [
-                                {"email": sa.email, "scopes": list(sa.scopes)}
-                                for sa in (instance.service_accounts or [])
-                            ]
-                            
                             break
-                            
+                
+                if zone:
+                    instance = compute_client.get(project=project, zone=zone, instance=name)
+                    
+                    details["instance"] = {
+                        "name": instance.name,
+                        "status": instance.status,
+                        "machine_type": instance.machine_type.split('/')[-1],
+                        "zone": zone,
+                        "cpu_platform": instance.cpu_platform,
+                        "creation_timestamp": instance.creation_timestamp,
+                        "description": instance.description
+                    }
+                    
+                    # Get disks
+                    details["disks"] = [
+                        {
+                            "device_name": disk.device_name,
+                            "boot": disk.boot,
+                            "auto_delete": disk.auto_delete,
+                            "source": disk.source.split('/')[-1] if disk.source else None
+                        }
+                        for disk in (instance.disks or [])
+                    ]
+                    
+                    # Get network interfaces
+                    details["network_interfaces"] = [
+                        {
+                            "network": ni.network.split('/')[-1] if ni.network else None,
+                            "subnetwork": ni.subnetwork.split('/')[-1] if ni.subnetwork else None,
+                            "internal_ip": ni.network_i_p,
+                            "external_ips": [ac.nat_i_p for ac in (ni.access_configs or []) if ac.nat_i_p]
+                        }
+                        for ni in (instance.network_interfaces or [])
+                    ]
+                    
+                    # Get metadata
+                    if instance.metadata and instance.metadata.items:
+                        details["metadata"] = [
+                            {"key": item.key, "value": item.value}
+                            for item in instance.metadata.items
+                        ]
+                    
+                    # Get tags
+                    if instance.tags and instance.tags.items:
+                        details["tags"] = list(instance.tags.items)
+                    
+                    # Get labels
+                    if instance.labels:
+                        details["labels"] = dict(instance.labels)
+                    
+                    # Get service accounts
+                    details["service_accounts"] = [
+                        {"email": sa.email, "scopes": list(sa.scopes)}
+                        for sa in (instance.service_accounts or [])
+                    ]
+                else:
+                    details["error"] = f"Instance {resource_id} not found"
+                    
             except Exception as e:
                 details["error"] = str(e)
         
         # Storage Bucket Details
         elif "bucket" in resource_type.lower():
             try:
-                storage_client = storage.Client(project=project, credentials=creds)
+                storage_client = _gcp_storage_client(project, creds)
                 bucket = storage_client.get_bucket(resource_id)
                 
                 details["bucket"] = {
@@ -2043,16 +3556,50 @@ async def fetch_gcp_resource_details(credentials: dict, resource_type: str, reso
     except Exception as e:
         return {"error": str(e)}
 
-@router.get("/costs/{client_id}")
+# Resource detail fetcher per provider name, as PROVIDER_FETCHERS for inventories
+DETAIL_FETCHERS = {
+    "aws": fetch_aws_resource_details,
+    "azure": fetch_azure_resource_details,
+    "gcp": fetch_gcp_resource_details,
+}
+
+# Per-process call limit for each provider's detail lookups, shared with its inventory calls
+DETAIL_CONCURRENCY = {
+    "aws": _AWS_CONCURRENCY,
+    "azure": _AZURE_CONCURRENCY,
+    "gcp": _GCP_CONCURRENCY,
+}
+
+
+@_tenant_scoped
+async def _fetch_details_batch(client_id: int, provider: str, meta: dict, refs: list) -> list:
+    """
+    Look up several resources of one client concurrently.
+
+    Each lookup holds a _provider_slot for its whole run, so one batch uses at
+    most CLOUD_TENANT_CONCURRENCY worker threads and counts against the same
+    per-process limits as inventory fetches.
+
+    Returns:
+        list: Details (or the exception raised) per ref, in order
+    """
+    fetch_details = DETAIL_FETCHERS[provider]
+
+    async def bounded(ref):
+        async with _provider_slot(provider, DETAIL_CONCURRENCY[provider]):
+            return await fetch_details(meta, ref.resource_type, ref.resource_id)
+
+    return await asyncio.gather(*[bounded(ref) for ref in refs], return_exceptions=True)
+
+@router.get("/costs/{client_id}", response_class=ORJSONResponse)
 async def get_cost_analysis(
     client_id: int,
-    days: int = Query(30, description="Days to analyze"),
+    days: int = Query(30, ge=1, description="Days to analyze"),
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     """Calculate estimated costs for client resources"""
-    result = await db.execute(select(Tenant).where(Tenant.id == client_id))
-    client = result.scalar_one_or_none()
+    client = await db.get(Tenant, client_id, options=TENANT_LOAD_OPTIONS)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -2060,35 +3607,19 @@ async def get_cost_analysis(
     provider = (meta.get("provider") or "aws").lower()
     
     # Placeholder cost estimates (TODO: integrate actual cloud billing APIs)
-    if provider == "aws":
-        costs = {
-            "compute": 245.50,
-            "storage": 89.20,
-            "network": 34.10,
-            "database": 125.00,
-            "total": 493.80
-        }
-    elif provider == "azure":
-        costs = {
-            "compute": 189.00,
-            "storage": 67.50,
-            "network": 28.30,
-            "database": 0,
-            "total": 284.80
-        }
-    else:
-        costs = {"total": 0}
+    costs = PLACEHOLDER_COSTS.get(provider, EMPTY_COSTS)
+    total = costs.get("total", 0)
     
-    return {
+    return ORJSONResponse({
         "client_id": client_id,
         "client_name": client.name,
         "provider": provider,
         "period_days": days,
         "costs_usd": costs,
-        "projected_monthly": round(costs.get("total", 0) * (30 / days), 2)
-    }
+        "projected_monthly": total if days == 30 else round(total * (30 / days), 2)
+    })
 
-@router.get("/recommendations/{client_id}")
+@router.get("/recommendations/{client_id}", response_class=ORJSONResponse)
 async def get_optimization_recommendations(
     client_id: int,
     db: AsyncSession = Depends(get_db),
@@ -2235,8 +3766,7 @@ async def get_optimization_recommendations(
         }
     """
     # Step 1: Retrieve client credentials from database
-    result = await db.execute(select(Tenant).where(Tenant.id == client_id))
-    client = result.scalar_one_or_none()
+    client = await db.get(Tenant, client_id, options=TENANT_LOAD_OPTIONS)
     
     # Validate client exists
     if not client:
@@ -2245,24 +3775,28 @@ async def get_optimization_recommendations(
     # Extract cloud provider and credentials from metadata
     meta = client.metadata_json or {}
     provider = (meta.get("provider") or "aws").lower()
+    client_name = client.name
+    # Release the connection before the provider fetch; nothing below touches the database
+    await db.close()
     
     # Step 2: Fetch resources and generate recommendations based on provider
     try:
         if provider == "aws":
-            # Fetch all AWS resources (EC2, RDS, S3, etc.)
-            resources = await fetch_aws_resources(client_id, meta)
+            # Fetch AWS resources (EC2, RDS, S3, etc.); cost mode skips terminated
+            # instances and attached volumes at the API
+            resources = await fetch_provider_resources("aws", client_id, meta, mode="cost")
             # Apply AWS-specific analysis rules
-            recommendations = analyze_aws_resources(resources)
+            recommendations = analyze_cached("aws", analyze_aws_resources, resources)
         elif provider == "azure":
             # Fetch all Azure resources (VMs, SQL, Storage, etc.)
-            resources = await fetch_azure_resources(client_id, meta)
+            resources = await fetch_provider_resources("azure", client_id, meta)
             # Apply Azure-specific analysis rules
-            recommendations = analyze_azure_resources(resources)
+            recommendations = analyze_cached("azure", analyze_azure_resources, resources)
         elif provider == "gcp":
             # Fetch all GCP resources (Instances, Cloud SQL, Buckets, etc.)
-            resources = await fetch_gcp_resources(client_id, meta)
+            resources = await fetch_provider_resources("gcp", client_id, meta)
             # Apply GCP-specific analysis rules
-            recommendations = analyze_gcp_resources(resources)
+            recommendations = analyze_cached("gcp", analyze_gcp_resources, resources)
         else:
             # Unknown provider - return empty recommendations
             recommendations = []
@@ -2286,41 +3820,146 @@ async def get_optimization_recommendations(
         "total_potential_savings_monthly": 0  # Sum of all estimated_savings
     }
     
-    # Aggregate counts and totals
+    # Aggregate counts and totals, and (Step 4) filter out low-value
+    # recommendations to reduce noise in the same pass. Keep recommendations if:
+    # - Savings >= $0.20/month (significant cost impact), OR
+    # - Severity is critical/high (important security/reliability issue)
+    by_category = summary['by_category']
+    by_severity = summary['by_severity']
+    total_savings = 0
+    kept = []
     for rec in recommendations:
         cat = rec.get('category', 'other')
         sev = rec.get('severity', 'low')
-        summary['by_category'][cat] = summary['by_category'].get(cat, 0) + 1
-        summary['by_severity'][sev] = summary['by_severity'].get(sev, 0) + 1
-        summary['total_potential_savings_monthly'] += rec.get('estimated_savings', 0)
-    
-    # Step 4: Filter out low-value recommendations to reduce noise
-    # Keep recommendations if:
-    # - Savings >= $0.20/month (significant cost impact), OR
-    # - Severity is critical/high (important security/reliability issue)
-    recommendations = [
-        rec for rec in recommendations 
-        if rec.get('estimated_savings', 0) >= 0.20
-        or rec.get('severity') in ['critical', 'high']
-    ]
-    
-    # Step 5: Sort by severity priority (critical → high → medium → low)
-    severity_order = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
-    recommendations.sort(key=lambda x: severity_order.get(x.get('severity', 'low'), 3))
+        savings = rec.get('estimated_savings', 0)
+        by_category[cat] = by_category.get(cat, 0) + 1
+        by_severity[sev] = by_severity.get(sev, 0) + 1
+        total_savings += savings
+        if savings >= 0.20 or rec.get('severity') in ('critical', 'high'):
+            # Rank alongside the rec so the sort below keys on a tuple slot
+            kept.append((SEVERITY_RANK.get(sev, 3), rec))
+    summary['total_potential_savings_monthly'] = total_savings
+    
+    # Step 5: Sort by severity priority (critical → high → medium → low);
+    # the sort is stable, so analyzer order is kept within a severity
+    kept.sort(key=itemgetter(0))
+    recommendations = [rec for _, rec in kept]
     
     # Step 6: Enhance high-value recommendations with AI insights
     # Only applies to recommendations with savings >= $1 or critical/high severity
     # Uses 24-hour caching to minimize OpenAI API costs
     recommendations = await enhance_recommendations_with_llm(recommendations, provider, resources)
     
+    # Cap long affected-resource lists (after the LLM saw them in full); the
+    # recs are per-request copies, so replacing the list is safe
+    for rec in recommendations:
+        affected = rec.get("affected_resources")
+        if affected and len(affected) > MAX_AFFECTED_RESOURCES:
+            rec["affected_resources"] = affected[:MAX_AFFECTED_RESOURCES]
+            rec["affected_count"] = len(affected)
+            rec["truncated"] = True
+    
     # Step 7: Return complete recommendations response
-    return {
+    return ORJSONResponse({
         "client_id": client_id,
-        "client_name": client.name,
+        "client_name": client_name,
         "provider": provider,
         "recommendations": recommendations,
         "summary": summary
-    }
+    })
+
+
+def _inventory_items(resources: dict):
+    """Lazily yield every resource in a nested {category: {type: [...]}} inventory."""
+    return chain.from_iterable(
+        resource_list
+        for category in resources.values() if isinstance(category, dict)
+        for resource_list in category.values() if isinstance(resource_list, list)
+    )
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp(value: str):
+    """Parse an ISO 8601 provider timestamp as an aware datetime (UTC if unzoned), or None."""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+# Sort rank of each recommendation severity; unknown severities sort as "low"
+SEVERITY_RANK = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+# HTTP/HTTPS ports that may be open to the internet without being flagged. AWS
+# security group rules carry ports as ints, GCP firewall rules as strings
+_STANDARD_INT_PORTS = frozenset({80, 443})
+_STANDARD_PORTS = frozenset({"80", "443"})
+_OPEN_CIDRS = frozenset({"0.0.0.0/0", "::/0"})
+
+
+def _sg_is_open(sg: dict) -> bool:
+    """True if an AWS security group allows the internet in on a non-HTTP(S) port.
+
+    A rule without ports (protocol "-1") or spanning a range counts as open.
+    """
+    return any(
+        rule.get("cidr") in _OPEN_CIDRS
+        and not (rule.get("from_port") == rule.get("to_port") and rule.get("from_port") in _STANDARD_INT_PORTS)
+        for rule in sg.get("rules", ())
+    )
+
+
+def _firewall_is_open(rule: dict) -> bool:
+    """True if an enabled GCP ingress rule allows the internet in beyond HTTP/HTTPS.
+
+    An allow entry without ports covers every port of its protocol, so it counts as open.
+    """
+    if rule.get("disabled") or rule.get("direction", "INGRESS") != "INGRESS":
+        return False
+    return not _OPEN_CIDRS.isdisjoint(rule.get("source_ranges", ())) and any(
+        not allow.get("ports") or not _STANDARD_PORTS.issuperset(allow["ports"])
+        for allow in rule.get("allowed", ())
+    )
+
+# Analyzer output per (provider, inventory digest) as (expires_at, recommendations),
+# least recently used first; repeat polls over an unchanged inventory skip the scans
+_analysis_cache: OrderedDict = OrderedDict()
+ANALYSIS_CACHE_TTL = 60
+ANALYSIS_CACHE_SIZE = 256
+
+
+def analyze_cached(provider: str, analyze, resources: dict) -> list:
+    """
+    Run an analyze_*_resources function, reusing its result for an identical inventory.
+
+    The analyzers are pure functions of the inventory, so a digest of its
+    canonical JSON identifies the result. Callers annotate and reorder what
+    they get back, so each call returns fresh copies of the recommendation dicts.
+
+    Args:
+        provider (str): Provider name, part of the cache key
+        analyze: analyze_aws_resources, analyze_azure_resources or analyze_gcp_resources
+        resources (dict): Inventory to analyze
+
+    Returns:
+        list: Recommendations as returned by analyze
+    """
+    digest = hashlib.blake2b(
+        orjson.dumps(resources, option=orjson.OPT_SORT_KEYS, default=str), digest_size=16
+    ).digest()
+    key = (provider, digest)
+    now = time.monotonic()
+    hit = _analysis_cache.get(key)
+    if hit and hit[0] > now:
+        recommendations = hit[1]
+    else:
+        recommendations = analyze(resources)
+        _analysis_cache[key] = (now + ANALYSIS_CACHE_TTL, recommendations)
+        while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+            _analysis_cache.popitem(last=False)
+    _analysis_cache.move_to_end(key)
+    return [dict(rec) for rec in recommendations]
 
 
 def analyze_aws_resources(resources: dict) -> list:
@@ -2451,9 +4090,24 @@ def analyze_aws_resources(resources: dict) -> list:
         })
         rec_id += 1
     
-    # Security: Unencrypted S3 Buckets
+    # S3 checks share one pass over the buckets; each bucket's affected-resource
+    # entry is built once even when it fails both checks
     s3_buckets = resources.get("storage", {}).get("s3", [])
-    unencrypted_buckets = [b for b in s3_buckets if not b.get("encryption")]
+    unencrypted_buckets = []
+    no_versioning = []
+    for b in s3_buckets:
+        # A missing flag means the bucket was not checked, not that it is off
+        unencrypted = b.get("encryption") is False
+        unversioned = b.get("versioning") is False
+        if not (unencrypted or unversioned):
+            continue
+        entry = {"bucket": b.get("bucket") or b.get("name"), "region": b.get("region", "N/A")}
+        if unencrypted:
+            unencrypted_buckets.append(entry)
+        if unversioned:
+            no_versioning.append(entry)
+    
+    # Security: Unencrypted S3 Buckets
     if unencrypted_buckets:
         recommendations.append({
             "id": f"rec_{rec_id}",
@@ -2462,14 +4116,13 @@ def analyze_aws_resources(resources: dict) -> list:
             "title": f"{len(unencrypted_buckets)} Unencrypted S3 Bucket(s)",
             "description": "S3 buckets without server-side encryption are vulnerable to data breaches",
             "impact": "Data security risk",
-            "affected_resources": [{"bucket": b.get("bucket") or b.get("name"), "region": b.get("region", "N/A")} for b in unencrypted_buckets],
+            "affected_resources": unencrypted_buckets,
             "recommendation": "Enable AES-256 or AWS KMS encryption on all buckets",
             "estimated_savings": 0
         })
         rec_id += 1
     
     # Security: S3 Buckets without Versioning
-    no_versioning = [b for b in s3_buckets if not b.get("versioning")]
     if no_versioning:
         recommendations.append({
             "id": f"rec_{rec_id}",
@@ -2478,7 +4131,7 @@ def analyze_aws_resources(resources: dict) -> list:
             "title": f"{len(no_versioning)} S3 Bucket(s) Without Versioning",
             "description": "Buckets without versioning cannot recover from accidental deletions or overwrites",
             "impact": "Data loss risk",
-            "affected_resources": [{"bucket": b.get("bucket") or b.get("name"), "region": b.get("region", "N/A")} for b in no_versioning],
+            "affected_resources": no_versioning,
             "recommendation": "Enable versioning on all critical S3 buckets",
             "estimated_savings": 0
         })
@@ -2502,13 +4155,8 @@ def analyze_aws_resources(resources: dict) -> list:
         rec_id += 1
     
     # Security: Security Groups with Wide-Open Access
-    security_groups = resources.get("networking", {}).get("security_groups", [])
-    open_sgs = []
-    for sg in security_groups:
-        for rule in sg.get("rules", []):
-            if rule.get("cidr") == "0.0.0.0/0" and rule.get("from_port") not in [80, 443]:
-                open_sgs.append(sg)
-                break
+    security_groups = resources.get("networking", {}).get("sg", [])
+    open_sgs = [sg for sg in security_groups if _sg_is_open(sg)]
     if open_sgs:
         recommendations.append({
             "id": f"rec_{rec_id}",
@@ -2524,14 +4172,7 @@ def analyze_aws_resources(resources: dict) -> list:
         rec_id += 1
     
     # Operational Excellence: Resources without Tags
-    all_resources = []
-    for category in resources.values():
-        if isinstance(category, dict):
-            for resource_list in category.values():
-                if isinstance(resource_list, list):
-                    all_resources.extend(resource_list)
-    
-    untagged = [r for r in all_resources if not r.get("tags") or len(r.get("tags", [])) == 0]
+    untagged = [r for r in _inventory_items(resources) if not r.get("tags")]
     if len(untagged) > 5:  # Only report if significant number
         recommendations.append({
             "id": f"rec_{rec_id}",
@@ -2648,14 +4289,7 @@ def analyze_azure_resources(resources: dict) -> list:
         rec_id += 1
     
     # Operational: Resources without Tags
-    all_resources = []
-    for category in resources.values():
-        if isinstance(category, dict):
-            for resource_list in category.values():
-                if isinstance(resource_list, list):
-                    all_resources.extend(resource_list)
-    
-    untagged = [r for r in all_resources if not r.get("tags") or len(r.get("tags", {})) == 0]
+    untagged = [r for r in _inventory_items(resources) if not r.get("tags")]
     if len(untagged) > 5:
         recommendations.append({
             "id": f"rec_{rec_id}",
@@ -2692,17 +4326,14 @@ def analyze_azure_resources(resources: dict) -> list:
     # Cost: Old Snapshots
     snapshots = resources.get("storage", {}).get("snapshots", [])
     if snapshots:
-        from datetime import datetime, timedelta
+        cutoff = datetime.now(timezone.utc) - timedelta(days=90)
         old_snapshots = []
         for snap in snapshots:
             created = snap.get("time_created")
             if created:
-                try:
-                    created_date = datetime.fromisoformat(str(created).replace('Z', '+00:00'))
-                    if (datetime.now(created_date.tzinfo) - created_date).days > 90:
-                        old_snapshots.append(snap)
-                except:
-                    pass
+                created_date = _parse_timestamp(str(created))
+                if created_date and created_date < cutoff:
+                    old_snapshots.append(snap)
         
         if old_snapshots:
             estimated_cost = len(old_snapshots) * 5  # Rough estimate for snapshot storage
@@ -2812,18 +4443,8 @@ def analyze_gcp_resources(resources: dict) -> list:
         rec_id += 1
     
     # Security: Firewall Rules with Open Access
-    firewall_rules = resources.get("networking", {}).get("firewall_rules", [])
-    open_rules = []
-    for rule in firewall_rules:
-        source_ranges = rule.get("source_ranges", [])
-        if "0.0.0.0/0" in source_ranges:
-            # Check if it's not just HTTP/HTTPS
-            allowed = rule.get("allowed", [])
-            for allow in allowed:
-                ports = allow.get("ports", [])
-                if ports and not all(p in ["80", "443"] for p in ports):
-                    open_rules.append(rule)
-                    break
+    firewall_rules = resources.get("networking", {}).get("firewalls", [])
+    open_rules = [rule for rule in firewall_rules if _firewall_is_open(rule)]
     
     if open_rules:
         recommendations.append({
@@ -2840,14 +4461,7 @@ def analyze_gcp_resources(resources: dict) -> list:
         rec_id += 1
     
     # Operational: Resources without Labels
-    all_resources = []
-    for category in resources.values():
-        if isinstance(category, dict):
-            for resource_list in category.values():
-                if isinstance(resource_list, list):
-                    all_resources.extend(resource_list)
-    
-    unlabeled = [r for r in all_resources if not r.get("labels") or len(r.get("labels", {})) == 0]
+    unlabeled = [r for r in _inventory_items(resources) if not r.get("labels")]
     if len(unlabeled) > 5:
         recommendations.append({
             "id": f"rec_{rec_id}",
@@ -2884,17 +4498,14 @@ def analyze_gcp_resources(resources: dict) -> list:
     # Cost: Old Snapshots
     snapshots = resources.get("storage", {}).get("snapshots", [])
     if snapshots:
-        from datetime import datetime, timedelta
+        cutoff = datetime.now(timezone.utc) - timedelta(days=90)
         old_snapshots = []
         for snap in snapshots:
             created = snap.get("creation_timestamp")
             if created:
-                try:
-                    created_date = datetime.fromisoformat(str(created).replace('Z', '+00:00'))
-                    if (datetime.now(created_date.tzinfo) - created_date).days > 90:
-                        old_snapshots.append(snap)
-                except:
-                    pass
+                created_date = _parse_timestamp(str(created))
+                if created_date and created_date < cutoff:
+                    old_snapshots.append(snap)
         
         if old_snapshots:
             total_gb = sum(s.get("storage_bytes", 0) / (1024**3) for s in old_snapshots)
@@ -3070,19 +4681,19 @@ async def enhance_recommendations_with_llm(recommendations: list, provider: str,
         )
         # enhanced now contains AI insights for high-value items
     """
+    if get_async_openai_client is None:
+        logger.info("OpenAI package not installed, skipping LLM enhancement")
+        return recommendations
     try:
-        from app.config import settings
-        from app.services.openai_client import get_async_openai_client
-        
         # Check if OpenAI API key is configured
         if settings.OPENAI_PROVIDER == "azure":
             if not settings.AZURE_CLIENT_ID or not settings.AZURE_CLIENT_SECRET:
-                print("Azure OpenAI not configured, skipping LLM enhancement")
+                logger.info("Azure OpenAI not configured, skipping LLM enhancement")
                 return recommendations
         else:
             api_key = settings.OPENAI_API_KEY
             if not api_key or api_key.strip() == "":
-                print("OpenAI API key not configured, skipping LLM enhancement")
+                logger.info("OpenAI API key not configured, skipping LLM enhancement")
                 return recommendations  # Return unchanged if no API key
         
         # Initialize async OpenAI client using factory
@@ -3112,7 +4723,7 @@ async def enhance_recommendations_with_llm(recommendations: list, provider: str,
             
             # Validate cache age (24-hour TTL)
             if (now - cached_time).total_seconds() < LLM_CACHE_TTL:
-                print(f"Using cached LLM insights for {provider}")
+                logger.info("Using cached LLM insights for %s", provider)
                 
                 # Merge cached AI insights back into recommendations
                 for rec in recommendations:
@@ -3223,22 +4834,19 @@ Keep each field under 200 characters. Focus on high-impact, actionable advice.
                     rec["ai_insight"] = cached_insights[rec["id"]]
                     rec["ai_enhanced"] = True
             
-            print(f"LLM enhanced {len(cached_insights)} recommendations for {provider}")
+            logger.info("LLM enhanced %d recommendations for %s", len(cached_insights), provider)
             
         except asyncio.TimeoutError:
-            print("LLM request timed out, returning original recommendations")
+            logger.warning("LLM request timed out, returning original recommendations")
         except json.JSONDecodeError as e:
-            print(f"Failed to parse LLM response: {e}")
+            logger.warning("Failed to parse LLM response: %s", e)
         except Exception as e:
-            print(f"LLM API error: {e}")
+            logger.warning("LLM API error: %s", e)
         
         return recommendations
         
-    except ImportError:
-        print("OpenAI package not installed, skipping LLM enhancement")
-        return recommendations
     except Exception as e:
-        print(f"LLM enhancement failed: {e}")
+        logger.exception("LLM enhancement failed: %s", e)
         return recommendations
 
 
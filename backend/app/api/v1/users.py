@@ -5,6 +5,7 @@ from app.db.database import get_db
 from app.models.models import User, UserClientPermission, Role, Tenant
 from app.auth.jwt import get_current_user, hash_password
 from app.auth.rbac import require_permission, require_any_permission
+from app.services.cache import forget_tenant_scope
 from pydantic import BaseModel
 from typing import Optional, List
 
@@ -289,6 +290,7 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db), current_
     
     await db.delete(user)
     await db.commit()
+    forget_tenant_scope(user_id)
     return {"message": "User deleted successfully"}
 
 @router.get("/{user_id}/client-permissions", response_model=List[ClientPermissionResponse])
@@ -511,6 +513,7 @@ async def update_user_client_permissions(
         db.add(new_perm)
     
     await db.commit()
+    forget_tenant_scope(user_id)
     
     # Return updated permissions
     result = await db.execute(select(UserClientPermission).where(UserClientPermission.user_id == user_id))
@@ -45,7 +45,18 @@ class Settings(BaseSettings):
         APP_HOST (str): Host IP address for FastAPI server
         APP_PORT (str): Port number for FastAPI server
         DATABASE_URL (str): PostgreSQL connection string (REQUIRED)
+        DB_POOL_SIZE (int): Database connections kept open per process
+        DB_MAX_OVERFLOW (int): Extra connections allowed above DB_POOL_SIZE under load.
+            Every process (each uvicorn worker, fetcher, scheduler) gets its
+            own pool, so size both so that processes x (DB_POOL_SIZE +
+            DB_MAX_OVERFLOW) stays below Postgres max_connections (100 by
+            default) with headroom for migrations and admin sessions
         REDIS_URL (str): Redis connection string for caching
+        LOG_LEVEL (str): Root log level (DEBUG/INFO/WARNING/ERROR)
+        AWS_MAX_CONCURRENCY (int): Concurrent AWS API calls per process
+        AZURE_MAX_CONCURRENCY (int): Concurrent Azure ARM calls per process
+        GCP_MAX_CONCURRENCY (int): Concurrent GCP listings per process
+        CLOUD_TENANT_CONCURRENCY (int): Concurrent cloud API calls per tenant and provider
         KEYVAULT_NAME (str): Azure Key Vault name for production secrets
         
         OpenAI Provider Configuration:
@@ -93,7 +104,18 @@ class Settings(BaseSettings):
     APP_HOST: str = "0.0.0.0"
     APP_PORT: str = "8000"
     DATABASE_URL: str
+    # Per process; 15 connections each lets ~6 processes share a default
+    # max_connections=100 server. Raise only alongside max_connections.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
     REDIS_URL: str = "redis://localhost:6379/0"
+    LOG_LEVEL: str = "INFO"
+
+    # Outbound cloud API concurrency (inventory fetches)
+    AWS_MAX_CONCURRENCY: int = 16
+    AZURE_MAX_CONCURRENCY: int = 16
+    GCP_MAX_CONCURRENCY: int = 8
+    CLOUD_TENANT_CONCURRENCY: int = 10
     
     # OpenAI Provider Selection
     OPENAI_PROVIDER: str = Field(default="openai")
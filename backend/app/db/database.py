@@ -7,7 +7,7 @@ operations use async/await patterns for optimal performance.
 
 Database Features:
 - Async I/O with asyncpg driver (postgresql+asyncpg://)
-- Connection pooling (default: 5-20 connections)
+- Connection pooling (DB_POOL_SIZE connections, DB_MAX_OVERFLOW more under load, per process)
 - Automatic session cleanup via context managers
 - Declarative ORM base for model definitions
 
@@ -43,7 +43,17 @@ DATABASE_URL = settings.DATABASE_URL
 # Create async database engine
 # - future=True: Enable SQLAlchemy 2.0 style
 # - echo=False: Disable SQL query logging (set True for debugging)
-engine = create_async_engine(DATABASE_URL, future=True, echo=False)
+# - pool_size/max_overflow: per-process limits; multiply by the number of
+#   workers when checking against Postgres max_connections
+# - pool_pre_ping=True: Replace connections the server closed while idle
+engine = create_async_engine(
+    DATABASE_URL,
+    future=True,
+    echo=False,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_pre_ping=True
+)
 
 # Session factory for creating database sessions
 # - expire_on_commit=False: Keep objects accessible after commit
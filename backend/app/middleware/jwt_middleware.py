@@ -36,7 +36,7 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
         # Extract token from Authorization header
         auth_header = request.headers.get("authorization") or request.headers.get("Authorization")
         if not auth_header or not auth_header.lower().startswith("bearer "):
-            logger.warning(f"Missing or invalid Authorization header for {path}")
+            logger.warning("Missing or invalid Authorization header for %s", path)
             return JSONResponse(
                 status_code=401,
                 content={"detail": "Missing or invalid authorization header"}
@@ -46,7 +46,7 @@ class JWTAuthMiddleware(BaseHTTPMiddleware):
         payload = decode_token(token)
         
         if payload is None:
-            logger.warning(f"Invalid JWT token for {path}")
+            logger.warning("Invalid JWT token for %s", path)
             return JSONResponse(
                 status_code=401,
                 content={"detail": "Invalid or expired token"}
@@ -288,6 +288,11 @@ class CurrentMetric(Base):
     data = Column(JSON)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # Index for /metrics/current?client_id=: tenant filter
+        Index('ix_current_metrics_tenant_id', 'tenant_id'),
+    )
+
 class MetricSnapshot(Base):
     __tablename__ = "metric_snapshots"
     id = Column(Integer, primary_key=True)
@@ -296,6 +301,15 @@ class MetricSnapshot(Base):
     snapshot_time = Column(DateTime, server_default=func.now())
     data = Column(JSON)
 
+    __table_args__ = (
+        # Index for /metrics/history: tenant filter + newest-first keyset pagination;
+        # provider rides along so pages without data are index-only scans
+        Index(
+            'ix_metric_snapshots_tenant_time', 'tenant_id', snapshot_time.desc(), id.desc(),
+            postgresql_include=['provider']
+        ),
+    )
+
 class CloudMetricsCache(Base):
     """
     30-minute TTL cache for cloud resource inventory.
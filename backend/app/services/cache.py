@@ -0,0 +1,537 @@
+"""
+Redis response cache helpers.
+
+This module wraps a shared redis.asyncio client for caching serialized API
+responses. Redis is treated as an optimization only: when it is unreachable
+or misconfigured, every helper degrades to a cache miss / no-op so endpoints
+keep serving straight from the database.
+
+Key Scoping:
+    Cached responses are keyed on the calling user (user_id + role) as well as
+    the request parameters. Tenant visibility is decided per user through
+    UserClientPermission, so a key without the caller would leak one user's
+    view of a tenant to another.
+
+Invalidation:
+    Ingest paths call invalidate_responses() after committing new metrics, so
+    a dashboard poll sees fresh rows on its next request instead of waiting out
+    the TTL. Other processes may keep serving their in-process copy for at
+    most LOCAL_CACHE_TTL seconds.
+
+Local Tier:
+    Hot keys are also kept in a small in-process LRU for a few seconds, so
+    bursts of identical requests are answered from memory without a Redis
+    round trip. Entries hold the exact serialized bytes and are never decoded.
+
+Inventory Cache:
+    cached_fetch() stores raw provider inventories (the output of
+    fetch_aws_resources & co.) keyed by provider, client and a hash of the
+    credentials, so rotated credentials never read a stale inventory. A SETNX
+    lock lets only one worker call the cloud APIs for a given key; the others
+    wait for its result instead of repeating the same slow fetch. Each process
+    also keeps decoded inventories for a minute behind a per-key asyncio.Lock,
+    so dashboard polling is answered without touching Redis at all.
+
+    The last successful inventory is also kept for a day. Once the fresh copy
+    expires it is served immediately while one background task refreshes it
+    (stale-while-revalidate), and it stands in for a fetch that fails, so a
+    transient cloud API outage does not blank the dashboard. Every stored copy
+    carries the time it was fetched, and copies served this way are flagged
+    stale so callers never present them as new data. An explicit refresh
+    never falls back: its fetch error reaches the caller.
+
+Tenant Scopes:
+    The client IDs each user may read are memoized per process in a small
+    LRU (see tenant_scope_get). Permission changes drop the user's entry in
+    the process that made them; other processes pick the change up within
+    TENANT_SCOPE_TTL seconds.
+
+Request Coalescing:
+    RequestCoalescer shares one in-flight call between concurrent callers
+    asking for the same key (e.g. several tenants on the same GCP project
+    refreshed together) and keeps its result for a couple of seconds.
+
+Usage:
+    from app.services.cache import cache_get, cache_set, cached_fetch, response_cache_key
+
+    key = response_cache_key("current", current_user, client_id=client_id)
+    body = await cache_get(key)
+    if body is None:
+        body = orjson.dumps(payload)
+        await cache_set(key, body, ttl=30)
+
+    resources, fetched_at, stale = await cached_fetch("aws", client_id, meta, fetch_aws_resources)
+"""
+
+import asyncio
+import fnmatch
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import orjson
+import redis.asyncio as redis
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "metrics"
+
+# Provider inventories are reused for 5 minutes across workers
+INVENTORY_CACHE_TTL = 300
+# Upper bound for one provider fetch; the lock expires on its own after this
+INVENTORY_LOCK_TTL = 60
+# Last successful inventory, served while revalidating or when a fetch fails
+INVENTORY_STALE_TTL = 86400
+
+# In-process tier in front of Redis; short TTL keeps it from outliving the
+# shared copy by more than a few seconds
+LOCAL_CACHE_TTL = 5
+LOCAL_CACHE_SIZE = 256
+
+# Decoded inventories kept per process, in front of the Redis copy
+INVENTORY_LOCAL_TTL = 60
+INVENTORY_LOCAL_SIZE = 128
+
+# Client IDs per user_id; short TTL bounds how long a permission change made
+# through another process goes unnoticed here
+TENANT_SCOPE_TTL = 30
+TENANT_SCOPE_SIZE = 1024
+
+_client: Optional[redis.Redis] = None
+_local: "OrderedDict[str, tuple]" = OrderedDict()
+_inventories: "OrderedDict[str, tuple]" = OrderedDict()
+_inventory_locks: Dict[str, asyncio.Lock] = {}
+# Callers holding or queued on each inventory lock; the lock is dropped when
+# the last one leaves, so a newcomer can never get a second lock for a key
+_inventory_lock_users: Dict[str, int] = {}
+# Background refreshes in flight, by inventory key (also keeps the tasks referenced)
+_revalidating: Dict[str, asyncio.Task] = {}
+_tenant_scopes: "OrderedDict[int, tuple]" = OrderedDict()
+
+
+def get_redis() -> redis.Redis:
+    """
+    Get the shared Redis client, creating it on first use.
+
+    The client holds a connection pool, so a single instance is reused for
+    the lifetime of the process.
+
+    Returns:
+        redis.Redis: Async Redis client bound to settings.REDIS_URL
+    """
+    global _client
+    if _client is None:
+        _client = redis.from_url(settings.REDIS_URL, socket_connect_timeout=1, socket_timeout=1)
+    return _client
+
+
+def response_cache_key(route: str, current_user: dict, **params) -> str:
+    """
+    Build a cache key scoped to the caller and the request parameters.
+
+    Args:
+        route (str): Short route name, e.g. "current" or "history"
+        current_user (dict): Authenticated user from get_current_user
+        **params: Query parameters that change the response
+
+    Returns:
+        str: Key such as "metrics:current:u7:admin:client_id=3"
+    """
+    parts = [KEY_PREFIX, route, f"u{current_user.get('user_id')}", str(current_user.get("role"))]
+    parts.extend(f"{name}={params[name]}" for name in sorted(params))
+    return ":".join(parts)
+
+
+def _local_get(key: str) -> Optional[bytes]:
+    """Return a live entry from the in-process tier, refreshing its LRU position."""
+    entry = _local.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at < time.monotonic():
+        _local.pop(key, None)
+        return None
+    _local.move_to_end(key)
+    return value
+
+
+def _local_set(key: str, value: bytes, ttl: int) -> None:
+    """Store an entry in the in-process tier, evicting the least recently used."""
+    _local[key] = (time.monotonic() + min(ttl, LOCAL_CACHE_TTL), value)
+    _local.move_to_end(key)
+    while len(_local) > LOCAL_CACHE_SIZE:
+        _local.popitem(last=False)
+
+
+def tenant_scope_get(user_id: int) -> Optional[frozenset]:
+    """Return the memoized client IDs for user_id, or None on a miss."""
+    entry = _tenant_scopes.get(user_id)
+    if entry is None:
+        return None
+    expires_at, ids = entry
+    if expires_at < time.monotonic():
+        del _tenant_scopes[user_id]
+        return None
+    _tenant_scopes.move_to_end(user_id)
+    return ids
+
+
+def tenant_scope_set(user_id: int, ids: frozenset) -> None:
+    """Memoize a user's client IDs, evicting the least recently used users."""
+    _tenant_scopes[user_id] = (time.monotonic() + TENANT_SCOPE_TTL, ids)
+    _tenant_scopes.move_to_end(user_id)
+    while len(_tenant_scopes) > TENANT_SCOPE_SIZE:
+        _tenant_scopes.popitem(last=False)
+
+
+def forget_tenant_scope(user_id: int) -> None:
+    """Drop a user's memoized client IDs after their permissions change."""
+    _tenant_scopes.pop(user_id, None)
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    """
+    Read a cached response body, checking the in-process tier first.
+
+    Args:
+        key (str): Cache key from response_cache_key()
+
+    Returns:
+        Optional[bytes]: Cached body, or None on a miss or Redis failure
+    """
+    value = _local_get(key)
+    if value is not None:
+        return value
+    try:
+        value = await get_redis().get(key)
+    except Exception as e:
+        logger.warning("Redis cache read failed for %s: %s", key, e)
+        return None
+    if value is not None:
+        _local_set(key, value, LOCAL_CACHE_TTL)
+    return value
+
+
+async def cache_set(key: str, value: bytes, ttl: int) -> None:
+    """
+    Store a response body with an expiry.
+
+    Args:
+        key (str): Cache key from response_cache_key()
+        value (bytes): Serialized response body
+        ttl (int): Time to live in seconds
+    """
+    _local_set(key, value, ttl)
+    try:
+        await get_redis().set(key, value, ex=ttl)
+    except Exception as e:
+        logger.warning("Redis cache write failed for %s: %s", key, e)
+
+
+async def invalidate_responses(routes: tuple, client_id: int) -> None:
+    """
+    Drop cached responses for a tenant on every route given.
+
+    Keys are scoped per user, so this matches every user's copy of the
+    tenant's responses, plus the unfiltered (all tenants) responses that
+    include its rows.
+
+    Args:
+        routes (tuple): Route names used with response_cache_key(), e.g. ("current",)
+        client_id (int): Tenant whose data changed
+    """
+    patterns = [
+        f"{KEY_PREFIX}:{route}:*:client_id={scope}:*"
+        for route in routes
+        for scope in (client_id, None)
+    ]
+    for key in [k for k in _local if any(fnmatch.fnmatchcase(k, p) for p in patterns)]:
+        _local.pop(key, None)
+    try:
+        client = get_redis()
+        for pattern in patterns:
+            keys = [key async for key in client.scan_iter(match=pattern, count=500)]
+            if keys:
+                await client.unlink(*keys)
+    except Exception as e:
+        logger.warning("Redis cache invalidation failed for client %s: %s", client_id, e)
+
+
+def _inventory_get(key: str) -> Optional[tuple]:
+    """Return a live (inventory, fetched_at) pair held by this process."""
+    entry = _inventories.get(key)
+    if entry is None:
+        return None
+    expires_at, inventory = entry
+    if expires_at < time.monotonic():
+        _inventories.pop(key, None)
+        return None
+    _inventories.move_to_end(key)
+    return inventory
+
+
+def _inventory_set(key: str, entry: tuple) -> None:
+    """Keep an (inventory, fetched_at) pair in this process, evicting the least recently used."""
+    _inventories[key] = (time.monotonic() + INVENTORY_LOCAL_TTL, entry)
+    _inventories.move_to_end(key)
+    while len(_inventories) > INVENTORY_LOCAL_SIZE:
+        _inventories.popitem(last=False)
+
+
+def credentials_fingerprint(credentials: dict) -> str:
+    """
+    Hash a credentials mapping into a short, stable cache-key component.
+
+    Args:
+        credentials (dict): Client metadata holding provider credentials
+
+    Returns:
+        str: 32-character hex digest; secrets never appear in Redis keys
+    """
+    canonical = orjson.dumps(credentials, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
+def _stamp(body: bytes, fetched_at: datetime) -> bytes:
+    """Wrap a serialized inventory with the time it was fetched, without re-encoding it."""
+    return b'{"fetched_at":' + orjson.dumps(fetched_at) + b',"inventory":' + body + b"}"
+
+
+def _unstamp(value: bytes) -> tuple:
+    """Decode a stored inventory into (inventory, fetched_at)."""
+    stored = orjson.loads(value)
+    return stored["inventory"], datetime.fromisoformat(stored["fetched_at"])
+
+
+async def cached_fetch(
+    provider: str,
+    client_id: int,
+    credentials: dict,
+    fetch: Callable[[int, dict], Awaitable[dict]],
+    refresh: bool = False,
+    ttl: int = INVENTORY_CACHE_TTL
+) -> Tuple[dict, datetime, bool]:
+    """
+    Return a provider inventory from cache, fetching it once on a miss.
+
+    Args:
+        provider (str): Cloud provider ("aws", "azure", "gcp")
+        client_id (int): Client/tenant ID
+        credentials (dict): Client metadata passed through to fetch
+        fetch: Provider fetch coroutine, e.g. fetch_aws_resources
+        refresh (bool): Skip the cached copy and fetch fresh data
+        ttl (int): Seconds to keep the fetched inventory in Redis
+
+    Returns:
+        tuple: (inventory, fetched_at, stale). inventory is as produced by
+        fetch; copies served from the in-process tier are shared between
+        callers and must not be mutated. fetched_at is the naive UTC time the
+        inventory was fetched from the cloud. stale is True when the fresh
+        copy was unavailable and the last good copy was served instead.
+
+    Raises:
+        Exception: Whatever fetch raised, when there is no last good copy to
+        serve or refresh is set
+
+    Concurrency:
+        Within a process, callers for the same key queue on one asyncio.Lock
+        and reuse the result of whoever went first. Across processes, the
+        worker that wins the SETNX lock fetches and stores the result; others
+        poll until the lock is released and then read the stored copy,
+        falling back to their own fetch if none appears within the lock TTL.
+        Inventories carrying a top-level "error" are not cached; without
+        refresh, the last successful inventory is returned in their place
+        when there is one.
+    """
+    # "inv2": values are stamped with their fetch time (see _stamp)
+    key = f"{KEY_PREFIX}:inv2:{provider}:{client_id}:{credentials_fingerprint(credentials)}"
+
+    if not refresh:
+        entry = _inventory_get(key)
+        if entry is not None:
+            return (*entry, False)
+
+    lock = _inventory_locks.setdefault(key, asyncio.Lock())
+    _inventory_lock_users[key] = _inventory_lock_users.get(key, 0) + 1
+    try:
+        async with lock:
+            if not refresh:
+                # Filled in by the caller we were queued behind
+                entry = _inventory_get(key)
+                if entry is not None:
+                    return (*entry, False)
+            inventory, fetched_at, stale = await _shared_fetch(key, client_id, credentials, fetch, refresh, ttl)
+            if not stale and not inventory.get("error"):
+                _inventory_set(key, (inventory, fetched_at))
+            return inventory, fetched_at, stale
+    finally:
+        _inventory_lock_users[key] -= 1
+        if not _inventory_lock_users[key]:
+            del _inventory_lock_users[key]
+            del _inventory_locks[key]
+
+
+async def _shared_fetch(
+    key: str,
+    client_id: int,
+    credentials: dict,
+    fetch: Callable[[int, dict], Awaitable[dict]],
+    refresh: bool,
+    ttl: int
+) -> tuple:
+    """
+    Read an inventory from Redis, or fetch and store it under the SETNX lock.
+
+    Returns (inventory, fetched_at, stale) as described in cached_fetch().
+    """
+    lock_key = f"{key}:lock"
+    last_key = f"{key}:last"
+
+    if not refresh:
+        cached = await cache_get(key)
+        if cached is not None:
+            return (*_unstamp(cached), False)
+        last = await cache_get(last_key)
+        if last is not None:
+            _revalidate(key, client_id, credentials, fetch, ttl)
+            return (*_unstamp(last), True)
+
+    async def fetch_now() -> tuple:
+        fetched_at = datetime.utcnow()
+        return await fetch(client_id, credentials), fetched_at
+
+    try:
+        acquired = await get_redis().set(lock_key, b"1", nx=True, ex=INVENTORY_LOCK_TTL)
+    except Exception as e:
+        logger.warning("Redis lock failed for %s: %s", lock_key, e)
+        return (*await fetch_now(), False)
+
+    if not acquired:
+        # Another worker is already fetching this inventory - wait for it
+        try:
+            for _ in range(INVENTORY_LOCK_TTL * 4):
+                await asyncio.sleep(0.25)
+                if not await get_redis().exists(lock_key):
+                    break
+        except Exception as e:
+            logger.warning("Redis lock poll failed for %s: %s", lock_key, e)
+        cached = await cache_get(key)
+        if cached is not None:
+            return (*_unstamp(cached), False)
+
+    try:
+        try:
+            result, fetched_at = await fetch_now()
+        except Exception as e:
+            last = None if refresh else await cache_get(last_key)
+            if last is None:
+                raise
+            logger.warning("Inventory fetch for %s failed, serving last good copy: %s", key, e)
+            return (*_unstamp(last), True)
+        if result.get("error"):
+            last = None if refresh else await cache_get(last_key)
+            if last is not None:
+                logger.warning("Inventory fetch for %s failed, serving last good copy: %s", key, result["error"])
+                return (*_unstamp(last), True)
+            return result, fetched_at, False
+        try:
+            body = _stamp(orjson.dumps(result), fetched_at)
+        except TypeError as e:
+            logger.warning("Inventory for %s is not cacheable: %s", key, e)
+            return result, fetched_at, False
+        await cache_set(key, body, ttl)
+        await cache_set(last_key, body, INVENTORY_STALE_TTL)
+        return result, fetched_at, False
+    finally:
+        if acquired:
+            try:
+                await get_redis().delete(lock_key)
+            except Exception as e:
+                logger.warning("Redis lock release failed for %s: %s", lock_key, e)
+
+
+def _revalidate(
+    key: str,
+    client_id: int,
+    credentials: dict,
+    fetch: Callable[[int, dict], Awaitable[dict]],
+    ttl: int
+) -> None:
+    """Refresh an expired inventory in the background, once per key at a time."""
+    if key in _revalidating:
+        return
+
+    async def refresh() -> None:
+        try:
+            inventory, fetched_at, _ = await _shared_fetch(key, client_id, credentials, fetch, True, ttl)
+            if not inventory.get("error"):
+                _inventory_set(key, (inventory, fetched_at))
+        except Exception as e:
+            logger.warning("Background inventory refresh failed for %s: %s", key, e)
+        finally:
+            _revalidating.pop(key, None)
+
+    _revalidating[key] = asyncio.get_running_loop().create_task(refresh())
+
+
+class RequestCoalescer:
+    """
+    Run one call per key at a time and share its result with every caller.
+
+    The first caller for a key starts the call; callers arriving while it is
+    running, or within ttl seconds after it succeeded, await the same task.
+    Failures are forgotten immediately so the next caller retries.
+    """
+
+    def __init__(self, ttl: float = 2.0):
+        self.ttl = ttl
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def fetch(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the shared result of call() for key.
+
+        Args:
+            key: Identifies equivalent calls; include whatever scopes the result
+                (project, credentials identity, API)
+            call: Zero-argument coroutine factory performing the real request
+
+        Returns:
+            Whatever call() returns. The object is shared between callers and
+            must not be mutated.
+        """
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = loop.create_task(call())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._expire(key, done))
+        # shield: one caller being cancelled must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable) -> None:
+        """Drop the shared result for key so the next caller starts a fresh call."""
+        self._tasks.pop(key, None)
+
+    def _expire(self, key: Hashable, task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is not None:
+            self._forget(key, task)
+        else:
+            task.get_loop().call_later(self.ttl, self._forget, key, task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+
+async def close_redis() -> None:
+    """Close the shared Redis client on application shutdown."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,63 @@
+"""
+Non-blocking log output.
+
+Log records are put on an in-memory queue by a QueueHandler on the root
+logger and written out by a QueueListener thread, so a logging call from a
+coroutine never blocks the event loop on a slow stdout pipe (container log
+drivers apply backpressure when they fall behind).
+
+Usage:
+    from app.services.log_queue import start_queue_logging, stop_queue_logging
+
+    start_queue_logging()   # application startup
+    stop_queue_logging()    # application shutdown; flushes pending records
+"""
+
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.config import settings
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def start_queue_logging() -> None:
+    """
+    Route root logging through a queue drained by a background thread.
+
+    Handlers already attached to the root logger are moved behind the
+    listener; when there are none, records go to stdout. Calling this more
+    than once is a no-op.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    if not handlers:
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers = [stream]
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_queue_logging() -> None:
+    """Stop the listener thread after writing out any queued records."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.api.v1 import metrics
+
+
+class FakeS3:
+    """S3 client stand-in: bucket "slow" never answers, "plain" has no encryption."""
+
+    async def get_bucket_encryption(self, Bucket):
+        if Bucket == "slow":
+            await asyncio.sleep(3600)
+        if Bucket == "plain":
+            raise ClientError({"Error": {"Code": "ServerSideEncryptionConfigurationNotFoundError"}}, "GetBucketEncryption")
+        return {"ServerSideEncryptionConfiguration": {"Rules": [{"ApplyServerSideEncryptionByDefault": {}}]}}
+
+    async def get_bucket_versioning(self, Bucket):
+        return {"Status": "Enabled"} if Bucket == "secure" else {}
+
+
+@pytest.mark.asyncio
+async def test_s3_settings_keep_partial_results_on_timeout():
+    buckets = [{"bucket": name, "region": "us-east-1"} for name in ("secure", "plain", "slow")]
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(metrics._aws_s3_settings(FakeS3(), buckets), 0.5)
+
+    secure, plain, slow = buckets
+    assert (secure["encryption"], secure["versioning"]) == (True, True)
+    assert (plain["encryption"], plain["versioning"]) == (False, False)
+    assert "encryption" not in slow
+
+
+def test_analyzer_skips_unchecked_buckets():
+    resources = {"storage": {"s3": [
+        {"bucket": "plain", "region": "us-east-1", "encryption": False, "versioning": False},
+        {"bucket": "slow", "region": "us-east-1"},
+    ]}}
+    recommendations = metrics.analyze_aws_resources(resources)
+
+    flagged = [r["affected_resources"] for r in recommendations if "S3" in r["title"]]
+    assert flagged == [[{"bucket": "plain", "region": "us-east-1"}]] * 2
+
+
+class FakePaginatedClient:
+    """Client whose paginator stops at MaxItems and reports a resume token if items remain."""
+
+    def __init__(self, total):
+        self.total = total
+        self.config = None
+
+    def can_paginate(self, operation):
+        return True
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, PaginationConfig, **params):
+        self.config = PaginationConfig
+        return FakePages(min(self.total, PaginationConfig["MaxItems"]), self.total > PaginationConfig["MaxItems"])
+
+
+class FakePages:
+    def __init__(self, count, more):
+        self.count = count
+        self.resume_token = "token" if more else None
+
+    async def __aiter__(self):
+        for start in range(0, self.count, 1000):
+            yield {"Items": [{"n": n} for n in range(start, min(start + 1000, self.count))]}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("total, truncated", [(metrics._AWS_MAX_ITEMS, False), (metrics._AWS_MAX_ITEMS + 1, True)])
+async def test_paginate_caps_at_max_items_and_records_truncation(total, truncated):
+    client = FakePaginatedClient(total)
+    truncations = []
+    metrics._aws_truncated.set(truncations)
+
+    items = await metrics._aws_paginate(client, "describe_things", "Items", page_size=1000)
+
+    assert client.config == {"MaxItems": metrics._AWS_MAX_ITEMS, "PageSize": 1000}
+    assert len(items) == metrics._AWS_MAX_ITEMS
+    assert truncations == (["describe_things"] if truncated else [])
@@ -0,0 +1,24 @@
+import pytest
+
+from app.api.v1.metrics import _gcp_instance_ref
+
+
+def test_zone_and_name():
+    assert _gcp_instance_ref("us-central1-a/web-1") == ("us-central1-a", "web-1")
+
+
+def test_inventory_zone_round_trip():
+    # The inventory reports zones as "zones/<zone>"; the page sends that prefix through
+    inventory_item = {"id": "web-1", "zone": "zones/us-central1-a"}
+    resource_id = f"{inventory_item['zone']}/{inventory_item['id']}"
+    assert _gcp_instance_ref(resource_id) == ("us-central1-a", "web-1")
+
+
+def test_bare_name():
+    assert _gcp_instance_ref("web-1") == (None, "web-1")
+
+
+@pytest.mark.parametrize("resource_id", ['web" OR name = "x', "us-central1-a/", "Web_1", "a/b/c/d"])
+def test_rejects_invalid_ids(resource_id):
+    with pytest.raises(ValueError):
+        _gcp_instance_ref(resource_id)
@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.services import cache
+
+
+class FakeRedis:
+    """In-memory stand-in for the few redis.asyncio calls the cache makes."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cache, "get_redis", lambda: fake)
+    for state in (
+        cache._local, cache._inventories, cache._inventory_locks, cache._inventory_lock_users, cache._revalidating
+    ):
+        state.clear()
+    return fake
+
+
+def expire_fresh_copy(fake):
+    """Drop the fresh inventory everywhere, keeping only the day-long :last copy."""
+    for key in [k for k in fake.data if not k.endswith(":last")]:
+        del fake.data[key]
+    cache._local.clear()
+    cache._inventories.clear()
+
+
+def fetcher(*outcomes):
+    calls = []
+
+    async def fetch(client_id, credentials):
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(client_id)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    fetch.calls = calls
+    return fetch
+
+
+@pytest.mark.asyncio
+async def test_fresh_fetch_is_cached_with_its_fetch_time(redis):
+    fetch = fetcher({"compute": {"ec2": [{"id": "i-1"}]}})
+    inventory, fetched_at, stale = await cache.cached_fetch("aws", 1, {"k": "v"}, fetch)
+    again, again_at, again_stale = await cache.cached_fetch("aws", 1, {"k": "v"}, fetch)
+
+    assert inventory == again == {"compute": {"ec2": [{"id": "i-1"}]}}
+    assert fetched_at == again_at
+    assert not stale and not again_stale
+    assert len(fetch.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_last_good_copy_is_flagged_stale_with_original_fetch_time(redis):
+    fetch = fetcher({"compute": {"ec2": [{"id": "i-1"}]}}, RuntimeError("outage"))
+    _, first_at, _ = await cache.cached_fetch("aws", 1, {}, fetch)
+    expire_fresh_copy(redis)
+
+    inventory, fetched_at, stale = await cache.cached_fetch("aws", 1, {}, fetch)
+    await asyncio.gather(*cache._revalidating.values())
+
+    assert stale
+    assert fetched_at == first_at
+    assert inventory == {"compute": {"ec2": [{"id": "i-1"}]}}
+    # The failed background refresh must not replace the stored copy
+    assert redis.data.get(next(k for k in redis.data if k.endswith(":last")))
+
+
+@pytest.mark.asyncio
+async def test_refresh_surfaces_fetch_errors_instead_of_the_last_copy(redis):
+    fetch = fetcher({"compute": {}}, RuntimeError("outage"))
+    await cache.cached_fetch("aws", 1, {}, fetch)
+
+    with pytest.raises(RuntimeError, match="outage"):
+        await cache.cached_fetch("aws", 1, {}, fetch, refresh=True)
+
+
+@pytest.mark.asyncio
+async def test_refresh_returns_error_inventory_without_caching_it(redis):
+    fetch = fetcher({"compute": {}}, {"error": "denied"}, {"compute": {}})
+    await cache.cached_fetch("aws", 1, {}, fetch)
+
+    inventory, _, stale = await cache.cached_fetch("aws", 1, {}, fetch, refresh=True)
+    assert inventory == {"error": "denied"}
+    assert not stale
+    cached, _, _ = await cache.cached_fetch("aws", 1, {}, fetch)
+    assert cached == {"compute": {}}
+
+
+@pytest.mark.asyncio
+async def test_lock_outlives_release_while_callers_are_queued(redis, monkeypatch):
+    # Without Redis only the per-key asyncio.Lock keeps fetches single-flight
+    def redis_down():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache, "get_redis", redis_down)
+    running = 0
+    overlap = []
+
+    async def fetch(client_id, credentials):
+        nonlocal running
+        running += 1
+        overlap.append(running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        # Error inventories are never cached, so every caller fetches in turn
+        return {"error": "throttled"}
+
+    def call():
+        return asyncio.ensure_future(cache.cached_fetch("aws", 1, {}, fetch))
+
+    first, second = call(), call()
+    late = []
+    # Arrives right after the first caller releases, before the queued one runs
+    first.add_done_callback(lambda _: late.append(call()))
+    await asyncio.gather(first, second)
+    await asyncio.gather(*late)
+
+    assert max(overlap) == 1
+    assert len(overlap) == 3
+    assert not cache._inventory_locks and not cache._inventory_lock_users
+
+
+@pytest.mark.asyncio
+async def test_waits_for_another_workers_lock_and_reads_its_result(redis):
+    key = f"{cache.KEY_PREFIX}:inv2:aws:1:{cache.credentials_fingerprint({})}"
+    fetched_at = datetime(2024, 5, 1, 12, 0)
+    redis.data[f"{key}:lock"] = b"1"
+
+    async def other_worker():
+        await asyncio.sleep(0.3)
+        redis.data[key] = cache._stamp(b'{"compute":{"ec2":[]}}', fetched_at)
+        del redis.data[f"{key}:lock"]
+
+    fetch = fetcher({"compute": {"ec2": [{"id": "mine"}]}})
+    worker = asyncio.ensure_future(other_worker())
+    inventory, got_at, stale = await cache.cached_fetch("aws", 1, {}, fetch)
+    await worker
+
+    assert (inventory, got_at, stale) == ({"compute": {"ec2": []}}, fetched_at, False)
+    assert fetch.calls == []
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime
+
+import msgpack
+import orjson
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.api.v1 import metrics
+
+
+def make_request(**headers):
+    return Request({
+        "type": "http",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+FETCHED_AT = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+
+def test_inventory_etag_is_weak_and_varies_with_format_and_summary():
+    json_tag = metrics.inventory_etag(make_request(), 1, "aws", FETCHED_AT)
+    msgpack_tag = metrics.inventory_etag(make_request(accept=metrics.MSGPACK_MEDIA_TYPE), 1, "aws", FETCHED_AT)
+    summary_tag = metrics.inventory_etag(make_request(), 1, "aws", FETCHED_AT, summary_only=True)
+
+    assert json_tag.startswith('W/"') and json_tag.endswith('"')
+    assert json_tag == metrics.inventory_etag(make_request(), 1, "aws", FETCHED_AT)
+    assert len({json_tag, msgpack_tag, summary_tag}) == 3
+
+
+@pytest.mark.parametrize("if_none_match, matches", [
+    (None, False),
+    ('W/"abc"', True),
+    ('W/"old", W/"abc"', True),
+    ('W/"old",W/"other"', False),
+    ("*", True),
+])
+def test_etag_matches(if_none_match, matches):
+    headers = {"if_none_match": if_none_match} if if_none_match else {}
+    assert metrics.etag_matches(make_request(**headers), 'W/"abc"') is matches
+
+
+def test_negotiate_response_returns_msgpack_when_accepted():
+    payload = {"client_id": 1, "fetched_at": FETCHED_AT}
+    response = metrics.negotiate_response(
+        make_request(accept=f"{metrics.MSGPACK_MEDIA_TYPE}, application/json"), payload, {"ETag": 'W/"x"'}
+    )
+
+    assert response.media_type == metrics.MSGPACK_MEDIA_TYPE
+    assert response.headers["vary"] == "Accept"
+    assert response.headers["etag"] == 'W/"x"'
+    assert msgpack.unpackb(response.body) == {"client_id": 1, "fetched_at": FETCHED_AT.isoformat()}
+
+
+def test_negotiate_response_defaults_to_json():
+    response = metrics.negotiate_response(make_request(accept="application/json"), {"client_id": 1})
+
+    assert response.media_type == "application/json"
+    assert response.headers["vary"] == "Accept"
+    assert orjson.loads(response.body) == {"client_id": 1}
+
+
+def test_history_cursor_round_trips():
+    cursor = metrics.format_history_cursor(FETCHED_AT, 42)
+
+    assert metrics.parse_history_cursor(cursor) == (FETCHED_AT, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "garbage", "2024-05-01T12:30:15_x", "not-a-date_7"])
+def test_malformed_history_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        metrics.parse_history_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_detail_batch_rejects_more_than_the_limit_before_touching_the_database():
+    refs = [
+        metrics.ResourceRef(resource_type="ec2", resource_id=f"i-{n}")
+        for n in range(metrics.MAX_DETAIL_BATCH + 1)
+    ]
+
+    with pytest.raises(HTTPException) as exc:
+        await metrics.get_resource_details_batch(1, refs, db=None, current_user={})
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_detail_batch_checks_client_access(monkeypatch):
+    async def only_client_2(db, current_user):
+        return frozenset({2})
+
+    monkeypatch.setattr(metrics, "accessible_client_ids", only_client_2)
+    refs = [metrics.ResourceRef(resource_type="ec2", resource_id="i-1")]
+
+    with pytest.raises(HTTPException) as exc:
+        await metrics.get_resource_details_batch(1, refs, db=None, current_user={"user_id": 7})
+    assert exc.value.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_detail_batch_runs_under_the_tenant_call_limit(monkeypatch):
+    running = 0
+    peak = 0
+
+    async def fetch_details(meta, resource_type, resource_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"id": resource_id}
+
+    monkeypatch.setitem(metrics.DETAIL_FETCHERS, "aws", fetch_details)
+    refs = [metrics.ResourceRef(resource_type="ec2", resource_id=f"i-{n}") for n in range(metrics.MAX_DETAIL_BATCH)]
+
+    outcomes = await metrics._fetch_details_batch(1, "aws", {}, refs)
+
+    assert outcomes == [{"id": f"i-{n}"} for n in range(metrics.MAX_DETAIL_BATCH)]
+    assert peak == metrics.settings.CLOUD_TENANT_CONCURRENCY
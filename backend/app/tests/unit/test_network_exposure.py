@@ -0,0 +1,70 @@
+import pytest
+
+from app.api.v1 import metrics
+
+
+class FakeEC2:
+    """EC2 client stand-in returning one page of security groups."""
+
+    def can_paginate(self, operation):
+        return False
+
+    async def describe_security_groups(self, **kwargs):
+        return {"SecurityGroups": [{
+            "GroupId": "sg-1",
+            "GroupName": "web",
+            "VpcId": "vpc-1",
+            "IpPermissions": [
+                {"IpProtocol": "tcp", "FromPort": 443, "ToPort": 443,
+                 "IpRanges": [{"CidrIp": "0.0.0.0/0"}], "Ipv6Ranges": [{"CidrIpv6": "::/0"}]},
+                {"IpProtocol": "tcp", "FromPort": 22, "ToPort": 22, "IpRanges": [{"CidrIp": "10.0.0.0/8"}]},
+            ],
+        }]}
+
+
+@pytest.mark.asyncio
+async def test_security_groups_carry_flattened_ingress_rules():
+    [sg] = await metrics._aws_security_groups(FakeEC2())
+
+    assert sg["id"] == "sg-1" and sg["vpc_id"] == "vpc-1"
+    assert [rule["cidr"] for rule in sg["rules"]] == ["0.0.0.0/0", "::/0", "10.0.0.0/8"]
+    assert not metrics._sg_is_open(sg)
+
+
+@pytest.mark.parametrize("rule, is_open", [
+    ({"cidr": "0.0.0.0/0", "protocol": "tcp", "from_port": 443, "to_port": 443}, False),
+    ({"cidr": "0.0.0.0/0", "protocol": "tcp", "from_port": 22, "to_port": 22}, True),
+    ({"cidr": "::/0", "protocol": "tcp", "from_port": 3389, "to_port": 3389}, True),
+    ({"cidr": "0.0.0.0/0", "protocol": "tcp", "from_port": 80, "to_port": 8080}, True),
+    ({"cidr": "0.0.0.0/0", "protocol": "-1", "from_port": None, "to_port": None}, True),
+    ({"cidr": "10.0.0.0/8", "protocol": "tcp", "from_port": 22, "to_port": 22}, False),
+])
+def test_sg_is_open(rule, is_open):
+    assert metrics._sg_is_open({"rules": [rule]}) is is_open
+
+
+@pytest.mark.parametrize("rule, is_open", [
+    ({"source_ranges": ["0.0.0.0/0"], "allowed": [{"protocol": "tcp", "ports": ["80", "443"]}]}, False),
+    ({"source_ranges": ["0.0.0.0/0"], "allowed": [{"protocol": "tcp", "ports": ["22"]}]}, True),
+    ({"source_ranges": ["0.0.0.0/0"], "allowed": [{"protocol": "all", "ports": []}]}, True),
+    ({"source_ranges": ["35.235.240.0/20"], "allowed": [{"protocol": "tcp", "ports": ["22"]}]}, False),
+    ({"source_ranges": ["0.0.0.0/0"], "allowed": [{"protocol": "tcp", "ports": ["22"]}], "disabled": True}, False),
+    ({"source_ranges": ["0.0.0.0/0"], "allowed": [{"protocol": "tcp", "ports": ["22"]}], "direction": "EGRESS"}, False),
+])
+def test_firewall_is_open(rule, is_open):
+    assert metrics._firewall_is_open(rule) is is_open
+
+
+def test_analyzers_read_fetched_inventory_keys():
+    aws = metrics.analyze_aws_resources({"networking": {"sg": [
+        {"id": "sg-1", "name": "ssh", "rules": [{"cidr": "0.0.0.0/0", "from_port": 22, "to_port": 22}]},
+    ]}})
+    gcp = metrics.analyze_gcp_resources({"networking": {"firewalls": [
+        {"name": "allow-ssh", "network": "default", "direction": "INGRESS",
+         "source_ranges": ["0.0.0.0/0"], "allowed": [{"protocol": "tcp", "ports": ["22"]}]},
+    ]}})
+
+    assert [r["affected_resources"] for r in aws if r["category"] == "security"] == [[{"id": "sg-1", "name": "ssh"}]]
+    assert [r["affected_resources"] for r in gcp if r["category"] == "security"] == [
+        [{"name": "allow-ssh", "network": "default"}]
+    ]
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.services.cache import RequestCoalescer
+
+
+def counting_call(*outcomes, delay=0.01):
+    calls = []
+
+    async def call():
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(outcome)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    call.calls = calls
+    return call
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_call():
+    coalescer = RequestCoalescer(ttl=60)
+    call = counting_call({"items": [1]})
+
+    results = await asyncio.gather(*[coalescer.fetch("key", call) for _ in range(5)])
+
+    assert results == [{"items": [1]}] * 5
+    assert len(call.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_are_evicted_so_the_next_caller_retries():
+    coalescer = RequestCoalescer(ttl=60)
+    call = counting_call(RuntimeError("throttled"), {"items": [1]})
+
+    with pytest.raises(RuntimeError):
+        await coalescer.fetch("key", call)
+    await asyncio.sleep(0)
+
+    assert await coalescer.fetch("key", call) == {"items": [1]}
+    assert len(call.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_results_expire_after_ttl():
+    coalescer = RequestCoalescer(ttl=0.05)
+    call = counting_call("first", "second", delay=0)
+
+    assert await coalescer.fetch("key", call) == "first"
+    assert await coalescer.fetch("key", call) == "first"
+    await asyncio.sleep(0.1)
+
+    assert await coalescer.fetch("key", call) == "second"
+
+
+@pytest.mark.asyncio
+async def test_forget_starts_a_fresh_call():
+    coalescer = RequestCoalescer(ttl=60)
+    call = counting_call("first", "second", delay=0)
+
+    await coalescer.fetch("key", call)
+    coalescer.forget("key")
+
+    assert await coalescer.fetch("key", call) == "second"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_shared_call():
+    coalescer = RequestCoalescer(ttl=60)
+    call = counting_call("done", delay=0.05)
+
+    impatient = asyncio.ensure_future(coalescer.fetch("key", call))
+    patient = asyncio.ensure_future(coalescer.fetch("key", call))
+    await asyncio.sleep(0.01)
+    impatient.cancel()
+
+    assert await patient == "done"
+    assert len(call.calls) == 1
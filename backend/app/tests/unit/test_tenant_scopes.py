@@ -0,0 +1,36 @@
+import pytest
+
+from app.services import cache
+
+
+@pytest.fixture(autouse=True)
+def scopes():
+    cache._tenant_scopes.clear()
+    yield cache._tenant_scopes
+    cache._tenant_scopes.clear()
+
+
+def test_scope_is_memoized_until_forgotten():
+    cache.tenant_scope_set(7, frozenset({1, 2}))
+    assert cache.tenant_scope_get(7) == frozenset({1, 2})
+
+    cache.forget_tenant_scope(7)
+    assert cache.tenant_scope_get(7) is None
+
+
+def test_expired_scope_is_dropped(monkeypatch):
+    monkeypatch.setattr(cache, "TENANT_SCOPE_TTL", -1)
+    cache.tenant_scope_set(7, frozenset({1}))
+
+    assert cache.tenant_scope_get(7) is None
+    assert 7 not in cache._tenant_scopes
+
+
+def test_least_recently_used_scopes_are_evicted(monkeypatch):
+    monkeypatch.setattr(cache, "TENANT_SCOPE_SIZE", 2)
+    cache.tenant_scope_set(1, frozenset())
+    cache.tenant_scope_set(2, frozenset())
+    cache.tenant_scope_get(1)
+    cache.tenant_scope_set(3, frozenset())
+
+    assert list(cache._tenant_scopes) == [1, 3]
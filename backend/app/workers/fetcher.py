@@ -4,6 +4,7 @@ from datetime import datetime
 from app.services.connectors import collect_all
 from app.db.database import AsyncSessionLocal
 from app.models.models import MetricSnapshot, CurrentMetric
+from app.services.cache import invalidate_responses
 from sqlalchemy.ext.asyncio import AsyncSession
 
 logger = logging.getLogger(__name__)
@@ -20,6 +21,7 @@ async def run_collector(tenant_config, tenant_id):
             snap = MetricSnapshot(tenant_id=tenant_id, provider=res["provider"], data=res)
             session.add(snap)
         await session.commit()
+    await invalidate_responses(("current", "history"), tenant_id)
 
 async def scheduler_loop(get_tenant_configs):
     while True:
@@ -7,81 +7,84 @@ import logging
 import json
 from datetime import datetime
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import AsyncSessionLocal
 from app.models.models import Tenant, MetricSnapshot
-from app.api.v1.metrics import fetch_aws_resources, fetch_azure_resources, fetch_gcp_resources
+from app.services.cache import invalidate_responses
+from app.api.v1.metrics import PROVIDER_FETCHERS, fetch_provider_resources, build_resource_summary
 
 logger = logging.getLogger(__name__)
 
+# Tenants fetched at once per run. Each fetch briefly takes a pooled database
+# connection for its insert, and fetches share the per-process cloud call
+# limits, so a large tenant list is worked through a few at a time.
+SNAPSHOT_CONCURRENCY = 4
+
+
 async def fetch_and_store_snapshot(tenant_id: int):
     """Fetch resources for a tenant and store a snapshot in the DB."""
     try:
+        # Read the tenant and release the connection before the (slow) cloud fetch
         async with AsyncSessionLocal() as db:
             result = await db.execute(select(Tenant).where(Tenant.id == tenant_id))
             tenant = result.scalar_one_or_none()
             if not tenant:
-                logger.warning(f"Tenant {tenant_id} not found")
+                logger.warning("Tenant %s not found", tenant_id)
                 return
-            
+            tenant_name = tenant.name
             meta = tenant.metadata_json or {}
-            provider = (meta.get("provider") or "aws").lower()
-            
-            # Fetch resources based on provider
-            if provider == "aws":
-                resources = await fetch_aws_resources(tenant_id, meta)
-            elif provider == "azure":
-                resources = await fetch_azure_resources(tenant_id, meta)
-            elif provider == "gcp":
-                resources = await fetch_gcp_resources(tenant_id, meta)
-            else:
-                logger.warning(f"Unknown provider: {provider} for tenant {tenant_id}")
-                return
-            
-            # Build summary
-            summary = {}
-            for category, items in resources.items():
-                if isinstance(items, dict):
-                    for resource_type, resources_list in items.items():
-                        if isinstance(resources_list, list):
-                            key = f"{category}_{resource_type}"
-                            summary[key] = len(resources_list)
-            
-            # Create snapshot payload
-            snapshot_data = {
-                "client_id": tenant_id,
-                "client_name": tenant.name,
-                "provider": provider,
-                "resources": resources,
-                "summary": summary,
-                "fetched_at": datetime.utcnow().isoformat()
-            }
-            
-            # Store snapshot in DB
-            snapshot = MetricSnapshot(
+        
+        provider = (meta.get("provider") or "aws").lower()
+        
+        # Fetch resources based on provider
+        if provider not in PROVIDER_FETCHERS:
+            logger.warning("Unknown provider: %s for tenant %s", provider, tenant_id)
+            return
+        resources = await fetch_provider_resources(provider, tenant_id, meta)
+        
+        # Build summary
+        summary = build_resource_summary(resources, provider=provider)
+        
+        # Create snapshot payload
+        snapshot_data = {
+            "client_id": tenant_id,
+            "client_name": tenant_name,
+            "provider": provider,
+            "resources": resources,
+            "summary": summary,
+            "fetched_at": datetime.utcnow().isoformat()
+        }
+        
+        # Store snapshot in DB on a fresh session
+        async with AsyncSessionLocal() as db:
+            db.add(MetricSnapshot(
                 tenant_id=tenant_id,
                 provider=provider,
                 data=snapshot_data
-            )
-            db.add(snapshot)
+            ))
             await db.commit()
-            logger.info(f"Stored snapshot for tenant {tenant_id} ({tenant.name}) with provider {provider}")
+        await invalidate_responses(("history",), tenant_id)
+        logger.info("Stored snapshot for tenant %s (%s) with provider %s", tenant_id, tenant_name, provider)
     except Exception as e:
-        logger.exception(f"Error storing snapshot for tenant {tenant_id}: {e}")
+        logger.exception("Error storing snapshot for tenant %s: %s", tenant_id, e)
 
 async def periodic_snapshot_job():
     """Fetch snapshots for all tenants periodically (every 1 hour)."""
     try:
         async with AsyncSessionLocal() as db:
-            result = await db.execute(select(Tenant))
-            tenants = result.scalars().all()
-            
-            logger.info(f"Starting periodic snapshot job for {len(tenants)} tenants")
-            tasks = [fetch_and_store_snapshot(tenant.id) for tenant in tenants]
-            await asyncio.gather(*tasks, return_exceptions=True)
-            logger.info("Periodic snapshot job completed")
+            result = await db.execute(select(Tenant.id))
+            tenant_ids = result.scalars().all()
+        
+        logger.info("Starting periodic snapshot job for %d tenants", len(tenant_ids))
+        semaphore = asyncio.Semaphore(SNAPSHOT_CONCURRENCY)
+        
+        async def bounded(tenant_id):
+            async with semaphore:
+                await fetch_and_store_snapshot(tenant_id)
+        
+        await asyncio.gather(*[bounded(tenant_id) for tenant_id in tenant_ids], return_exceptions=True)
+        logger.info("Periodic snapshot job completed")
     except Exception as e:
-        logger.exception(f"Error in periodic snapshot job: {e}")
+        logger.exception("Error in periodic snapshot job: %s", e)
 
 async def start_snapshot_scheduler():
     """Start the background scheduler loop."""
@@ -89,7 +92,7 @@ async def start_snapshot_scheduler():
         try:
             await periodic_snapshot_job()
         except Exception as e:
-            logger.exception(f"Snapshot scheduler loop error: {e}")
+            logger.exception("Snapshot scheduler loop error: %s", e)
         
         # Sleep for 1 hour (3600 seconds) before next run
         await asyncio.sleep(60 * 60)